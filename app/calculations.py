@@ -3,17 +3,32 @@ This module contains functions for performing various calculations
 related to products, such as counting products, finding the most expensive
 product in a category, and calculating average prices. It also includes
 a utility function for converting product prices between currencies.
+The counting and lookup functions are views over ProductAggregate, which
+collects all statistics in a single pass, so it can consume products as
+they are streamed from the API and be merged across parts of a catalog.
+PriceRankings does the same for the top-k products and price quantiles
+of each category, in bounded memory.
 """
 
+from dataclasses import dataclass, field
+from datetime import date as Date
+from typing import Iterable
+
 from currency_converter import CurrencyConverter
 
 from app.models import Product
+from app.rates import RateCache, get_rate_as_of
+from app.sketches import KLLSketch, TopK
 
-c = CurrencyConverter()
+rate_cache = RateCache()
 
 
 def get_price_in_currency(
-    price: float, currency: str, desired_currency: str, converter: CurrencyConverter = c
+    price: float,
+    currency: str,
+    desired_currency: str,
+    converter: CurrencyConverter | None = None,
+    date: Date | None = None,
 ) -> float:
     """
     Convert the price of a product from one currency to another using the provided converter.
@@ -22,16 +37,345 @@ def get_price_in_currency(
         price (float): The price of the product in the original currency.
         currency (str): The original currency code (e.g., "USD").
         desired_currency (str): The desired currency code (e.g., "EUR").
-        converter (CurrencyConverter): The currency converter instance to use for conversion.
+        converter (CurrencyConverter | None): The currency converter instance to use
+            for conversion. If None, the lazily loaded shared converter is used
+            through the memoised rate_cache.
+        date (Date | None): The date of the rate. If None, the latest rate is used.
+            Days without a published rate use the last one published before them,
+            as in RateMatrix; to convert many dated prices, use
+            RateMatrix.convert_many instead.
 
     Returns:
         float: The price of the product in the desired currency.
     """
     if currency == desired_currency:
         return price
+    if converter is None:
+        return rate_cache.convert(price, currency, desired_currency, date)
+    if date is not None:
+        return price * get_rate_as_of(converter, currency, desired_currency, date)
     return converter.convert(price, currency, desired_currency)
 
 
+@dataclass
+class CategoryAggregate:
+    """
+    Running statistics of a single category, with prices normalised to PLN.
+
+    Attributes:
+        count (int): Number of products seen in the category.
+        price_sum (float): Sum of the PLN prices seen in the category.
+        max_price (float | None): Highest PLN price seen in the category.
+        most_expensive (Product | None): The product with the highest PLN price.
+    """
+
+    count: int = 0
+    price_sum: float = 0.0
+    max_price: float | None = None
+    most_expensive: Product | None = None
+
+    def add(self, product: Product, price: float) -> None:
+        """
+        Add a product with its PLN price to the statistics.
+
+        Args:
+            product (Product): The product to add.
+            price (float): The price of the product in PLN.
+        """
+        self.count += 1
+        self.price_sum += price
+        if self.max_price is None or price > self.max_price:
+            self.max_price = price
+            self.most_expensive = product
+
+    def merge(self, other: "CategoryAggregate") -> None:
+        """
+        Merge the statistics of another part of the same category into this one.
+        On equal maximum prices the product already held here is kept.
+
+        Args:
+            other (CategoryAggregate): The statistics to merge in.
+        """
+        self.count += other.count
+        self.price_sum += other.price_sum
+        if other.max_price is not None and (
+            self.max_price is None or other.max_price > self.max_price
+        ):
+            self.max_price = other.max_price
+            self.most_expensive = other.most_expensive
+
+    @property
+    def average_price(self) -> float | None:
+        """
+        float | None: The average PLN price, or None if the category is empty.
+        """
+        if self.max_price is None:
+            return None
+        return self.price_sum / self.count
+
+
+@dataclass
+class ProductAggregate:
+    """
+    Statistics over a collection of products, built in a single pass.
+    Aggregates of separate parts of a collection can be merged together.
+
+    Attributes:
+        count (int): Total number of products seen.
+        categories (dict[str, CategoryAggregate]): Statistics of each category,
+            in order of first appearance.
+        price_categories (frozenset[str] | None): Categories whose prices are
+            converted and aggregated. If None, prices of all categories are.
+            Only aggregates with the same price_categories should be merged.
+    """
+
+    count: int = 0
+    categories: dict[str, CategoryAggregate] = field(default_factory=dict)
+    price_categories: frozenset[str] | None = None
+
+    def add(self, product: Product) -> None:
+        """
+        Add a single product to the statistics.
+
+        Args:
+            product (Product): The product to add.
+        """
+        self.count += 1
+        category = self.categories.get(product.category)
+        if category is None:
+            category = self.categories[product.category] = CategoryAggregate()
+        if self.price_categories is None or product.category in self.price_categories:
+            category.add(
+                product, get_price_in_currency(product.price, product.currency, "PLN")
+            )
+        else:
+            category.count += 1
+
+    def update(self, products: Iterable[Product]) -> "ProductAggregate":
+        """
+        Add every product of an iterable (a list or a stream) to the statistics.
+
+        Args:
+            products (Iterable[Product]): The products to add.
+
+        Returns:
+            ProductAggregate: The aggregate itself, to allow chaining.
+        """
+        for product in products:
+            self.add(product)
+        return self
+
+    def merge(self, other: "ProductAggregate") -> "ProductAggregate":
+        """
+        Merge the statistics of another part of the collection into this one.
+
+        Args:
+            other (ProductAggregate): The statistics to merge in.
+
+        Returns:
+            ProductAggregate: The aggregate itself, to allow chaining.
+        """
+        self.count += other.count
+        for name, stats in other.categories.items():
+            category = self.categories.get(name)
+            if category is None:
+                category = self.categories[name] = CategoryAggregate()
+            category.merge(stats)
+        return self
+
+    def counts_per_category(self) -> dict[str, int]:
+        """
+        Returns:
+            dict[str, int]: Number of products in each category.
+        """
+        return {name: category.count for name, category in self.categories.items()}
+
+    def most_expensive_in_category(self, category: str) -> Product | None:
+        """
+        Args:
+            category (str): The category to look up.
+
+        Returns:
+            Product | None: The product with the highest PLN price in the category,
+            or None if there are no products in it.
+        """
+        stats = self.categories.get(category)
+        return stats.most_expensive if stats else None
+
+    def average_price_for_category(self, category: str) -> float | None:
+        """
+        Args:
+            category (str): The category to look up.
+
+        Returns:
+            float | None: The average PLN price in the category,
+            or None if there are no products in it.
+        """
+        stats = self.categories.get(category)
+        return stats.average_price if stats else None
+
+
+@dataclass
+class CategoryRanking:
+    """
+    Bounded-memory price ranking of a single category, with prices normalised to PLN.
+
+    Attributes:
+        top (TopK): The most expensive products of the category.
+        sketch (KLLSketch): Quantile sketch of the prices in the category.
+    """
+
+    top: TopK
+    sketch: KLLSketch
+
+    def add(self, product: Product, price: float) -> None:
+        """
+        Add a product with its PLN price to the ranking.
+
+        Args:
+            product (Product): The product to add.
+            price (float): The price of the product in PLN.
+        """
+        self.top.add(product, price)
+        self.sketch.add(price)
+
+    def merge(self, other: "CategoryRanking") -> None:
+        """
+        Merge the ranking of another part of the same category into this one.
+
+        Args:
+            other (CategoryRanking): The ranking to merge in.
+        """
+        self.top.merge(other.top)
+        self.sketch.merge(other.sketch)
+
+
+@dataclass
+class PriceRankings:
+    """
+    Top-k products and price quantiles of every category, built in a single
+    pass over a list or a stream of products. Memory does not grow with the
+    number of products. Rankings of separate parts of a collection can be merged.
+
+    Attributes:
+        k (int): Number of most expensive products kept per category.
+        sketch_size (int): Accuracy parameter of the quantile sketches.
+        categories (dict[str, CategoryRanking]): Ranking of each category,
+            in order of first appearance.
+        price_categories (frozenset[str] | None): Categories that are ranked.
+            If None, all categories are.
+    """
+
+    k: int = 10
+    sketch_size: int = 200
+    categories: dict[str, CategoryRanking] = field(default_factory=dict)
+    price_categories: frozenset[str] | None = None
+
+    def add(self, product: Product) -> None:
+        """
+        Add a single product to the rankings.
+
+        Args:
+            product (Product): The product to add.
+        """
+        if (
+            self.price_categories is not None
+            and product.category not in self.price_categories
+        ):
+            return
+        ranking = self.categories.get(product.category)
+        if ranking is None:
+            ranking = self.categories[product.category] = CategoryRanking(
+                TopK(self.k), KLLSketch(self.sketch_size)
+            )
+        ranking.add(
+            product, get_price_in_currency(product.price, product.currency, "PLN")
+        )
+
+    def update(self, products: Iterable[Product]) -> "PriceRankings":
+        """
+        Add every product of an iterable (a list or a stream) to the rankings.
+
+        Args:
+            products (Iterable[Product]): The products to add.
+
+        Returns:
+            PriceRankings: The rankings themselves, to allow chaining.
+        """
+        for product in products:
+            self.add(product)
+        return self
+
+    def merge(self, other: "PriceRankings") -> "PriceRankings":
+        """
+        Merge the rankings of another part of the collection into these ones.
+
+        Args:
+            other (PriceRankings): The rankings to merge in.
+
+        Returns:
+            PriceRankings: The rankings themselves, to allow chaining.
+        """
+        for name, ranking in other.categories.items():
+            category = self.categories.get(name)
+            if category is None:
+                category = self.categories[name] = CategoryRanking(
+                    TopK(self.k), KLLSketch(self.sketch_size)
+                )
+            category.merge(ranking)
+        return self
+
+    def top_in_category(self, category: str) -> list[Product]:
+        """
+        Args:
+            category (str): The category to look up.
+
+        Returns:
+            list[Product]: Up to k products with the highest PLN prices
+            in the category, the most expensive first.
+        """
+        ranking = self.categories.get(category)
+        if ranking is None:
+            return []
+        return [product for _, product in ranking.top.items()]
+
+    def price_quantiles_for_category(
+        self, category: str, quantiles: Iterable[float]
+    ) -> dict[float, float | None] | None:
+        """
+        Args:
+            category (str): The category to look up.
+            quantiles (Iterable[float]): The quantiles, between 0 and 1.
+
+        Returns:
+            dict[float, float | None] | None: The estimated PLN price of each
+            quantile, or None if there are no products in the category.
+        """
+        ranking = self.categories.get(category)
+        return ranking.sketch.quantiles(quantiles) if ranking else None
+
+
+def _aggregate(
+    products: Iterable[Product], price_categories: frozenset[str]
+) -> ProductAggregate:
+    """
+    Aggregate products for a single question. Columnar collections, such as
+    a ProductFrame or a snapshot loaded with read_snapshot, are aggregated with
+    their own vectorised to_aggregate instead of a pass over rebuilt products.
+
+    Args:
+        products (Iterable[Product]): A list, a stream or a columnar collection.
+        price_categories (frozenset[str]): Categories whose prices are needed.
+
+    Returns:
+        ProductAggregate: The statistics answering the question.
+    """
+    to_aggregate = getattr(products, "to_aggregate", None)
+    if to_aggregate is not None:
+        return to_aggregate()
+    return ProductAggregate(price_categories=price_categories).update(products)
+
+
 def count_products(products: list[Product]) -> int:
     """
     Count the total number of products.
@@ -45,66 +389,99 @@ def count_products(products: list[Product]) -> int:
     return len(products)
 
 
-def count_products_per_category(products: list[Product]) -> dict[str, int]:
+def count_products_per_category(products: Iterable[Product]) -> dict[str, int]:
     """
     Count the number of products in each category.
 
     Args:
-        products (list[Product]): A list of Product objects.
+        products (Iterable[Product]): A list or a stream of Product objects,
+            or a ProductFrame such as a loaded snapshot.
 
     Returns:
         dict[str, int]: A dictionary where keys are category names and values
         are the count of products in each category.
     """
-    category_products_counts = {}
-    for product in products:
-        category_products_counts[product.category] = (
-            category_products_counts.get(product.category, 0) + 1
-        )
-    return category_products_counts
+    return _aggregate(products, frozenset()).counts_per_category()
 
 
 def get_most_expensive_in_category(
-    products: list[Product], category: str
+    products: Iterable[Product], category: str
 ) -> Product | None:
     """
     Find the most expensive product in a specific category.
 
     Args:
-        products (list[Product]): A list of Product objects.
+        products (Iterable[Product]): A list or a stream of Product objects,
+            or a ProductFrame such as a loaded snapshot.
         category (str): The category for which maximum price should be found.
 
     Returns:
         Product | None: The most expensive Product object in the specified category,
         or None if no products are found.
     """
-    category_products = [p for p in products if p.category == category]
-    if not category_products:
-        return None
-    return max(
-        category_products,
-        key=lambda x: get_price_in_currency(x.price, x.currency, "PLN"),
-    )
+    aggregate = _aggregate(products, frozenset({category}))
+    return aggregate.most_expensive_in_category(category)
 
 
 def get_average_price_for_category(
-    products: list[Product], category: str
+    products: Iterable[Product], category: str
 ) -> float | None:
     """
     Calculate the average price of products in a specific category.
 
     Args:
-        products (list[Product]): A list of Product objects.
+        products (Iterable[Product]): A list or a stream of Product objects,
+            or a ProductFrame such as a loaded snapshot.
         category (str): The category to calculate the average price for.
 
     Returns:
         float | None: The average price of products in the specified category,
         or None if no products are found.
     """
-    category_products = [p for p in products if p.category == category]
-    if not category_products:
-        return None
-    return sum(
-        get_price_in_currency(product.price, product.currency, "PLN")
-        for product in category_products
-    ) / len(category_products)
+    aggregate = _aggregate(products, frozenset({category}))
+    return aggregate.average_price_for_category(category)
+
+
+def get_top_k_in_category(
+    products: Iterable[Product], category: str, k: int = 10
+) -> list[Product]:
+    """
+    Find the k most expensive products in a specific category without sorting them all.
+
+    Args:
+        products (Iterable[Product]): A list or a stream of Product objects.
+        category (str): The category to rank.
+        k (int): Number of products to return.
+
+    Returns:
+        list[Product]: Up to k products with the highest PLN prices,
+        the most expensive first.
+    """
+    rankings = PriceRankings(k=k, price_categories=frozenset({category}))
+    return rankings.update(products).top_in_category(category)
+
+
+def get_price_quantiles_for_category(
+    products: Iterable[Product],
+    category: str,
+    quantiles: Iterable[float] = (0.5, 0.9, 0.99),
+    sketch_size: int = 200,
+) -> dict[float, float | None] | None:
+    """
+    Estimate quantiles of the PLN prices in a specific category in bounded memory.
+    For categories of up to about sketch_size products the quantiles are exact.
+
+    Args:
+        products (Iterable[Product]): A list or a stream of Product objects.
+        category (str): The category to describe.
+        quantiles (Iterable[float]): The quantiles, between 0 and 1.
+        sketch_size (int): Accuracy parameter of the quantile sketch.
+
+    Returns:
+        dict[float, float | None] | None: The estimated PLN price of each
+        quantile, or None if no products are found.
+    """
+    rankings = PriceRankings(
+        k=1, sketch_size=sketch_size, price_categories=frozenset({category})
+    )
+    return rankings.update(products).price_quantiles_for_category(category, quantiles)
@@ -0,0 +1,152 @@
+"""
+This module provides the ProductCatalog, an indexed collection of products
+built once from the fetched products. It answers repeated lookups by id,
+by category and by PLN price range without scanning the whole collection.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator
+
+from app.calculations import get_price_in_currency
+from app.models import Product
+
+
+class ProductCatalog:
+    """
+    A collection of products with secondary indexes.
+
+    The catalog keeps a hash index on product_id, a bucket of products per category
+    and, per category, the products sorted by their price normalised to PLN.
+    It is iterable, so it can be passed wherever a list of products is expected.
+    """
+
+    def __init__(self, products: Iterable[Product]) -> None:
+        """
+        Build the catalog and its indexes.
+
+        Args:
+            products (Iterable[Product]): A list or a stream of Product objects.
+        """
+        self._products: list[Product] = []
+        self._by_id: dict[int, Product] = {}
+        self._by_category: dict[str, list[Product]] = {}
+        self._price_sums: dict[str, float] = {}
+
+        priced: dict[str, list[tuple[float, Product]]] = {}
+        for product in products:
+            price = get_price_in_currency(product.price, product.currency, "PLN")
+            self._products.append(product)
+            self._by_id[product.product_id] = product
+            self._by_category.setdefault(product.category, []).append(product)
+            self._price_sums[product.category] = (
+                self._price_sums.get(product.category, 0.0) + price
+            )
+            priced.setdefault(product.category, []).append((price, product))
+
+        self._sorted_prices: dict[str, list[float]] = {}
+        self._sorted_products: dict[str, list[Product]] = {}
+        for category, items in priced.items():
+            # stable sort keeps the first of equally priced products first
+            items.sort(key=lambda item: item[0])
+            self._sorted_prices[category] = [price for price, _ in items]
+            self._sorted_products[category] = [product for _, product in items]
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def __iter__(self) -> Iterator[Product]:
+        return iter(self._products)
+
+    @property
+    def categories(self) -> list[str]:
+        """
+        list[str]: Category names, in order of first appearance.
+        """
+        return list(self._by_category)
+
+    def get(self, product_id: int) -> Product | None:
+        """
+        Find a product by its id.
+
+        Args:
+            product_id (int): The id of the product.
+
+        Returns:
+            Product | None: The product, or None if it is not in the catalog.
+        """
+        return self._by_id.get(product_id)
+
+    def in_category(self, category: str) -> list[Product]:
+        """
+        Get the products of a category.
+
+        Args:
+            category (str): The category name.
+
+        Returns:
+            list[Product]: Products of the category, in catalog order.
+        """
+        return list(self._by_category.get(category, []))
+
+    def count_per_category(self) -> dict[str, int]:
+        """
+        Returns:
+            dict[str, int]: Number of products in each category.
+        """
+        return {category: len(items) for category, items in self._by_category.items()}
+
+    def most_expensive_in_category(self, category: str) -> Product | None:
+        """
+        Find the product with the highest PLN price in a category.
+
+        Args:
+            category (str): The category name.
+
+        Returns:
+            Product | None: The most expensive product, or None if the category is empty.
+            Among equally priced products the first one in catalog order is returned.
+        """
+        prices = self._sorted_prices.get(category)
+        if not prices:
+            return None
+        first_max = bisect_left(prices, prices[-1])
+        return self._sorted_products[category][first_max]
+
+    def average_price_for_category(self, category: str) -> float | None:
+        """
+        Get the average PLN price of a category.
+
+        Args:
+            category (str): The category name.
+
+        Returns:
+            float | None: The average price, or None if the category is empty.
+        """
+        items = self._by_category.get(category)
+        if not items:
+            return None
+        return self._price_sums[category] / len(items)
+
+    def between(
+        self, low: float, high: float, category: str | None = None
+    ) -> list[Product]:
+        """
+        Find products whose PLN price lies in the closed range [low, high].
+
+        Args:
+            low (float): The lowest price, in PLN.
+            high (float): The highest price, in PLN.
+            category (str | None): Limit the search to a category. If None,
+                all categories are searched.
+
+        Returns:
+            list[Product]: Matching products, sorted by PLN price within each category.
+        """
+        categories = self.categories if category is None else [category]
+        found = []
+        for name in categories:
+            prices = self._sorted_prices.get(name, [])
+            start = bisect_left(prices, low)
+            end = bisect_right(prices, high)
+            found.extend(self._sorted_products.get(name, [])[start:end])
+        return found
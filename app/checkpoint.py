@@ -0,0 +1,170 @@
+"""
+This module provides an append-only checkpoint file for the product crawl.
+Every fetched product is appended as a line of JSON; the token of the last
+saved product is where an interrupted crawl resumes from. A header line
+records the crawl the products came from, so a checkpoint left behind by a
+crawl of another endpoint is not resumed.
+"""
+
+import io
+import json
+import os
+from typing import TextIO
+
+from pydantic import ValidationError
+
+from app.logger import get_logger
+from app.models import Product, validate_products_ndjson
+
+logger = get_logger(__name__)
+
+
+class Checkpoint:
+    """
+    Products fetched so far, stored one JSON document per line.
+
+    Writes are flushed and fsync'd every `batch_size` products and when the
+    checkpoint is closed, so at most one batch is lost if the process dies.
+    """
+
+    def __init__(
+        self, path: str, batch_size: int = 1000, source: str | None = None
+    ) -> None:
+        """
+        Args:
+            path (str): Path to the checkpoint file.
+            batch_size (int): Number of products appended between two fsyncs.
+            source (str | None): The crawl the products come from, e.g. the API URL.
+                A checkpoint saved for another source is discarded on load.
+                If None, any checkpoint is loaded.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.source = source
+        self._file: TextIO | None = None
+        self._pending = 0
+
+    def load(self) -> list[Product]:
+        """
+        Read the products saved by previous runs. A partially written last line
+        is dropped, and the file is truncated so new products are appended after
+        the last complete one. A checkpoint saved for another source is deleted.
+
+        Returns:
+            list[Product]: The saved products, in crawl order.
+        """
+        products: list[Product] = []
+        if not os.path.exists(self.path):
+            return products
+
+        with open(self.path, "rb") as file:
+            data = file.read()
+        source, header_size = self._read_header(data)
+        if self.source is not None and source != self.source:
+            logger.warning(
+                "Ignoring checkpoint %s saved for %s instead of %s.",
+                self.path,
+                source,
+                self.source,
+            )
+            os.remove(self.path)
+            return products
+
+        # a clean checkpoint is decoded in one call; otherwise the lines are
+        # decoded one by one to find where the damage starts
+        body = data[header_size:]
+        good_size = body.rfind(b"\n") + 1
+        try:
+            products = validate_products_ndjson(body[:good_size])
+        except ValidationError:
+            products, good_size = self._load_lines(body)
+
+        if good_size < len(body):
+            logger.warning("Dropping incomplete checkpoint line.")
+            os.truncate(self.path, header_size + good_size)
+        logger.info("Loaded %d products from checkpoint.", len(products))
+        return products
+
+    @staticmethod
+    def _read_header(data: bytes) -> tuple[str | None, int]:
+        """
+        Read the header line of a checkpoint.
+
+        Returns:
+            tuple[str | None, int]: The source of the checkpoint, None if it has
+            no header, and the size of the header line.
+        """
+        line = data[: data.find(b"\n") + 1]
+        try:
+            header = json.loads(line)
+        except ValueError:
+            return None, 0
+        if not isinstance(header, dict) or set(header) != {"source"}:
+            return None, 0
+        return header["source"], len(line)
+
+    @staticmethod
+    def _load_lines(data: bytes) -> tuple[list[Product], int]:
+        """
+        Decode checkpoint lines up to the first invalid one.
+
+        Returns:
+            tuple[list[Product], int]: The valid products and the size of
+            the lines they were read from.
+        """
+        products: list[Product] = []
+        good_size = 0
+        for line in io.BytesIO(data):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                products.append(Product.model_validate_json(line))
+            except ValidationError:
+                break
+            good_size += len(line)
+        return products, good_size
+
+    def append(self, product: Product) -> None:
+        """
+        Append a fetched product.
+
+        Args:
+            product (Product): The product to save.
+        """
+        if self._file is None:
+            # pylint: disable-next=consider-using-with
+            self._file = open(self.path, "a", encoding="utf-8")
+            if not self._file.tell():
+                self._file.write(json.dumps({"source": self.source}) + "\n")
+        self._file.write(product.model_dump_json() + "\n")
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self.sync()
+
+    def sync(self) -> None:
+        """
+        Flush appended products to disk.
+        """
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def close(self) -> None:
+        """
+        Flush appended products to disk and close the file.
+        """
+        if self._file is None:
+            return
+        self.sync()
+        self._file.close()
+        self._file = None
+
+    def remove(self) -> None:
+        """
+        Close and delete the checkpoint, e.g. after the crawl results have been used.
+        """
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
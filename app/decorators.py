@@ -1,47 +1,455 @@
 """
 This module provides a decorator for retrying function calls
 a specified number of times with a delay between retries.
+The delay can grow exponentially with random jitter, follow a server's
+Retry-After header, and be limited to errors worth retrying.
+It also provides a token-bucket rate limiter and a circuit breaker
+that protect an upstream service from being overloaded.
 """
 
+import asyncio
+import inspect
+import random
+import threading
 import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from dataclasses import dataclass
 from functools import wraps
+from typing import Any, Callable
 
 from app.logger import get_logger
+from app.metrics import registry
 
 logger = get_logger(__name__)
 
 
-def retry(retries: int, delay: float) -> callable:
+def get_retry_after(error: Exception) -> float | None:
+    """
+    Read the Retry-After header of the HTTP response attached to an error, if any.
+
+    Args:
+        error (Exception): The error raised by the decorated function.
+
+    Returns:
+        float | None: Seconds the server asked to wait, or None if it did not say.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers or not headers.get("Retry-After"):
+        return None
+    value = headers["Retry-After"].strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    How long to wait between retries.
+
+    The delay before retry n (counting from 0) is `delay * backoff ** n`, capped at
+    `max_delay`. With jitter, a random delay between 0 and that value is used
+    instead, so clients failing together do not retry together. A Retry-After header
+    on the error's HTTP response is honoured when it asks for a longer wait.
+
+    Attributes:
+        backoff (float): Factor the delay is multiplied by after every retry.
+        max_delay (float | None): Upper bound of the delay computed from backoff.
+        jitter (bool): Whether to draw the delay uniformly between 0 and its value.
+        budget (float | None): Total time (in seconds) the call may take including
+            retries; no retry is started that would end past it.
+    """
+
+    backoff: float = 1.0
+    max_delay: float | None = None
+    jitter: bool = False
+    budget: float | None = None
+
+
+def retry(
+    retries: int,
+    delay: float,
+    *,
+    retry_on: tuple[type[Exception], ...] = (Exception,),
+    retry_if: Callable[[Exception], bool] | None = None,
+    policy: RetryPolicy = RetryPolicy(),
+) -> Callable[[Callable], Callable]:
     """
     A decorator that retries a function call a specified number of times with a delay.
+    Works with both regular and coroutine functions.
 
     Args:
         retries (int): Number of times to retry the function.
         delay (float): Delay (in seconds) between retries.
+        retry_on (tuple[type[Exception], ...]): Exception types that are retried.
+            Any other exception is raised immediately.
+        retry_if (Callable[[Exception], bool] | None): Predicate deciding whether an
+            exception of the retry_on types is retried.
+        policy (RetryPolicy): How the delay grows and the time budget of the call.
 
     Returns:
-        callable: The decorated function with retry logic.
+        Callable[[Callable], Callable]: The decorator adding the retry logic.
     """
 
-    def decorator(func: callable) -> callable:
+    def give_up(name: str, reason: str) -> None:
+        registry.counter(
+            "retry_give_ups_total",
+            "Calls that failed without further retries.",
+            function=name,
+            reason=reason,
+        ).inc()
+
+    def next_delay(
+        name: str, attempt: int, error: Exception, started: float
+    ) -> float | None:
+        if retry_if is not None and not retry_if(error):
+            logger.error("Attempt %d failed with a permanent error: %s", attempt, error)
+            give_up(name, "permanent")
+            return None
+        if attempt >= retries:
+            logger.error("All %d attempts failed: %s", retries, error)
+            give_up(name, "exhausted")
+            return None
+
+        wait = delay * policy.backoff ** (attempt - 1)
+        if policy.max_delay is not None:
+            wait = min(wait, policy.max_delay)
+        if policy.jitter:
+            wait = random.uniform(0, wait)
+        retry_after = get_retry_after(error)
+        if retry_after is not None:
+            wait = max(wait, retry_after)
+
+        if (
+            policy.budget is not None
+            and time.monotonic() - started + wait > policy.budget
+        ):
+            logger.error(
+                "Attempt %d/%d failed: %s. Retry budget of %f seconds exhausted.",
+                attempt,
+                retries,
+                error,
+                policy.budget,
+            )
+            give_up(name, "budget")
+            return None
+
+        logger.warning(
+            "Attempt %d/%d failed: %s. Retrying in %f seconds...",
+            attempt,
+            retries,
+            error,
+            wait,
+        )
+        registry.counter("retries_total", "Retried calls.", function=name).inc()
+        return wait
+
+    def decorator(func: Callable) -> Callable:
+        name = getattr(func, "__qualname__", type(func).__name__)
+
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                started = time.monotonic()
+                attempt = 1
+                while True:
+                    try:
+                        return await func(*args, **kwargs)
+                    except retry_on as e:
+                        wait = next_delay(name, attempt, e, started)
+                        if wait is None:
+                            raise
+                    await asyncio.sleep(wait)
+                    attempt += 1
+
+            return async_wrapper
+
         @wraps(func)
-        def wrapper(*args: any, **kwargs: any) -> any:
-            for i in range(retries):
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.monotonic()
+            attempt = 1
+            while True:
                 try:
                     return func(*args, **kwargs)
+                except retry_on as e:
+                    wait = next_delay(name, attempt, e, started)
+                    if wait is None:
+                        raise
+                time.sleep(wait)
+                attempt += 1
+
+        return wrapper
+
+    return decorator
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket. Tokens are added at a constant rate up to the
+    bucket's capacity, and every call takes one token, waiting for it if needed.
+    """
+
+    def __init__(self, rate: float | None, capacity: int = 1) -> None:
+        """
+        Args:
+            rate (float | None): Number of tokens added per second;
+                None disables the limit.
+            capacity (int): Maximum number of tokens, i.e. the allowed burst of calls.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take a token, reserving a future one if the bucket is empty.
+
+        Returns:
+            float: Seconds the caller has to wait before using the token.
+        """
+        if self.rate is None:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> None:
+        """
+        Take a token, sleeping until it can be used.
+        """
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+
+
+def rate_limit(bucket: TokenBucket) -> Callable[[Callable], Callable]:
+    """
+    A decorator that limits how often a function is called. Calls wait until the
+    shared token bucket grants them a token. Works with both regular and coroutine
+    functions, and one bucket can be shared by several functions and threads.
+
+    Args:
+        bucket (TokenBucket): The bucket the calls take their tokens from.
+
+    Returns:
+        Callable[[Callable], Callable]: The decorator adding the rate limiting.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                wait = bucket.reserve()
+                if wait:
+                    await asyncio.sleep(wait)
+                return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            bucket.acquire()
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a function while its circuit breaker is open.
+    """
+
+
+# the settings and the state guarded by the lock are kept flat on purpose:
+# every check reads several of them at once under that single lock
+class CircuitBreaker:  # pylint: disable=too-many-instance-attributes
+    """
+    A thread-safe circuit breaker.
+
+    While closed, calls go through and consecutive failures are counted. After
+    `failure_threshold` of them the breaker opens and calls fail immediately.
+    Once `recovery_timeout` has passed it becomes half-open and lets a single
+    trial call through: success closes the breaker, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        recovery_timeout: float,
+        failure_on: tuple[type[Exception], ...] = (Exception,),
+        failure_if: Callable[[Exception], bool] | None = None,
+    ) -> None:
+        """
+        Args:
+            failure_threshold (int): Consecutive failures that open the breaker.
+            recovery_timeout (float): Seconds the breaker stays open before a trial call.
+            failure_on (tuple[type[Exception], ...]): Exception types counted as failures.
+                Other exceptions pass through without affecting the breaker.
+            failure_if (Callable[[Exception], bool] | None): Predicate deciding whether
+                an exception of the failure_on types is counted as a failure.
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failure_on = failure_on
+        self.failure_if = failure_if
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """
+        str: The current state - closed, open or half-open.
+        """
+        with self._lock:
+            if (
+                self._state == self.OPEN
+                and time.monotonic() - self._opened_at >= self.recovery_timeout
+            ):
+                return self.HALF_OPEN
+            return self._state
+
+    def before_call(self) -> None:
+        """
+        Let a call through or reject it.
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with a trial call
+                already running.
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            if time.monotonic() - self._opened_at < self.recovery_timeout:
+                raise CircuitOpenError("Circuit breaker is open.")
+            if self._trial_running:
+                raise CircuitOpenError("Circuit breaker is half-open.")
+            self._state = self.HALF_OPEN
+            self._trial_running = True
+
+    def record_success(self) -> None:
+        """
+        Record a successful call, closing the breaker.
+        """
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def release(self) -> None:
+        """
+        Forget a call that ended without a verdict on the upstream, e.g. one
+        that was cancelled or interrupted, so that another trial can run.
+        """
+        with self._lock:
+            self._trial_running = False
+
+    def record_error(self, error: Exception) -> None:
+        """
+        Record a failed call, opening the breaker if needed.
+
+        Args:
+            error (Exception): The error raised by the call.
+        """
+        is_failure = isinstance(error, self.failure_on) and (
+            self.failure_if is None or self.failure_if(error)
+        )
+        with self._lock:
+            if not is_failure:
+                # the upstream answered, so a running trial counts as successful
+                if self._state == self.HALF_OPEN:
+                    self._state = self.CLOSED
+                    self._failures = 0
+                self._trial_running = False
+                return
+            self._failures += 1
+            if (
+                self._state == self.HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                if self._state != self.OPEN:
+                    logger.warning("Circuit breaker opened after: %s", error)
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+def circuit_breaker(breaker: CircuitBreaker) -> Callable[[Callable], Callable]:
+    """
+    A decorator that stops calling a function while it keeps failing.
+    Works with both regular and coroutine functions, and one breaker
+    can be shared by several functions and threads.
+
+    Args:
+        breaker (CircuitBreaker): The breaker guarding the calls.
+
+    Returns:
+        Callable[[Callable], Callable]: The decorator adding the circuit breaker.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                breaker.before_call()
+                try:
+                    result = await func(*args, **kwargs)
                 except Exception as e:
-                    logger.warning(
-                        "Attempt %d/%d failed: %s. Retrying in %f seconds...",
-                        i + 1,
-                        retries,
-                        e,
-                        delay,
-                    )
-                    if i < retries - 1:
-                        time.sleep(delay)
-                    else:
-                        logger.error("All %d attempts failed: %s", retries, e)
-                        raise e
+                    breaker.record_error(e)
+                    raise e
+                except BaseException:
+                    # cancelled or interrupted, e.g. asyncio.CancelledError
+                    breaker.release()
+                    raise
+                breaker.record_success()
+                return result
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            breaker.before_call()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                breaker.record_error(e)
+                raise e
+            except BaseException:
+                # cancelled or interrupted, e.g. asyncio.CancelledError
+                breaker.release()
+                raise
+            breaker.record_success()
+            return result
 
         return wrapper
 
@@ -0,0 +1,239 @@
+"""
+This module provides memory-bounded membership tracking for long crawls.
+SeenSet remembers items exactly up to a threshold and then switches to a
+Bloom filter, whose size does not depend on the items. CrawlGuard uses two
+of them to detect token cycles and re-served products in a token chain.
+"""
+
+import hashlib
+import math
+from typing import Hashable
+
+from app.metrics import registry
+from app.models import Product
+from app.utils import load_config
+
+config = load_config("config/config.yml")
+
+
+class BloomFilter:
+    """
+    A Bloom filter: a bit array that answers "possibly seen" or "never seen".
+    Items are never forgotten, and an unseen item is reported as seen with
+    a probability of about `error_rate` once `capacity` items were added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        """
+        Args:
+            capacity (int): Number of items the filter is sized for.
+            error_rate (float): False positive probability at full capacity.
+        """
+        self.n_bits = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.n_hashes = max(1, round(self.n_bits / capacity * math.log(2)))
+        self._bits = bytearray(-(-self.n_bits // 8))
+
+    def _positions(self, item: Hashable) -> list[int]:
+        """
+        Bit positions of an item, derived from one digest by double hashing.
+        """
+        digest = hashlib.blake2b(repr(item).encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.n_bits for i in range(self.n_hashes)]
+
+    def add(self, item: Hashable) -> bool:
+        """
+        Add an item.
+
+        Args:
+            item (Hashable): The item.
+
+        Returns:
+            bool: True if the item was possibly added before.
+        """
+        seen = True
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self._bits[byte] >> bit & 1:
+                seen = False
+                self._bits[byte] |= 1 << bit
+        return seen
+
+    def __contains__(self, item: Hashable) -> bool:
+        return all(
+            self._bits[position // 8] >> (position % 8) & 1
+            for position in self._positions(item)
+        )
+
+
+class SeenSet:
+    """
+    Items seen so far. Up to `exact_threshold` items are kept in a set; beyond
+    that they are moved into a Bloom filter, which bounds the memory at the cost
+    of rare false "seen" answers.
+    """
+
+    def __init__(
+        self,
+        exact_threshold: int = config["dedup"]["exact_threshold"],
+        capacity: int = config["dedup"]["capacity"],
+        error_rate: float = config["dedup"]["error_rate"],
+    ) -> None:
+        """
+        Args:
+            exact_threshold (int): Number of items tracked exactly.
+            capacity (int): Number of items the Bloom filter is sized for.
+            error_rate (float): False positive probability of the Bloom filter.
+        """
+        self.exact_threshold = exact_threshold
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._exact: set[Hashable] = set()
+        self._bloom: BloomFilter | None = None
+
+    @property
+    def exact(self) -> bool:
+        """
+        bool: Whether the answers are still exact.
+        """
+        return self._bloom is None
+
+    def add(self, item: Hashable) -> bool:
+        """
+        Add an item.
+
+        Args:
+            item (Hashable): The item.
+
+        Returns:
+            bool: True if the item was seen before (possibly, once not exact).
+        """
+        if self._bloom is not None:
+            return self._bloom.add(item)
+        if item in self._exact:
+            return True
+        self._exact.add(item)
+        if len(self._exact) > self.exact_threshold:
+            self._bloom = BloomFilter(self.capacity, self.error_rate)
+            for seen in self._exact:
+                self._bloom.add(seen)
+            self._exact = set()
+        return False
+
+    def __contains__(self, item: Hashable) -> bool:
+        if self._bloom is not None:
+            return item in self._bloom
+        return item in self._exact
+
+
+class CrawlGuard:
+    """
+    Watches a token chain for tokens that were already followed (a cycle)
+    and products that were already served (a duplicate).
+
+    While the trackers are exact, a repeated token is a cycle and a repeated
+    product id a duplicate. A hit of a Bloom filter may be a false positive, so
+    once the tokens are tracked by one, a repeated token only ends the chain
+    after the next `confirmations` tokens, and the products fetched meanwhile,
+    were all seen before too. The products are held back until the suspicion is
+    confirmed or cleared. A Bloom hit on a product id alone never drops a product.
+
+    Attributes:
+        cycles (int): Number of cycles found.
+        duplicates (int): Number of re-served products found.
+        false_alarms (int): Number of suspected cycles cleared by a new token or product.
+    """
+
+    def __init__(
+        self,
+        tokens: SeenSet | None = None,
+        ids: SeenSet | None = None,
+        confirmations: int = config["dedup"]["confirmations"],
+    ) -> None:
+        """
+        Args:
+            tokens (SeenSet | None): Tracker of followed tokens; a new one if None.
+            ids (SeenSet | None): Tracker of served product ids; a new one if None.
+            confirmations (int): Number of further repeated tokens that confirm
+                a cycle suspected from a Bloom filter hit.
+        """
+        self.tokens = tokens if tokens is not None else SeenSet()
+        self.ids = ids if ids is not None else SeenSet()
+        self.confirmations = confirmations
+        self.cycles = 0
+        self.duplicates = 0
+        self.false_alarms = 0
+        self._suspected = 0
+        self._pending: list[Product] = []
+
+    def _clear_suspicion(self) -> None:
+        if self._suspected:
+            self._suspected = 0
+            self.false_alarms += 1
+
+    def _skip(self, count: int) -> None:
+        self.duplicates += count
+        registry.counter("crawl_duplicates_total", "Re-served products.").inc(count)
+
+    def is_cycle(self, token: str) -> bool:
+        """
+        Record a token about to be followed.
+
+        Args:
+            token (str): The token.
+
+        Returns:
+            bool: True if the chain loops: the token was followed before, and,
+            if that is known only from a Bloom filter, so were the tokens after it.
+        """
+        exact = self.tokens.exact
+        if not self.tokens.add(token):
+            self._clear_suspicion()
+            return False
+        if not exact:
+            self._suspected += 1
+            if self._suspected <= self.confirmations:
+                return False
+            self._suspected = 0
+            self._skip(len(self._pending))
+            self._pending = []
+        self.cycles += 1
+        registry.counter("crawl_cycles_total", "Repeated product tokens.").inc()
+        return True
+
+    def admit(self, product: Product) -> list[Product]:
+        """
+        Record a served product.
+
+        Args:
+            product (Product): The product.
+
+        Returns:
+            list[Product]: The products to pass on: none while a suspected cycle
+            is being confirmed, otherwise the held back products followed by
+            this one, unless it is known to have been served before.
+        """
+        exact = self.ids.exact
+        seen = self.ids.add(product.product_id)
+        if self._suspected:
+            if seen:
+                self._pending.append(product)
+                return []
+            self._clear_suspicion()
+        if seen and exact:
+            self._skip(1)
+            return self.flush()
+        return self.flush() + [product]
+
+    def flush(self) -> list[Product]:
+        """
+        Release the held back products, e.g. when the chain ends.
+
+        Returns:
+            list[Product]: The products held back while a cycle was suspected.
+        """
+        pending, self._pending = self._pending, []
+        return pending
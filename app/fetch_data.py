@@ -1,12 +1,31 @@
 """
 This module provides functions to fetch products from an API.
-It includes functionality to fetch a single product as well as all products.
+It includes functionality to fetch a single product as well as all products,
+a streaming mode that fetches in a background thread, and an asyncio variant
+that crawls several independent token chains at once.
 """
 
+import asyncio
+import queue
+import threading
+from typing import Any, Iterator
+
 import requests
+from requests.adapters import HTTPAdapter
 
-from app.decorators import retry
+from app.checkpoint import Checkpoint
+from app.dedup import CrawlGuard
+from app.decorators import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    TokenBucket,
+    circuit_breaker,
+    rate_limit,
+    retry,
+)
 from app.logger import get_logger
+from app.metrics import registry
 from app.models import Product
 from app.utils import load_config
 
@@ -14,52 +33,484 @@ logger = get_logger(__name__)
 
 config = load_config("config/config.yml")
 
+_END_OF_STREAM = object()
+
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Decide whether a failed request is worth retrying. Connection problems,
+    timeouts and temporary HTTP statuses are; other HTTP errors such as 404 are not.
+
+    Args:
+        error (Exception): The error raised while fetching a product.
+
+    Returns:
+        bool: True if the request should be retried.
+    """
+    if isinstance(error, requests.HTTPError):
+        response = error.response
+        return response is None or response.status_code in RETRYABLE_STATUS_CODES
+    return True
+
+
+# shared by the sync and async crawlers and all their threads
+api_retry_policy = RetryPolicy(
+    backoff=config["api"]["backoff"],
+    max_delay=config["api"]["max_delay"],
+    jitter=config["api"]["jitter"],
+    budget=config["api"]["budget"],
+)
+api_rate_limiter = TokenBucket(
+    rate=config["api"]["rate_limit"], capacity=config["api"]["burst"]
+)
+api_circuit_breaker = CircuitBreaker(
+    failure_threshold=config["api"]["failure_threshold"],
+    recovery_timeout=config["api"]["recovery_timeout"],
+    failure_on=(requests.RequestException,),
+    failure_if=is_retryable,
+)
 
-@retry(retries=config["api"]["retries"], delay=config["api"]["delay"])
-def fetch_product(api_url: str, token: str | None = None) -> Product:
+
+def create_session(
+    pool_connections: int = config["api"]["pool_connections"],
+    pool_maxsize: int = config["api"]["pool_maxsize"],
+) -> requests.Session:
+    """
+    Create a pooled, keep-alive HTTP session for talking to the API.
+
+    Args:
+        pool_connections (int): Number of host connection pools to cache.
+        pool_maxsize (int): Maximum number of connections kept alive per pool.
+
+    Returns:
+        requests.Session: Session with the tuned adapter mounted for HTTP and HTTPS.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(
+        {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+    )
+    return session
+
+
+@retry(
+    retries=config["api"]["retries"],
+    delay=config["api"]["delay"],
+    retry_on=(requests.RequestException, CircuitOpenError),
+    retry_if=is_retryable,
+    policy=api_retry_policy,
+)
+@circuit_breaker(api_circuit_breaker)
+@rate_limit(api_rate_limiter)
+def fetch_product(
+    api_url: str, token: str | None = None, session: requests.Session | None = None
+) -> Product:
     """
     Fetch a single product from the API.
 
     Args:
         api_url (str): The URL of the API endpoint.
         token (str | None): The token for the next product (for pagination), if any.
+        session (requests.Session | None): Session to reuse connections from.
+            If None, a one-off request is made.
 
     Returns:
         Product: The product data converted to a Product model.
     """
-    logger.info("Fetching data for token %s.", token)
+    logger.info("Fetching data for token %s.", token, extra={"sampled": True})
     params = {"next_product_token": token} if token else {}
-    response = requests.get(api_url, params=params, timeout=config["api"]["timeout"])
+    http = session if session is not None else requests
+    with registry.histogram(
+        "fetch_request_seconds", "Latency of product API requests."
+    ).time():
+        response = http.get(api_url, params=params, timeout=config["api"]["timeout"])
+    registry.counter(
+        "fetch_responses_total",
+        "Product API responses by status code.",
+        status=response.status_code,
+    ).inc()
     if response.status_code == 503:
         logger.warning("Service unavailable (503). Retrying...")
         response.raise_for_status()
     response.raise_for_status()
-    product_data = response.json()
-    logger.info("Data accessed.")
-    return Product(**product_data)
+    logger.info("Data accessed.", extra={"sampled": True})
+    # validate the raw body in one pass, without an intermediate dict
+    return Product.model_validate_json(response.content)
 
 
-def fetch_all_products(api_url: str, token: str = None) -> list[Product]:
+def _is_cycle(guard: CrawlGuard, token: str) -> bool:
+    """
+    Check a token before following it, logging a cycle.
+    """
+    if guard.is_cycle(token):
+        logger.warning("Token %s was already followed; stopping the chain.", token)
+        return True
+    return False
+
+
+def _admit(guard: CrawlGuard, product: Product) -> list[Product]:
+    """
+    Check a fetched product, logging a duplicate. When the chain ends with it,
+    the products held back by a suspected cycle are released too.
+    """
+    duplicates = guard.duplicates
+    admitted = guard.admit(product)
+    if guard.duplicates > duplicates:
+        logger.warning(
+            "Product %s was already served; skipping it.",
+            product.product_id,
+            extra={"sampled": True},
+        )
+    if not product.next_product_token:
+        admitted += guard.flush()
+    return admitted
+
+
+def _report(guard: CrawlGuard) -> None:
+    """
+    Log the cycles and duplicates found in a chain, if any.
+    """
+    if guard.cycles or guard.duplicates:
+        logger.warning(
+            "Chain had %d repeated tokens and %d duplicate products.",
+            guard.cycles,
+            guard.duplicates,
+        )
+    if guard.false_alarms:
+        logger.info(
+            "Chain had %d suspected cycles that were Bloom filter false positives.",
+            guard.false_alarms,
+        )
+
+
+def _resume(
+    checkpoint: Checkpoint, guard: CrawlGuard, token: str | None
+) -> tuple[list[Product], str | None, bool]:
+    """
+    Load the products saved in a checkpoint and record them in the guard.
+
+    Returns:
+        tuple[list[Product], str | None, bool]: The saved products, the token to
+        continue from and whether the saved chain is already complete.
+    """
+    saved = checkpoint.load()
+    for product in saved:
+        guard.ids.add(product.product_id)
+    # the tokens the saved products were fetched with
+    for product in saved[:-1]:
+        guard.tokens.add(product.next_product_token)
+    if not saved:
+        return saved, token, False
+    token = saved[-1].next_product_token
+    if not token:
+        return saved, None, True
+    logger.info("Resuming crawl from token %s.", token)
+    return saved, token, False
+
+
+def iter_products(
+    api_url: str,
+    token: str | None = None,
+    session: requests.Session | None = None,
+    checkpoint: Checkpoint | None = None,
+) -> Iterator[Product]:
+    """
+    Lazily follow the product token chain, yielding products as they are fetched.
+
+    With a checkpoint, products saved by an interrupted run are yielded first and
+    the crawl resumes from the token of the last saved product. Every newly
+    fetched product is appended to the checkpoint.
+
+    A token that was already followed ends the chain instead of crawling it
+    again, and a product whose id was already served is skipped; see CrawlGuard
+    for how long chains are checked once they outgrow exact tracking.
+
+    Args:
+        api_url (str): The URL of the API endpoint.
+        token (str | None): The product token to start from, if there is nothing to resume.
+        session (requests.Session | None): Session shared by all requests of the chain.
+            If None, a new pooled session is created and closed afterwards.
+        checkpoint (Checkpoint | None): Checkpoint to resume from and append to.
+
+    Yields:
+        Product: The next product of the chain.
+    """
+    guard = CrawlGuard()
+    saved: list[Product] = []
+    complete = False
+    if checkpoint is not None:
+        saved, token, complete = _resume(checkpoint, guard, token)
+
+    owns_session = session is None
+    if session is None:
+        session = create_session()
+
+    fetched = registry.counter(
+        "products_fetched_total", "Products fetched from the API."
+    )
+    chain_length = registry.gauge(
+        "chain_length", "Products in the last crawled token chain."
+    )
+    chain_length.set(len(saved))
+
+    try:
+        yield from saved
+        while not complete and (token is None or not _is_cycle(guard, token)):
+            product = fetch_product(api_url, token, session)
+            fetched.inc()
+            token = product.next_product_token
+            for admitted in _admit(guard, product):
+                chain_length.inc()
+                if checkpoint is not None:
+                    checkpoint.append(admitted)
+                yield admitted
+            if not token:
+                break
+    finally:
+        _report(guard)
+        if checkpoint is not None:
+            checkpoint.close()
+        if owns_session:
+            session.close()
+
+
+def fetch_all_products(
+    api_url: str,
+    token: str | None = None,
+    session: requests.Session | None = None,
+    checkpoint: Checkpoint | None = None,
+) -> list[Product]:
     """
     Fetch all products from the API.
 
     Args:
         api_url (str): The URL of the API endpoint.
-        token (str): The product token.
+        token (str | None): The product token.
+        session (requests.Session | None): Session shared by all requests of the chain.
+            If None, a new pooled session is created and closed afterwards.
+        checkpoint (Checkpoint | None): Checkpoint to resume from and append to.
 
     Returns:
         list[Product]: A list of all products fetched from the API.
     """
-    products = []
     logger.info("Fetching products.")
 
-    while True:
-        product = fetch_product(api_url, token)
-        products.append(product)
+    products = list(iter_products(api_url, token, session, checkpoint))
+
+    logger.info("All products have been fetched.")
+
+    return products
+
+
+def stream_products(
+    api_url: str,
+    token: str | None = None,
+    session: requests.Session | None = None,
+    queue_size: int = config["stream"]["queue_size"],
+    checkpoint: Checkpoint | None = None,
+) -> Iterator[Product]:
+    """
+    Fetch products in a background thread and yield them through a bounded queue.
+
+    The crawl keeps running while the caller processes products, and at most
+    `queue_size` products are buffered at any time. An error raised by the
+    fetcher is re-raised in the consuming thread.
+
+    Args:
+        api_url (str): The URL of the API endpoint.
+        token (str | None): The product token to start from.
+        session (requests.Session | None): Session shared by all requests of the chain.
+        queue_size (int): Maximum number of fetched products waiting to be consumed.
+        checkpoint (Checkpoint | None): Checkpoint to resume from and append to.
+
+    Yields:
+        Product: The next product of the chain.
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for product in iter_products(api_url, token, session, checkpoint):
+                if not put(product):
+                    return
+        except BaseException as e:  # pylint: disable=broad-exception-caught
+            put(e)
+        finally:
+            # the consumer waits without a timeout, so it must always be woken up
+            put(_END_OF_STREAM)
+
+    logger.info("Streaming products.")
+    producer = threading.Thread(target=produce, name="product-fetcher", daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END_OF_STREAM:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+    logger.info("All products have been fetched.")
+
+
+@retry(
+    retries=config["api"]["retries"],
+    delay=config["api"]["delay"],
+    retry_on=(requests.RequestException, CircuitOpenError),
+    retry_if=is_retryable,
+    policy=api_retry_policy,
+)
+@circuit_breaker(api_circuit_breaker)
+@rate_limit(api_rate_limiter)
+async def fetch_product_async(
+    api_url: str, token: str | None = None, session: requests.Session | None = None
+) -> Product:
+    """
+    Fetch a single product from the API without blocking the event loop.
+
+    The blocking request is run in a worker thread, so many chains can wait
+    on the network at the same time.
+
+    Args:
+        api_url (str): The URL of the API endpoint.
+        token (str | None): The token for the next product (for pagination), if any.
+        session (requests.Session | None): Session to reuse connections from.
+
+    Returns:
+        Product: The product data converted to a Product model.
+    """
+    logger.info("Fetching data for token %s.", token, extra={"sampled": True})
+    params = {"next_product_token": token} if token else {}
+    http = session if session is not None else requests
+    with registry.histogram(
+        "fetch_request_seconds", "Latency of product API requests."
+    ).time():
+        response = await asyncio.to_thread(
+            http.get, api_url, params=params, timeout=config["api"]["timeout"]
+        )
+    registry.counter(
+        "fetch_responses_total",
+        "Product API responses by status code.",
+        status=response.status_code,
+    ).inc()
+    if response.status_code == 503:
+        logger.warning("Service unavailable (503). Retrying...")
+    response.raise_for_status()
+    logger.info("Data accessed.", extra={"sampled": True})
+    # validate the raw body in one pass, without an intermediate dict
+    return Product.model_validate_json(response.content)
+
+
+async def fetch_all_products_async(
+    api_url: str,
+    token: str | None = None,
+    session: requests.Session | None = None,
+) -> list[Product]:
+    """
+    Fetch all products of a single token chain from the API. Like iter_products,
+    it stops at a repeated token and skips re-served products.
+
+    Args:
+        api_url (str): The URL of the API endpoint.
+        token (str | None): The product token to start the chain from.
+        session (requests.Session | None): Session to reuse connections from.
+
+    Returns:
+        list[Product]: A list of all products of the chain.
+    """
+    products = []
+
+    fetched = registry.counter(
+        "products_fetched_total", "Products fetched from the API."
+    )
+
+    guard = CrawlGuard()
+    while token is None or not _is_cycle(guard, token):
+        product = await fetch_product_async(api_url, token, session)
+        fetched.inc()
         token = product.next_product_token
+        products += _admit(guard, product)
         if not token:
             break
+    _report(guard)
+
+    return products
+
+
+async def fetch_chains_async(
+    chains: list[tuple[str, str | None]],
+    concurrency: int = config["api"]["concurrency"],
+    session: requests.Session | None = None,
+) -> list[Product]:
+    """
+    Crawl several independent token chains concurrently and merge the results.
+
+    Args:
+        chains (list[tuple[str, str | None]]): Pairs of (API URL, seed token) to crawl.
+        concurrency (int): Maximum number of chains crawled at the same time.
+        session (requests.Session | None): Session shared by all chains. If None,
+            a new pooled session is created and closed afterwards.
+
+    Returns:
+        list[Product]: Products of all chains, in the order the chains were given.
+    """
+    logger.info("Fetching products from %d chains.", len(chains))
+    semaphore = asyncio.Semaphore(concurrency)
+    owns_session = session is None
+    if session is None:
+        session = create_session(
+            pool_maxsize=max(concurrency, config["api"]["pool_maxsize"])
+        )
+
+    async def crawl(api_url: str, token: str | None) -> list[Product]:
+        async with semaphore:
+            return await fetch_all_products_async(api_url, token, session)
+
+    try:
+        results = await asyncio.gather(
+            *(crawl(api_url, token) for api_url, token in chains)
+        )
+    finally:
+        if owns_session:
+            session.close()
 
     logger.info("All products have been fetched.")
 
-    return products
+    return [product for chain_products in results for product in chain_products]
+
+
+def fetch_chains(
+    chains: list[tuple[str, str | None]],
+    concurrency: int = config["api"]["concurrency"],
+    session: requests.Session | None = None,
+) -> list[Product]:
+    """
+    Blocking entry point for fetch_chains_async.
+
+    Args:
+        chains (list[tuple[str, str | None]]): Pairs of (API URL, seed token) to crawl.
+        concurrency (int): Maximum number of chains crawled at the same time.
+        session (requests.Session | None): Session shared by all chains.
+
+    Returns:
+        list[Product]: Products of all chains, in the order the chains were given.
+    """
+    return asyncio.run(fetch_chains_async(chains, concurrency, session))
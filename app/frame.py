@@ -0,0 +1,248 @@
+"""
+This module provides the ProductFrame, a columnar NumPy representation of products.
+Categories and currencies are stored as integer codes with lookup tables, so
+counts, sums, maxima and currency normalisation run as vectorised operations
+instead of per-object loops.
+"""
+
+from typing import Iterable, Iterator, NamedTuple, Sequence
+
+import numpy as np
+
+from app.calculations import CategoryAggregate, ProductAggregate, rate_cache
+from app.models import Product
+
+
+class ProductFrame:
+    """
+    Products stored column by column.
+
+    Attributes:
+        product_ids (np.ndarray): Product ids (int64).
+        prices (np.ndarray): Prices in their original currencies (float64).
+        category_codes (np.ndarray): Index of each product's category in `categories`.
+        currency_codes (np.ndarray): Index of each product's currency in `currencies`.
+        product_names (Sequence[str]): Product names.
+        categories (list[str]): Category names, in order of first appearance.
+        currencies (list[str]): Currency codes, in order of first appearance.
+    """
+
+    def __init__(
+        self,
+        product_ids: np.ndarray,
+        prices: np.ndarray,
+        category_codes: np.ndarray,
+        currency_codes: np.ndarray,
+        product_names: Sequence[str],
+        categories: list[str],
+        currencies: list[str],
+    ) -> None:
+        self.product_ids = product_ids
+        self.prices = prices
+        self.category_codes = category_codes
+        self.currency_codes = currency_codes
+        self.product_names = product_names
+        self.categories = categories
+        self.currencies = currencies
+
+    @classmethod
+    def from_products(cls, products: Iterable[Product]) -> "ProductFrame":
+        """
+        Build a frame from a list or a stream of products.
+
+        Args:
+            products (Iterable[Product]): The products to store.
+
+        Returns:
+            ProductFrame: The columnar representation of the products.
+        """
+        categories: dict[str, int] = {}
+        currencies: dict[str, int] = {}
+        product_ids, prices, category_codes, currency_codes, names = [], [], [], [], []
+        for product in products:
+            product_ids.append(product.product_id)
+            prices.append(product.price)
+            category_codes.append(
+                categories.setdefault(product.category, len(categories))
+            )
+            currency_codes.append(
+                currencies.setdefault(product.currency, len(currencies))
+            )
+            names.append(product.product_name)
+
+        return cls(
+            np.array(product_ids, dtype=np.int64),
+            np.array(prices, dtype=np.float64),
+            np.array(category_codes, dtype=np.int32),
+            np.array(currency_codes, dtype=np.int32),
+            names,
+            list(categories),
+            list(currencies),
+        )
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    def __iter__(self) -> Iterator[Product]:
+        return (self.product(index) for index in range(len(self)))
+
+    def product(self, index: int) -> Product:
+        """
+        Rebuild the Product stored at a row. Tokens are not stored in the frame,
+        so next_product_token is None.
+
+        Args:
+            index (int): The row index.
+
+        Returns:
+            Product: The product at the row.
+        """
+        return Product(
+            product_id=int(self.product_ids[index]),
+            product_name=self.product_names[index],
+            category=self.categories[self.category_codes[index]],
+            price=float(self.prices[index]),
+            currency=self.currencies[self.currency_codes[index]],
+            next_product_token=None,
+        )
+
+    def prices_in(self, desired_currency: str) -> np.ndarray:
+        """
+        Convert all prices to one currency, looking up one rate per currency.
+
+        Args:
+            desired_currency (str): The desired currency code (e.g., "PLN").
+
+        Returns:
+            np.ndarray: The prices in the desired currency.
+        """
+        rates = np.array(
+            [
+                rate_cache.get_rate(currency, desired_currency)
+                for currency in self.currencies
+            ],
+            dtype=np.float64,
+        )
+        return self.prices * rates[self.currency_codes]
+
+    def counts_per_category(self) -> dict[str, int]:
+        """
+        Returns:
+            dict[str, int]: Number of products in each category.
+        """
+        counts = np.bincount(self.category_codes, minlength=len(self.categories))
+        return dict(zip(self.categories, counts.tolist()))
+
+    def to_aggregate(self, desired_currency: str = "PLN") -> ProductAggregate:
+        """
+        Compute the statistics of every category with vectorised group-by operations.
+
+        Args:
+            desired_currency (str): The currency prices are normalised to.
+
+        Returns:
+            ProductAggregate: The same statistics ProductAggregate collects
+            from a pass over the products.
+        """
+        prices = self.prices_in(desired_currency)
+        partials = CategoryPartials.compute(
+            self.category_codes, prices, len(self.categories)
+        )
+        return self.aggregate_from_partials(partials)
+
+    def aggregate_from_partials(self, partials: "CategoryPartials") -> ProductAggregate:
+        """
+        Turn per-category partial results over the rows of this frame into
+        the statistics of every category.
+
+        Args:
+            partials (CategoryPartials): Partial results covering every row.
+
+        Returns:
+            ProductAggregate: The statistics of every category.
+        """
+        aggregate = ProductAggregate(count=len(self))
+        for code, name in enumerate(self.categories):
+            row = int(partials.max_rows[code])
+            if row < 0:
+                continue
+            aggregate.categories[name] = CategoryAggregate(
+                count=int(partials.counts[code]),
+                price_sum=float(partials.sums[code]),
+                max_price=float(partials.max_prices[code]),
+                most_expensive=self.product(row),
+            )
+        return aggregate
+
+
+class CategoryPartials(NamedTuple):
+    """
+    Per-category counts, price sums and most expensive rows of a range of
+    frame rows. Partials of different ranges can be merged.
+
+    Attributes:
+        counts (np.ndarray): Number of rows in each category.
+        sums (np.ndarray): Sum of the prices in each category.
+        max_prices (np.ndarray): Highest price in each category, -inf if empty.
+        max_rows (np.ndarray): Row of the first product with the highest price
+            in each category, -1 if empty.
+    """
+
+    counts: np.ndarray
+    sums: np.ndarray
+    max_prices: np.ndarray
+    max_rows: np.ndarray
+
+    @classmethod
+    def compute(
+        cls,
+        category_codes: np.ndarray,
+        prices: np.ndarray,
+        n_categories: int,
+        offset: int = 0,
+    ) -> "CategoryPartials":
+        """
+        Compute the partials of a range of rows with vectorised group-by operations.
+
+        Args:
+            category_codes (np.ndarray): Category codes of the rows.
+            prices (np.ndarray): Prices of the rows, in one currency.
+            n_categories (int): Number of categories in the frame.
+            offset (int): Index of the first row in the frame.
+
+        Returns:
+            CategoryPartials: The partials of the rows.
+        """
+        counts = np.bincount(category_codes, minlength=n_categories)
+        sums = np.bincount(category_codes, weights=prices, minlength=n_categories)
+        max_prices = np.full(n_categories, -np.inf)
+        max_rows = np.full(n_categories, -1, dtype=np.int64)
+        if len(category_codes):
+            # sort by category, then by descending price; the sort is stable, so
+            # the first row of each group is the first most expensive product in it
+            order = np.lexsort((-prices, category_codes))
+            sorted_codes = category_codes[order]
+            starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+            present = sorted_codes[starts]
+            max_prices[present] = prices[order[starts]]
+            max_rows[present] = order[starts] + offset
+        return cls(counts, sums, max_prices, max_rows)
+
+    def merge(self, other: "CategoryPartials") -> "CategoryPartials":
+        """
+        Combine with the partials of the rows that follow these ones.
+        Ties keep the earlier row, as a single pass over the rows would.
+
+        Args:
+            other (CategoryPartials): Partials of later rows.
+
+        Returns:
+            CategoryPartials: The partials of both ranges.
+        """
+        later = other.max_prices > self.max_prices
+        return CategoryPartials(
+            self.counts + other.counts,
+            self.sums + other.sums,
+            np.where(later, other.max_prices, self.max_prices),
+            np.where(later, other.max_rows, self.max_rows),
+        )
@@ -1,15 +1,110 @@
 """
 This module provides a function to get a configured logger instance.
 It sets up logging with a specific format and logging level.
+
+Records are handed to a queue and written by a background listener thread,
+so logging never blocks the caller on I/O. High-volume messages can be
+sampled, and the output can optionally be structured JSON.
 """
 
+import atexit
+import json
 import logging
+import queue
+import threading
 from logging import Logger
+from logging.handlers import QueueHandler, QueueListener
+
+from app.utils import load_config
+
+config = load_config("config/config.yml")
+
+FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_queue_handler: QueueHandler | None = None
+_listener: QueueListener | None = None
+_setup_lock = threading.Lock()
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Lets through only one of every `every` records of each sampled message.
+    A record is sampled when it is logged with `extra={"sampled": True}`;
+    other records always pass.
+    """
+
+    def __init__(self, every: int) -> None:
+        """
+        Args:
+            every (int): Keep one of this many records of each sampled message.
+        """
+        super().__init__()
+        self.every = every
+        self._counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "sampled", False) or self.every <= 1:
+            return True
+        with self._lock:
+            count = self._counts.get(record.msg, 0)
+            self._counts[record.msg] = count + 1
+        return count % self.every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "name": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data)
+
+
+def setup_logging(
+    json_format: bool = config["logging"]["json"],
+    sample_every: int = config["logging"]["sample_every"],
+) -> QueueHandler:
+    """
+    Set up the shared queue handler and its listener thread. Only the first call
+    has an effect; later calls return the handler created by the first one.
+
+    Args:
+        json_format (bool): Whether to write records as JSON lines.
+        sample_every (int): Keep one of this many records of each sampled message.
+
+    Returns:
+        QueueHandler: The handler loggers should send their records to.
+    """
+    global _queue_handler, _listener  # pylint: disable=global-statement
+    with _setup_lock:
+        if _queue_handler is None:
+            stream_handler = logging.StreamHandler()
+            stream_handler.setFormatter(
+                JsonFormatter() if json_format else logging.Formatter(FORMAT)
+            )
+            log_queue: queue.Queue = queue.Queue(-1)
+            _queue_handler = QueueHandler(log_queue)
+            _queue_handler.addFilter(SamplingFilter(sample_every))
+            _listener = QueueListener(log_queue, stream_handler)
+            _listener.start()
+            # write out the queued records before the process exits
+            atexit.register(_listener.stop)
+        return _queue_handler
 
 
 def get_logger(name: str) -> Logger:
     """
-    Get a configured logger.
+    Get a configured logger. Calling it again for the same name
+    does not add another handler.
 
     Args:
         name (str): The name of the logger.
@@ -18,11 +113,8 @@ def get_logger(name: str) -> Logger:
         Logger: Configured logger instance.
     """
     logger = logging.getLogger(name)
-    handler = logging.StreamHandler()
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    handler = setup_logging()
+    if handler not in logger.handlers:
+        logger.addHandler(handler)
     logger.setLevel(logging.INFO)
     return logger
@@ -4,27 +4,55 @@ It loads environment variables, fetches product data from an API,
 and answers a series of questions about the products.
 """
 
+import argparse
 import os
+from typing import Iterable
 
 from dotenv import load_dotenv
 
-from app.calculations import (
-    count_products,
-    count_products_per_category,
-    get_average_price_for_category,
-    get_most_expensive_in_category,
-)
-from app.fetch_data import fetch_all_products
+from app.calculations import ProductAggregate
+from app.checkpoint import Checkpoint
+from app.fetch_data import fetch_all_products, fetch_chains, stream_products
+from app.frame import ProductFrame
+from app.metrics import Histogram, registry
 from app.models import Product
-from app.utils import write_and_print
+from app.parallel import aggregate_parallel
+from app.profiling import profile_stage
+from app.utils import load_config, write_and_print
 
+config = load_config("config/config.yml")
 
-def answer_questions(products: list[Product], file_name: str) -> None:
+
+def calculation_timer(name: str) -> Histogram:
+    """
+    Get the histogram timing a calculation of answer_questions.
+
+    Args:
+        name (str): The calculation name.
+
+    Returns:
+        Histogram: The histogram of the calculation's durations.
+    """
+    return registry.histogram(
+        "calculation_seconds", "Duration of the calculations.", calculation=name
+    )
+
+
+def answer_questions(
+    products: Iterable[Product] | ProductFrame | ProductAggregate, file_name: str
+) -> None:
     """
     Answer a series of questions about a list of products. Print them and save into file.
 
+    The products are consumed in a single pass, so a stream of products
+    is answered while it is still being fetched. A ProductFrame is
+    summarised with vectorised operations instead, and a ProductAggregate
+    computed beforehand is answered directly.
+
     Args:
-        products (list[Product]): A list of Product objects to analyze.
+        products (Iterable[Product] | ProductFrame | ProductAggregate): A list or
+            a stream of Product objects, a ProductFrame or a ProductAggregate
+            to analyze.
 
     Prints:
         - Total number of products.
@@ -32,13 +60,24 @@ def answer_questions(products: list[Product], file_name: str) -> None:
         - Most expensive product in the 'Fashion' category.
         - Average price of products in the 'Toys & Games' category.
     """
+    # for a stream this includes waiting for the products to be fetched
+    with calculation_timer("aggregate").time():
+        if isinstance(products, ProductAggregate):
+            aggregate = products
+        elif isinstance(products, ProductFrame):
+            aggregate = products.to_aggregate()
+        else:
+            aggregate = ProductAggregate().update(products)
+
     with open(file_name, "w", encoding="utf-8") as file:
         # 1. total number of products
-        products_count = count_products(products)
+        with calculation_timer("count_products").time():
+            products_count = aggregate.count
         write_and_print(file, f"1. Number of products: {products_count}.")
 
         # 2. products in each category
-        category_products_counts = count_products_per_category(products)
+        with calculation_timer("count_products_per_category").time():
+            category_products_counts = aggregate.counts_per_category()
         counts_to_print = "\n\t".join(
             [
                 f"In category '{category}' there are {number} products."
@@ -48,7 +87,8 @@ def answer_questions(products: list[Product], file_name: str) -> None:
         write_and_print(file, "2. " + counts_to_print)
 
         # 3. most expensive product in Fashion category
-        most_expensive_in_fashion = get_most_expensive_in_category(products, "Fashion")
+        with calculation_timer("get_most_expensive_in_category").time():
+            most_expensive_in_fashion = aggregate.most_expensive_in_category("Fashion")
         if most_expensive_in_fashion:
             write_and_print(
                 file,
@@ -59,7 +99,8 @@ def answer_questions(products: list[Product], file_name: str) -> None:
             write_and_print(file, "3. There are no products in 'Fashion' category.")
 
         # 4. average price in Toys & Games category
-        avg_price = get_average_price_for_category(products, "Toys & Games")
+        with calculation_timer("get_average_price_for_category").time():
+            avg_price = aggregate.average_price_for_category("Toys & Games")
         if avg_price:
             write_and_print(
                 file,
@@ -71,17 +112,132 @@ def answer_questions(products: list[Product], file_name: str) -> None:
             )
 
 
-def main() -> None:
+def summarise(
+    products: Iterable[Product], workers: int
+) -> Iterable[Product] | ProductAggregate:
+    """
+    Aggregate the products in parallel if more than one worker is configured.
+
+    Args:
+        products (Iterable[Product]): A list or a stream of products.
+        workers (int): Number of calculations workers.
+
+    Returns:
+        Iterable[Product] | ProductAggregate: The products themselves, or their
+        aggregate computed by worker processes.
+    """
+    if workers <= 1:
+        return products
+    frame = ProductFrame.from_products(products)
+    with calculation_timer("aggregate_parallel").time():
+        return aggregate_parallel(frame, workers=workers)
+
+
+def env_flag(name: str) -> bool:
+    """
+    Read a boolean switch from an environment variable.
+
+    Args:
+        name (str): The variable name.
+
+    Returns:
+        bool: True if the variable is set to anything but "", "0", "false" or "no".
+    """
+    return os.getenv(name, "").strip().lower() not in ("", "0", "false", "no")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """
+    Parse the command line. The profiling switches default to the PROFILE
+    and PROFILE_STACKS environment variables.
+
+    Args:
+        argv (list[str] | None): The arguments; sys.argv[1:] if None.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Fetch the products and answer questions about them."
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=env_flag("PROFILE"),
+        help="profile fetching and answering separately and write the reports "
+        "next to answers.txt",
+    )
+    parser.add_argument(
+        "--profile-stacks",
+        action="store_true",
+        default=env_flag("PROFILE_STACKS"),
+        help="also write flamegraph-compatible collapsed stacks (implies --profile)",
+    )
+    args = parser.parse_args(argv)
+    args.profile = args.profile or args.profile_stacks
+    return args
+
+
+def main(argv: list[str] | None = None) -> None:
     """
     Main function to load environment variables, fetch products, and answer questions.
+
+    Products of a single endpoint are streamed into the calculations while
+    they are fetched. They are also saved to a checkpoint, so a failed crawl
+    resumes where it stopped; the checkpoint is removed once the answers are
+    written. API_URL may hold several comma-separated endpoints; their token
+    chains are then crawled concurrently and merged. With more than one
+    calculations worker, the products are collected into a ProductFrame
+    whose shards are aggregated in parallel. The collected metrics are
+    exported at the end of the run.
+
+    In profiling mode the products are fetched first and answered afterwards,
+    so that each stage gets its own profile.
+
+    Args:
+        argv (list[str] | None): Command line arguments; sys.argv[1:] if None.
     """
     load_dotenv()
+    args = parse_args(argv)
     api_url = os.getenv("API_URL")
     if api_url is None:
         raise ValueError("API_URL not found in environment variables")
+    api_urls = [url.strip() for url in api_url.split(",") if url.strip()]
+    if not api_urls:
+        raise ValueError("API_URL does not contain any endpoint")
+
+    answers_file = "answers.txt"
+    output_dir = os.path.dirname(os.path.abspath(answers_file))
+    workers = config["calculations"]["workers"]
+    try:
+        products: Iterable[Product]
+        checkpoint = None
+        if len(api_urls) == 1:
+            checkpoint = Checkpoint(
+                config["checkpoint"]["path"],
+                config["checkpoint"]["batch_size"],
+                source=api_urls[0],
+            )
+
+        if args.profile:
+            with profile_stage("fetch", output_dir, args.profile_stacks):
+                if checkpoint is None:
+                    products = fetch_chains([(url, None) for url in api_urls])
+                else:
+                    products = fetch_all_products(api_urls[0], checkpoint=checkpoint)
+            with profile_stage("answer", output_dir, args.profile_stacks):
+                answer_questions(summarise(products, workers), answers_file)
+        else:
+            if checkpoint is None:
+                products = fetch_chains([(url, None) for url in api_urls])
+            else:
+                products = stream_products(api_urls[0], checkpoint=checkpoint)
+            answer_questions(summarise(products, workers), answers_file)
 
-    products = fetch_all_products(api_url)
-    answer_questions(products, "answers.txt")
+        if checkpoint is not None:
+            checkpoint.remove()
+    finally:
+        registry.write(config["metrics"]["path"])
 
 
 if __name__ == "__main__":
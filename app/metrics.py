@@ -0,0 +1,306 @@
+"""
+This module provides a lightweight, thread-safe metrics registry with counters,
+gauges and fixed-bucket histograms. The registry can be exported in the
+Prometheus text format or as JSON.
+"""
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Counter:
+    """
+    A value that only goes up.
+    """
+
+    kind = "counter"
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """
+        Args:
+            amount (float): The amount to add.
+        """
+        with self._lock:
+            self.value += amount
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Returns:
+            dict[str, Any]: The current value.
+        """
+        return {"value": self.value}
+
+
+class Gauge(Counter):
+    """
+    A value that can go up and down.
+    """
+
+    kind = "gauge"
+
+    def set(self, value: float) -> None:
+        """
+        Args:
+            value (float): The new value.
+        """
+        with self._lock:
+            self.value = value
+
+
+class Histogram:
+    """
+    Counts of observed values in fixed buckets, with their sum and count.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """
+        Args:
+            buckets (tuple[float, ...]): Sorted upper bounds of the buckets.
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """
+        Args:
+            value (float): The observed value, e.g. a duration in seconds.
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """
+        Observe the duration of a block of code, in seconds.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def cumulative_counts(self) -> list[int]:
+        """
+        Returns:
+            list[int]: Number of observations up to each bucket bound, then in total.
+        """
+        cumulative, total = [], 0
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Returns:
+            dict[str, Any]: Cumulative bucket counts, sum and count.
+        """
+        bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+        return {
+            "buckets": dict(zip(bounds, self.cumulative_counts())),
+            "sum": self.sum,
+            "count": self.count,
+        }
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...], **extra: str) -> str:
+    """
+    Format labels as a Prometheus label set, escaping the values.
+    """
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in pairs
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+Metric = Counter | Gauge | Histogram
+
+
+class MetricsRegistry:
+    """
+    Named metrics, each optionally split by labels. Asking for a metric
+    that does not exist yet creates it.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, dict[tuple, Metric]] = {}
+        self._kinds: dict[str, type[Metric]] = {}
+        self._help: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _get(
+        self,
+        kind: type[Metric],
+        name: str,
+        help_text: str,
+        labels: dict,
+        **kwargs: Any,
+    ) -> Any:
+        key = tuple(sorted((key, str(value)) for key, value in labels.items()))
+        with self._lock:
+            if self._kinds.setdefault(name, kind) is not kind:
+                raise ValueError(f"Metric {name} is already a {self._kinds[name].kind}")
+            if help_text:
+                self._help.setdefault(name, help_text)
+            series = self._metrics.setdefault(name, {})
+            metric = series.get(key)
+            if metric is None:
+                metric = series[key] = kind(**kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str = "", **labels: Any) -> Counter:
+        """
+        Get a counter.
+
+        Args:
+            name (str): The metric name.
+            help_text (str): Description of the metric.
+            **labels (Any): Labels identifying the series, e.g. status="200".
+
+        Returns:
+            Counter: The counter.
+        """
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str = "", **labels: Any) -> Gauge:
+        """
+        Get a gauge.
+
+        Args:
+            name (str): The metric name.
+            help_text (str): Description of the metric.
+            **labels (Any): Labels identifying the series.
+
+        Returns:
+            Gauge: The gauge.
+        """
+        return self._get(Gauge, name, help_text, labels)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str = "",
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        **labels: Any,
+    ) -> Histogram:
+        """
+        Get a histogram. The buckets are only used when the series is created.
+
+        Args:
+            name (str): The metric name.
+            help_text (str): Description of the metric.
+            buckets (tuple[float, ...]): Sorted upper bounds of the buckets.
+            **labels (Any): Labels identifying the series.
+
+        Returns:
+            Histogram: The histogram.
+        """
+        return self._get(Histogram, name, help_text, labels, buckets=buckets)
+
+    def clear(self) -> None:
+        """
+        Remove all metrics.
+        """
+        with self._lock:
+            self._metrics.clear()
+            self._kinds.clear()
+            self._help.clear()
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Returns:
+            dict[str, Any]: Every metric with its type, help and series.
+        """
+        with self._lock:
+            return {
+                name: {
+                    "type": self._kinds[name].kind,
+                    "help": self._help.get(name, ""),
+                    "series": [
+                        {"labels": dict(labels), **metric.to_dict()}
+                        for labels, metric in series.items()
+                    ],
+                }
+                for name, series in self._metrics.items()
+            }
+
+    def to_prometheus(self) -> str:
+        """
+        Returns:
+            str: Every metric in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            for name, series in self._metrics.items():
+                kind = self._kinds[name].kind
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, metric in series.items():
+                    if isinstance(metric, Histogram):
+                        bounds = [str(bound) for bound in metric.buckets] + ["+Inf"]
+                        for bound, count in zip(bounds, metric.cumulative_counts()):
+                            lines.append(
+                                f"{name}_bucket{_format_labels(labels, le=bound)} {count}"
+                            )
+                        lines.append(f"{name}_sum{_format_labels(labels)} {metric.sum}")
+                        lines.append(
+                            f"{name}_count{_format_labels(labels)} {metric.count}"
+                        )
+                    else:
+                        lines.append(f"{name}{_format_labels(labels)} {metric.value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """
+        Write the metrics to a file: JSON if the path ends with .json,
+        the Prometheus text format otherwise.
+
+        Args:
+            path (str): Path to the output file.
+        """
+        if path.endswith(".json"):
+            content = json.dumps(self.to_dict(), indent=2) + "\n"
+        else:
+            content = self.to_prometheus()
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+
+
+registry = MetricsRegistry()
@@ -1,8 +1,14 @@
 """
-This module defines the Product model using Pydantic.
+This module defines the Product model using Pydantic,
+along with helpers for building many products at once (from records
+or straight from newline-delimited JSON bytes) and
+a lightweight ProductRecord for bulk analytics.
 """
 
-from pydantic import BaseModel
+import sys
+from typing import Any, Iterable, NamedTuple
+
+from pydantic import BaseModel, TypeAdapter
 
 
 class Product(BaseModel):
@@ -24,3 +30,120 @@ class Product(BaseModel):
     price: float
     currency: str
     next_product_token: str | None
+
+    @classmethod
+    def from_trusted(cls, data: dict[str, Any]) -> "Product":
+        """
+        Build a product from data that is already known to be valid, skipping validation.
+
+        Args:
+            data (dict[str, Any]): Product fields with values of the right types.
+
+        Returns:
+            Product: The product.
+        """
+        return cls.model_construct(**data)
+
+
+product_list_adapter = TypeAdapter(list[Product])
+
+
+def validate_products(records: list[dict[str, Any]]) -> list[Product]:
+    """
+    Validate many product records in a single call.
+
+    Args:
+        records (list[dict[str, Any]]): Raw product records.
+
+    Returns:
+        list[Product]: The validated products.
+
+    Raises:
+        pydantic.ValidationError: If any record is invalid.
+    """
+    return product_list_adapter.validate_python(records)
+
+
+def validate_products_ndjson(data: bytes) -> list[Product]:
+    """
+    Validate a batch of newline-delimited JSON products in a single call,
+    straight from the raw bytes. Blank lines are skipped.
+
+    Args:
+        data (bytes): One JSON product per line.
+
+    Returns:
+        list[Product]: The validated products, in line order.
+
+    Raises:
+        pydantic.ValidationError: If any line is not a valid product.
+    """
+    lines = [line for line in data.splitlines() if line.strip()]
+    return product_list_adapter.validate_json(b"[" + b",".join(lines) + b"]")
+
+
+class ProductRecord(NamedTuple):
+    """
+    A compact, tuple-backed product for bulk analytics. It has no per-instance
+    __dict__ and shares one copy of each category and currency string.
+    It exposes the same attributes as Product, so it can be used in its place
+    by the calculations.
+    """
+
+    product_id: int
+    product_name: str
+    category: str
+    price: float
+    currency: str
+    next_product_token: str | None = None
+
+    @classmethod
+    def from_product(cls, product: Product) -> "ProductRecord":
+        """
+        Args:
+            product (Product): The product to convert.
+
+        Returns:
+            ProductRecord: The compact copy of the product.
+        """
+        return cls(
+            product.product_id,
+            product.product_name,
+            sys.intern(product.category),
+            product.price,
+            sys.intern(product.currency),
+            product.next_product_token,
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ProductRecord":
+        """
+        Build a record straight from trusted raw data, without a Product in between.
+
+        Args:
+            data (dict[str, Any]): Product fields with values of the right types.
+
+        Returns:
+            ProductRecord: The record.
+        """
+        return cls(
+            data["product_id"],
+            data["product_name"],
+            sys.intern(data["category"]),
+            data["price"],
+            sys.intern(data["currency"]),
+            data.get("next_product_token"),
+        )
+
+
+def to_records(products: Iterable[Product]) -> list[ProductRecord]:
+    """
+    Convert products to compact records.
+
+    Args:
+        products (Iterable[Product]): A list or a stream of products.
+
+    Returns:
+        list[ProductRecord]: The compact records.
+    """
+    return [ProductRecord.from_product(product) for product in products]
@@ -0,0 +1,126 @@
+"""
+This module aggregates large catalogs on several cores.
+
+The category codes and normalised prices of a ProductFrame are copied once
+into shared memory. Worker processes attach to the buffers and each computes
+the partial results of one shard of rows, so only shard bounds and a few
+per-category arrays cross process boundaries instead of pickled products.
+The partials are merged in shard order into a ProductAggregate.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from app.calculations import ProductAggregate
+from app.frame import CategoryPartials, ProductFrame
+
+
+def _share(array: np.ndarray) -> SharedMemory:
+    """
+    Copy an array into a new shared memory block.
+    """
+    memory = SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=memory.buf)[:] = array
+    return memory
+
+
+def _aggregate_shard(
+    codes_name: str,
+    prices_name: str,
+    n_rows: int,
+    n_categories: int,
+    start: int,
+    stop: int,
+) -> CategoryPartials:
+    """
+    Compute the partials of the rows [start, stop) of the shared columns.
+    Runs in a worker process.
+    """
+    codes_memory = SharedMemory(name=codes_name)
+    prices_memory = SharedMemory(name=prices_name)
+    try:
+        codes = np.ndarray((n_rows,), np.int32, buffer=codes_memory.buf)
+        prices = np.ndarray((n_rows,), np.float64, buffer=prices_memory.buf)
+        partials = CategoryPartials.compute(
+            codes[start:stop], prices[start:stop], n_categories, offset=start
+        )
+        # drop the views before closing, the buffers cannot be released otherwise
+        del codes, prices
+        return partials
+    finally:
+        codes_memory.close()
+        prices_memory.close()
+
+
+def shard_bounds(n_rows: int, shards: int) -> list[tuple[int, int]]:
+    """
+    Split rows into contiguous shards of nearly equal size.
+
+    Args:
+        n_rows (int): Number of rows.
+        shards (int): Number of shards.
+
+    Returns:
+        list[tuple[int, int]]: The [start, stop) bounds of every non-empty shard.
+    """
+    edges = np.linspace(0, n_rows, max(shards, 1) + 1).astype(int).tolist()
+    return [(start, stop) for start, stop in zip(edges, edges[1:]) if stop > start]
+
+
+def aggregate_parallel(
+    frame: ProductFrame,
+    desired_currency: str = "PLN",
+    workers: int | None = None,
+    shards: int | None = None,
+) -> ProductAggregate:
+    """
+    Compute the statistics of every category with the shards of a frame
+    aggregated in separate processes.
+
+    Prices are normalised in this process, so workers never need the currency
+    converter. The result equals ProductFrame.to_aggregate, up to the rounding
+    of the price sums.
+
+    Args:
+        frame (ProductFrame): The products to aggregate.
+        desired_currency (str): The currency prices are normalised to.
+        workers (int | None): Number of worker processes, by default one per CPU.
+        shards (int | None): Number of shards, by default one per worker.
+
+    Returns:
+        ProductAggregate: The statistics of every category.
+    """
+    workers = workers or os.cpu_count() or 1
+    bounds = shard_bounds(len(frame), shards or workers)
+    if len(bounds) <= 1:
+        return frame.to_aggregate(desired_currency)
+
+    codes = np.ascontiguousarray(frame.category_codes, dtype=np.int32)
+    prices = np.ascontiguousarray(frame.prices_in(desired_currency))
+    codes_memory, prices_memory = _share(codes), _share(prices)
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(bounds))) as executor:
+            futures = [
+                executor.submit(
+                    _aggregate_shard,
+                    codes_memory.name,
+                    prices_memory.name,
+                    len(frame),
+                    len(frame.categories),
+                    start,
+                    stop,
+                )
+                for start, stop in bounds
+            ]
+            partials = futures[0].result()
+            for future in futures[1:]:
+                partials = partials.merge(future.result())
+    finally:
+        for memory in (codes_memory, prices_memory):
+            memory.close()
+            memory.unlink()
+
+    return frame.aggregate_from_partials(partials)
@@ -0,0 +1,202 @@
+"""
+This module provides the opt-in profiling mode of the application.
+A profiled stage runs under cProfile and tracemalloc; its wall time, CPU time
+and peak traced memory are logged, and pstats, top-allocation and, optionally,
+collapsed-stack reports are written for later analysis. Collapsed stacks come
+from a sampling thread and can be rendered by flamegraph.pl or speedscope.
+"""
+
+import cProfile
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from types import FrameType
+from typing import Iterator
+
+from app.logger import get_logger
+from app.utils import load_config
+
+logger = get_logger(__name__)
+
+config = load_config("config/config.yml")
+
+
+@dataclass
+class StageStats:
+    """
+    Resource usage of a profiled stage.
+
+    Attributes:
+        name (str): The stage name.
+        wall_seconds (float): Elapsed time.
+        cpu_seconds (float): CPU time of the whole process, all threads included.
+        peak_memory (int): Peak traced memory in bytes.
+        reports (list[str]): Paths of the written reports.
+    """
+
+    name: str
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    peak_memory: int = 0
+    reports: list[str] = field(default_factory=list)
+
+
+class StackSampler:
+    """
+    Samples the call stacks of all other threads at a fixed interval and counts
+    them in the collapsed format: frames from the outermost, separated by ';'.
+    """
+
+    def __init__(
+        self, interval: float = config["profiling"]["sample_interval"]
+    ) -> None:
+        """
+        Args:
+            interval (float): Seconds between two samples.
+        """
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _sample(self) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        own = threading.get_ident()
+        # pylint: disable-next=protected-access
+        for thread_id, top in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            frames = []
+            frame: FrameType | None = top
+            while frame is not None:
+                code = frame.f_code
+                filename = os.path.basename(code.co_filename)
+                frames.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            frames.append(names.get(thread_id, str(thread_id)))
+            self.stacks[";".join(reversed(frames))] += 1
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        """
+        Start sampling in a background thread.
+        """
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop sampling.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def write(self, path: str) -> None:
+        """
+        Write the sampled stacks, one "stack count" line each.
+
+        Args:
+            path (str): Path to the output file.
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+
+def _write_allocations(snapshot: tracemalloc.Snapshot, path: str, top: int) -> None:
+    """
+    Write the source lines that hold the most traced memory.
+    """
+    snapshot = snapshot.filter_traces(
+        [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ]
+    )
+    statistics = snapshot.statistics("lineno")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(f"Top {top} allocations by size\n")
+        for rank, stat in enumerate(statistics[:top], start=1):
+            file.write(f"#{rank}: {stat}\n")
+        rest = statistics[top:]
+        if rest:
+            size = sum(stat.size for stat in rest)
+            file.write(f"{len(rest)} other lines: {size / 1024:.1f} KiB\n")
+
+
+@contextmanager
+def profile_stage(
+    name: str,
+    output_dir: str = ".",
+    stacks: bool = False,
+    top: int = config["profiling"]["top_allocations"],
+) -> Iterator[StageStats]:
+    """
+    Profile the code run inside the block and write its reports:
+    profile-<name>.pstats, profile-<name>-allocations.txt and, with stacks,
+    profile-<name>.collapsed. cProfile sees only the calling thread;
+    the sampled stacks cover all threads.
+
+    Args:
+        name (str): The stage name, used in the report file names.
+        output_dir (str): Directory to write the reports to.
+        stacks (bool): Whether to sample collapsed stacks.
+        top (int): Number of allocation sites in the allocation report.
+
+    Yields:
+        StageStats: The stage statistics, filled in when the block exits.
+    """
+    stats = StageStats(name)
+    profiler = cProfile.Profile()
+    sampler = StackSampler() if stacks else None
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+
+    started_wall, started_cpu = time.perf_counter(), time.process_time()
+    if sampler is not None:
+        sampler.start()
+    profiler.enable()
+    try:
+        yield stats
+    finally:
+        profiler.disable()
+        if sampler is not None:
+            sampler.stop()
+        stats.wall_seconds = time.perf_counter() - started_wall
+        stats.cpu_seconds = time.process_time() - started_cpu
+        _, stats.peak_memory = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        if started_tracing:
+            tracemalloc.stop()
+
+        prefix = os.path.join(output_dir, f"profile-{name}")
+        profiler.dump_stats(f"{prefix}.pstats")
+        _write_allocations(snapshot, f"{prefix}-allocations.txt", top)
+        stats.reports = [f"{prefix}.pstats", f"{prefix}-allocations.txt"]
+        if sampler is not None:
+            sampler.write(f"{prefix}.collapsed")
+            stats.reports.append(f"{prefix}.collapsed")
+
+        logger.info(
+            "Stage %s: wall %.3f s, CPU %.3f s, peak memory %.1f MiB.",
+            name,
+            stats.wall_seconds,
+            stats.cpu_seconds,
+            stats.peak_memory / 2**20,
+        )
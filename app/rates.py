@@ -0,0 +1,448 @@
+"""
+This module provides the shared currency converter and a memoised table of exchange rates.
+The converter is built lazily on first use, and its parsed rate table is persisted
+to an on-disk cache so later processes skip parsing the bundled ECB history file.
+A run only sees a handful of currency pairs, so each rate is looked up
+in the converter once and every conversion becomes a single multiplication.
+For conversions at historical dates, RateMatrix precomputes a dense table of
+daily rates, so a batch of dated prices is converted with one gather.
+"""
+
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import date as Date
+from datetime import timedelta
+from typing import Any, Iterable
+
+import numpy as np
+from currency_converter import CurrencyConverter, RateNotFoundError, __version__
+from currency_converter.currency_converter import CURRENCY_FILE
+
+from app.logger import get_logger
+from app.utils import load_config
+
+logger = get_logger(__name__)
+
+config = load_config("config/config.yml")
+
+DEFAULT_MAXSIZE = 256
+
+_converter: CurrencyConverter | None = None  # pylint: disable=invalid-name
+_converter_lock = threading.Lock()
+
+
+def _cache_path(cache_dir: str, currency_file: str) -> str:
+    """
+    Build the cache file path for a data file. The name changes whenever
+    the library version or the data file itself changes.
+
+    Args:
+        cache_dir (str): Directory of the on-disk cache.
+        currency_file (str): Path to the converter's source data.
+
+    Returns:
+        str: Path to the cache file.
+    """
+    stat = os.stat(currency_file)
+    key = f"{__version__}-{stat.st_size}-{stat.st_mtime_ns}"
+    return os.path.join(cache_dir, f"currency-rates-{key}.pickle")
+
+
+def load_converter(
+    cache_dir: str = config["currency"]["cache_dir"],
+    currency_file: str = CURRENCY_FILE,
+) -> CurrencyConverter:
+    """
+    Load a currency converter, reusing its parsed rate table from the on-disk cache.
+
+    On a cache miss the data file is parsed and the cache is written for the next run.
+    Failing to read or write the cache is not an error; the data file is parsed instead.
+
+    Args:
+        cache_dir (str): Directory of the on-disk cache.
+        currency_file (str): Path to the converter's source data.
+
+    Returns:
+        CurrencyConverter: The loaded converter.
+    """
+    path = _cache_path(cache_dir, currency_file)
+    try:
+        with open(path, "rb") as file:
+            return pickle.load(file)
+    except FileNotFoundError:
+        pass
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+        logger.warning("Could not read currency cache %s: %s.", path, e)
+
+    converter = CurrencyConverter(currency_file)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=cache_dir, delete=False) as tmp:
+            pickle.dump(converter, tmp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp.name, path)
+    except OSError as e:
+        logger.warning("Could not write currency cache %s: %s.", path, e)
+    return converter
+
+
+def get_converter() -> CurrencyConverter:
+    """
+    Get the shared currency converter, loading it on first use.
+
+    Returns:
+        CurrencyConverter: The shared converter.
+    """
+    global _converter  # pylint: disable=global-statement
+    if _converter is None:
+        with _converter_lock:
+            if _converter is None:
+                _converter = load_converter()
+    return _converter
+
+
+def _reference_rate_as_of(
+    converter: CurrencyConverter, currency: str, day: Date
+) -> float:
+    """
+    Value of one unit of a currency in the converter's reference currency,
+    at the last rate published on or before a day.
+
+    Raises:
+        ValueError: If the currency has no rate on or before the day.
+    """
+    bounds = converter.bounds[currency]
+    published = min(day, bounds.last_date)
+    while published >= bounds.first_date:
+        try:
+            return converter.convert(
+                1.0, currency, converter.ref_currency, date=published
+            )
+        except RateNotFoundError:
+            published -= timedelta(days=1)
+    raise ValueError(f"No rate on or before {day} for {currency}")
+
+
+def get_rate_as_of(
+    converter: CurrencyConverter, currency: str, desired_currency: str, date: Date
+) -> float:
+    """
+    Get the rate of a currency on a day. On days without a published rate
+    (weekends, holidays) the last rates published before them are used,
+    as in RateMatrix.
+
+    Args:
+        converter (CurrencyConverter): The converter to read the rates from.
+        currency (str): The original currency code.
+        desired_currency (str): The desired currency code.
+        date (Date): The day.
+
+    Returns:
+        float: The exchange rate.
+
+    Raises:
+        ValueError: If a currency has no rate on or before the day.
+    """
+    try:
+        return converter.convert(1.0, currency, desired_currency, date=date)
+    except RateNotFoundError:
+        return _reference_rate_as_of(converter, currency, date) / _reference_rate_as_of(
+            converter, desired_currency, date
+        )
+
+
+class RateCache:
+    """
+    A size-bounded, least-recently-used cache of exchange rates
+    keyed by (currency, desired_currency, date).
+    """
+
+    def __init__(
+        self, converter: CurrencyConverter | None = None, maxsize: int = DEFAULT_MAXSIZE
+    ) -> None:
+        """
+        Args:
+            converter (CurrencyConverter | None): The converter the rates are looked up in.
+                If None, the shared converter is loaded on the first lookup.
+            maxsize (int): Maximum number of rates kept in the cache.
+        """
+        self._converter = converter
+        self.maxsize = maxsize
+        self._rates: OrderedDict[tuple[str, str, Date | None], float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rates)
+
+    @property
+    def converter(self) -> CurrencyConverter:
+        """
+        CurrencyConverter: The converter the rates are looked up in.
+        """
+        if self._converter is None:
+            self._converter = get_converter()
+        return self._converter
+
+    def get_rate(
+        self, currency: str, desired_currency: str, date: Date | None = None
+    ) -> float:
+        """
+        Get the rate converting one unit of a currency into the desired currency.
+
+        Args:
+            currency (str): The original currency code (e.g., "USD").
+            desired_currency (str): The desired currency code (e.g., "PLN").
+            date (Date | None): The date of the rate. If None, the latest rate is used.
+                Days without a published rate use the last one published before them.
+
+        Returns:
+            float: The exchange rate.
+        """
+        if currency == desired_currency:
+            return 1.0
+        key = (currency, desired_currency, date)
+        with self._lock:
+            rate = self._rates.get(key)
+            if rate is not None:
+                self._rates.move_to_end(key)
+                return rate
+
+        if date is None:
+            rate = self.converter.convert(1.0, currency, desired_currency, date=None)
+        else:
+            rate = get_rate_as_of(self.converter, currency, desired_currency, date)
+
+        with self._lock:
+            self._rates[key] = rate
+            if len(self._rates) > self.maxsize:
+                self._rates.popitem(last=False)
+        return rate
+
+    def convert(
+        self,
+        price: float,
+        currency: str,
+        desired_currency: str,
+        date: Date | None = None,
+    ) -> float:
+        """
+        Convert a price using the cached rate.
+
+        Args:
+            price (float): The price in the original currency.
+            currency (str): The original currency code.
+            desired_currency (str): The desired currency code.
+            date (Date | None): The date of the rate. If None, the latest rate is used.
+
+        Returns:
+            float: The price in the desired currency.
+        """
+        if currency == desired_currency:
+            return price
+        return price * self.get_rate(currency, desired_currency, date)
+
+    def convert_many(
+        self,
+        prices: Iterable[float],
+        currencies: Iterable[str],
+        desired_currency: str,
+        date: Date | None = None,
+    ) -> list[float]:
+        """
+        Convert a batch of prices, looking each currency pair up once.
+
+        Args:
+            prices (Iterable[float]): Prices in their original currencies.
+            currencies (Iterable[str]): Currency code of each price.
+            desired_currency (str): The desired currency code.
+            date (Date | None): The date of the rates. If None, the latest rates are used.
+
+        Returns:
+            list[float]: The prices in the desired currency.
+        """
+        rates: dict[str, float] = {}
+        converted = []
+        for price, currency in zip(prices, currencies):
+            rate = rates.get(currency)
+            if rate is None:
+                rate = rates[currency] = self.get_rate(currency, desired_currency, date)
+            converted.append(price * rate)
+        return converted
+
+    def invalidate(
+        self, currency: str | None = None, desired_currency: str | None = None
+    ) -> None:
+        """
+        Drop cached rates, e.g. after the converter's data has been reloaded.
+
+        Args:
+            currency (str | None): Drop only rates from this currency. If None, any.
+            desired_currency (str | None): Drop only rates to this currency. If None, any.
+        """
+        with self._lock:
+            if currency is None and desired_currency is None:
+                self._rates.clear()
+                return
+            for key in list(self._rates):
+                if currency in (None, key[0]) and desired_currency in (None, key[1]):
+                    del self._rates[key]
+
+
+def _as_array(values: Iterable, dtype: Any) -> np.ndarray:
+    """
+    Convert a batch of values to an array, accepting any iterable.
+    """
+    if not isinstance(values, np.ndarray):
+        values = list(values)
+    return np.asarray(values, dtype=dtype)
+
+
+class RateMatrix:
+    """
+    Daily exchange rates of several currencies into one desired currency,
+    stored as a dense currency x day matrix. Days without a published rate
+    (weekends, holidays) hold the last rate published before them, so every
+    lookup is an as-of lookup by day offset.
+
+    Attributes:
+        currencies (list[str]): Currency of each row.
+        desired_currency (str): The currency the rates convert into.
+        start (Date): Day of the first column.
+        rates (np.ndarray): Rate of each currency (row) on each day (column).
+    """
+
+    def __init__(
+        self,
+        currencies: list[str],
+        desired_currency: str,
+        start: Date,
+        rates: np.ndarray,
+    ) -> None:
+        self.currencies = currencies
+        self.desired_currency = desired_currency
+        self.start = start
+        self.rates = rates
+        self._rows = {currency: row for row, currency in enumerate(currencies)}
+        # the desired currency converts at 1, even without a row of its own
+        self._rows.setdefault(desired_currency, len(currencies))
+        self._table = np.vstack([rates, np.ones((1, rates.shape[1]))])
+
+    @property
+    def end(self) -> Date:
+        """
+        Date: Day of the last column.
+        """
+        return self.start + timedelta(days=self.rates.shape[1] - 1)
+
+    @classmethod
+    def from_converter(
+        cls,
+        currencies: Iterable[str],
+        desired_currency: str = "PLN",
+        start: Date | None = None,
+        end: Date | None = None,
+        converter: CurrencyConverter | None = None,
+    ) -> "RateMatrix":
+        """
+        Build the matrix from the rates published in a converter.
+
+        Args:
+            currencies (Iterable[str]): Currencies to convert from.
+            desired_currency (str): The currency to convert into.
+            start (Date | None): First day; by default the first published one.
+                If nothing is published on it, the last earlier rate is used.
+            end (Date | None): Last day; by default the last published one.
+            converter (CurrencyConverter | None): The converter to read the rates
+                from. If None, the shared converter is used.
+
+        Returns:
+            RateMatrix: The matrix.
+
+        Raises:
+            ValueError: If the last day is before the first one, or a currency
+                has no rate on or before the first day.
+        """
+        converter = converter or get_converter()
+        currencies = list(dict.fromkeys(currencies))
+        pair = [*currencies, desired_currency]
+        start = start or max(converter.bounds[c].first_date for c in pair)
+        end = end or min(converter.bounds[c].last_date for c in pair)
+        if end < start:
+            raise ValueError(f"The last day {end} is before the first day {start}")
+        days = (end - start).days + 1
+
+        # rates into the converter's reference currency, NaN where none is published
+        reference = np.full((len(pair), days), np.nan)
+        for row, currency in enumerate(pair):
+            for day in range(days):
+                try:
+                    reference[row, day] = converter.convert(
+                        1.0,
+                        currency,
+                        converter.ref_currency,
+                        date=start + timedelta(days=day),
+                    )
+                except RateNotFoundError:
+                    pass
+
+        # start from the last rate published on or before the first day,
+        # then fill every gap with the last published rate
+        for row in np.flatnonzero(np.isnan(reference[:, 0])).tolist():
+            reference[row, 0] = _reference_rate_as_of(converter, pair[row], start)
+        published = np.where(np.isnan(reference), 0, np.arange(days))
+        np.maximum.accumulate(published, axis=1, out=published)
+        reference = np.take_along_axis(reference, published, axis=1)
+
+        return cls(currencies, desired_currency, start, reference[:-1] / reference[-1])
+
+    def _offsets(self, dates: np.ndarray) -> np.ndarray:
+        """
+        Column of each date; dates after the last day use the last one.
+        """
+        offsets = (dates - np.datetime64(self.start, "D")).astype(np.int64)
+        if offsets.size and offsets.min() < 0:
+            raise ValueError(f"No rates before {self.start}")
+        return np.minimum(offsets, self.rates.shape[1] - 1)
+
+    def get_rate(self, currency: str, date: Date) -> float:
+        """
+        Get the rate of a currency on a day.
+
+        Args:
+            currency (str): The original currency code.
+            date (Date): The day.
+
+        Returns:
+            float: The last rate published on or before the day.
+        """
+        offset = self._offsets(np.array([date], dtype="datetime64[D]"))[0]
+        return float(self._table[self._rows[currency], offset])
+
+    def convert_many(
+        self,
+        prices: Iterable[float],
+        currencies: Iterable[str],
+        dates: Iterable[Date],
+    ) -> np.ndarray:
+        """
+        Convert a batch of prices at the rates of the days they were observed.
+
+        Args:
+            prices (Iterable[float]): Prices in their original currencies.
+            currencies (Iterable[str]): Currency code of each price.
+            dates (Iterable[Date]): Day each price was observed on.
+
+        Returns:
+            np.ndarray: The prices in the desired currency.
+
+        Raises:
+            KeyError: If a currency is not in the matrix.
+            ValueError: If a date is before the first day of the matrix.
+        """
+        prices = _as_array(prices, np.float64)
+        names, codes = np.unique(_as_array(currencies, str), return_inverse=True)
+        rows = np.array([self._rows[name] for name in names], dtype=np.int64)
+        offsets = self._offsets(_as_array(dates, "datetime64[D]"))
+        return prices * self._table[rows[codes], offsets]
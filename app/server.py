@@ -0,0 +1,369 @@
+"""
+This module provides a long-running report service. It keeps the fetched
+products in an AggregateStore, refreshes it in the background on a
+schedule and answers parameterised questions over a local HTTP endpoint,
+so a question no longer costs a full crawl.
+
+Endpoints (all GET, answered with JSON):
+    /count
+    /categories
+    /most-expensive?category=Fashion&currency=EUR
+    /average?category=Toys%20%26%20Games&currency=PLN
+    /health
+
+Usage:
+    python -m app.server
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Iterable
+from urllib.parse import parse_qs, urlparse
+
+from dotenv import load_dotenv
+
+from app.calculations import rate_cache
+from app.fetch_data import fetch_all_products, fetch_chains
+from app.logger import get_logger
+from app.metrics import registry
+from app.models import Product
+from app.store import AggregateStore
+from app.utils import load_config
+
+config = load_config("config/config.yml")
+logger = get_logger(__name__)
+
+
+class QueryError(ValueError):
+    """
+    Raised when a query is malformed.
+    """
+
+
+class NotReadyError(RuntimeError):
+    """
+    Raised when a query arrives before the first catalog has been loaded.
+    """
+
+
+class ReportService:
+    """
+    Answers questions about an in-memory catalog that is refreshed in the background.
+
+    A refresh fetches the products aside and then syncs the store under the
+    lock, so queries always see a complete catalog and the statistics are
+    updated for the changed products alone. Answers are cached per catalog
+    generation, which only advances when a refresh changes the catalog.
+    """
+
+    QUESTIONS = ("count", "categories", "most-expensive", "average")
+
+    def __init__(
+        self,
+        fetch: Callable[[], Iterable[Product]],
+        refresh_interval: float = config["server"]["refresh_interval"],
+        cache_size: int = config["server"]["cache_size"],
+    ) -> None:
+        """
+        Args:
+            fetch (Callable[[], Iterable[Product]]): Fetches the current products.
+            refresh_interval (float): Seconds between two refreshes of the catalog.
+            cache_size (int): Maximum number of cached answers.
+        """
+        self.fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.cache_size = cache_size
+        self.store = AggregateStore()
+        self.generation = 0
+        self.refreshed_at: float | None = None
+        self._cache: OrderedDict[tuple, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def refresh(self) -> None:
+        """
+        Fetch the products and sync the store with them.
+        """
+        with registry.histogram(
+            "report_refresh_seconds", "Duration of the catalog refreshes."
+        ).time():
+            products = list(self.fetch())
+            with self._lock:
+                changed, removed = self.store.sync(products)
+                if changed or removed or self.refreshed_at is None:
+                    self.generation += 1
+                    self._cache.clear()
+                self.refreshed_at = time.time()
+                size = len(self.store)
+        registry.gauge("report_catalog_products", "Products in the catalog.").set(size)
+        logger.info(
+            "Catalog refreshed with %d products: %d changed, %d removed.",
+            size,
+            changed,
+            removed,
+        )
+
+    def _run(self, stopped: threading.Event) -> None:
+        """
+        Refresh the catalog every refresh_interval seconds until stopped.
+        A failed refresh keeps the previous catalog in service.
+
+        Args:
+            stopped (threading.Event): The stop signal of this thread alone, so a
+                refresh abandoned by stop() never resumes after a later start().
+        """
+        while not stopped.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception:  # pylint: disable=broad-exception-caught
+                registry.counter(
+                    "report_refresh_failures_total", "Failed catalog refreshes."
+                ).inc()
+                logger.exception("Catalog refresh failed; serving the previous one.")
+
+    def start(self) -> "ReportService":
+        """
+        Load the first catalog and start refreshing it in the background.
+
+        Returns:
+            ReportService: The service itself, to allow chaining.
+        """
+        self.refresh()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(self._stopped,), name="report-refresh", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """
+        Stop the background refreshes. A refresh that is still running after
+        the timeout is abandoned; its daemon thread ends with the process.
+
+        Args:
+            timeout (float): Seconds to wait for a running refresh to finish.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.warning("Not waiting for the running catalog refresh.")
+            self._thread = None
+
+    def answer(self, question: str, category: str | None, currency: str) -> Any:
+        """
+        Answer a question about the current catalog.
+
+        Args:
+            question (str): One of QUESTIONS.
+            category (str | None): The category, for the per-category questions.
+            currency (str): The currency prices are reported in.
+
+        Returns:
+            Any: The answer, ready to be serialised as JSON.
+
+        Raises:
+            QueryError: If the question is unknown or the category is missing.
+            NotReadyError: If no catalog has been loaded yet.
+        """
+        if question not in self.QUESTIONS:
+            raise QueryError(f"Unknown question: {question}")
+        if self.refreshed_at is None:
+            raise NotReadyError("The catalog has not been loaded yet")
+        if question == "count":
+            with self._lock:
+                return {"count": len(self.store)}
+        if question == "categories":
+            with self._lock:
+                return {"counts": self.store.counts_per_category()}
+        if category is None:
+            raise QueryError(f"The {question} question needs a category")
+
+        # prices are aggregated in PLN; conversion at a single rate keeps
+        # both the order of prices and their average
+        rate = rate_cache.get_rate("PLN", currency)
+        if question == "average":
+            with self._lock:
+                average = self.store.average_price_for_category(category)
+            return {
+                "category": category,
+                "currency": currency,
+                "average_price": None if average is None else average * rate,
+            }
+        with self._lock:
+            product = self.store.most_expensive_in_category(category)
+        return {
+            "category": category,
+            "currency": currency,
+            "product": None if product is None else product.model_dump(),
+            "price": (
+                None
+                if product is None
+                else rate_cache.convert(product.price, product.currency, currency)
+            ),
+        }
+
+    def query(
+        self, question: str, category: str | None = None, currency: str = "PLN"
+    ) -> bytes:
+        """
+        Answer a question as a JSON document, from the cache if it has been asked
+        about the current catalog before.
+
+        Args:
+            question (str): One of QUESTIONS.
+            category (str | None): The category, for the per-category questions.
+            currency (str): The currency prices are reported in.
+
+        Returns:
+            bytes: The answer as JSON.
+        """
+        key = (self.generation, question, category, currency)
+        with self._lock:
+            body = self._cache.get(key)
+            if body is not None:
+                self._cache.move_to_end(key)
+        if body is not None:
+            registry.counter(
+                "report_cache_total", "Answer cache lookups.", result="hit"
+            ).inc()
+            return body
+
+        registry.counter(
+            "report_cache_total", "Answer cache lookups.", result="miss"
+        ).inc()
+        body = json.dumps(self.answer(question, category, currency)).encode()
+        with self._lock:
+            # a refresh in the meantime makes the answer stale
+            if key[0] == self.generation:
+                self._cache[key] = body
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return body
+
+    def health(self) -> dict[str, Any]:
+        """
+        Returns:
+            dict[str, Any]: The catalog generation, size and time of the last refresh.
+        """
+        with self._lock:
+            products = None if self.refreshed_at is None else len(self.store)
+        return {
+            "generation": self.generation,
+            "products": products,
+            "refreshed_at": self.refreshed_at,
+        }
+
+
+def create_server(
+    service: ReportService,
+    host: str = config["server"]["host"],
+    port: int = config["server"]["port"],
+) -> ThreadingHTTPServer:
+    """
+    Create an HTTP server answering the questions of a report service.
+
+    Args:
+        service (ReportService): The service answering the questions.
+        host (str): The host to listen on.
+        port (int): The port to listen on; 0 picks a free one.
+
+    Returns:
+        ThreadingHTTPServer: The server, not yet serving.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        """
+        Answers report queries.
+        """
+
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self) -> None:  # pylint: disable=invalid-name
+            """
+            Answer the question named by the path.
+            """
+            url = urlparse(self.path)
+            question = url.path.strip("/")
+            params = parse_qs(url.query)
+            if question == "health":
+                self.send_json(200, json.dumps(service.health()).encode())
+                return
+            try:
+                body = service.query(
+                    question,
+                    params.get("category", [None])[0],
+                    params.get("currency", ["PLN"])[0].upper(),
+                )
+            except QueryError as error:
+                status = 404 if question not in service.QUESTIONS else 400
+                self.send_json(status, json.dumps({"detail": str(error)}).encode())
+            except NotReadyError as error:
+                self.send_json(503, json.dumps({"detail": str(error)}).encode())
+            except ValueError as error:
+                # e.g. a currency unknown to the converter
+                self.send_json(400, json.dumps({"detail": str(error)}).encode())
+            else:
+                self.send_json(200, body)
+
+        def send_json(self, status: int, body: bytes) -> None:
+            """
+            Send a JSON response.
+            """
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        # pylint: disable-next=arguments-differ
+        def log_message(self, *args: Any) -> None:
+            """
+            Silence request logging.
+            """
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def main() -> None:
+    """
+    Serve reports about the products of API_URL until interrupted.
+    API_URL may hold several comma-separated endpoints, crawled concurrently.
+    """
+    load_dotenv()
+    api_url = os.getenv("API_URL")
+    if api_url is None:
+        raise ValueError("API_URL not found in environment variables")
+    api_urls = [url.strip() for url in api_url.split(",") if url.strip()]
+    if not api_urls:
+        raise ValueError("API_URL does not contain any endpoint")
+
+    def fetch() -> list[Product]:
+        if len(api_urls) > 1:
+            return fetch_chains([(url, None) for url in api_urls])
+        return fetch_all_products(api_urls[0])
+
+    service = ReportService(fetch).start()
+    server = create_server(service)
+    host, port = server.server_address[:2]
+    logger.info("Serving reports on http://%s:%d", host, port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+This module provides bounded-memory summaries of a stream of prices:
+TopK keeps the k highest-priced items with a heap, and KLLSketch estimates
+quantiles with a KLL sketch. Both can be merged, so parts of a catalog can
+be summarised separately and combined.
+"""
+
+import heapq
+import math
+import random
+from typing import Any, Iterable
+
+
+class TopK:
+    """
+    The k items with the highest prices seen so far, kept in a min-heap,
+    so adding n items takes O(n log k). Of equally priced items the ones
+    seen first are kept.
+    """
+
+    def __init__(self, k: int) -> None:
+        """
+        Args:
+            k (int): Number of items to keep.
+        """
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        self.k = k
+        # entries are (price, -sequence number, item); the root is the cheapest
+        # item and, of equally priced ones, the latest
+        self._heap: list[tuple[float, int, Any]] = []
+        self._seen = 0
+
+    def add(self, item: Any, price: float) -> None:
+        """
+        Offer an item.
+
+        Args:
+            item (Any): The item, e.g. a Product.
+            price (float): The price the items are ranked by.
+        """
+        entry = (price, -self._seen, item)
+        self._seen += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def merge(self, other: "TopK") -> None:
+        """
+        Merge the items of another part of the stream, seen after this one.
+
+        Args:
+            other (TopK): The items to merge in.
+        """
+        # equally priced items come in the order they were seen, so the
+        # earlier ones still win the ties
+        for price, item in other.items():
+            self.add(item, price)
+
+    def items(self) -> list[tuple[float, Any]]:
+        """
+        Returns:
+            list[tuple[float, Any]]: (price, item) pairs, the most expensive first.
+        """
+        entries = sorted(self._heap, key=lambda entry: entry[:2], reverse=True)
+        return [(price, item) for price, _, item in entries]
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+class KLLSketch:
+    """
+    A KLL quantile sketch. It keeps O(k log(n / k)) values in levels of
+    compactors, where a value at level h stands for 2**h values of the stream.
+    Ranks are estimated with an error of about 1.7 / k of the stream length;
+    until the first compaction the quantiles are exact.
+    """
+
+    def __init__(self, k: int = 200, seed: int | None = 0) -> None:
+        """
+        Args:
+            k (int): Size of the largest compactor; larger is more accurate.
+            seed (int | None): Seed of the compaction coin flips.
+        """
+        if k < 2:
+            raise ValueError("k must be at least 2")
+        self.k = k
+        self.count = 0
+        self._compactors: list[list[float]] = [[]]
+        self._size = 0
+        self._random = random.Random(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self._compactors) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(level) for level in range(len(self._compactors)))
+
+    def add(self, value: float) -> None:
+        """
+        Add a value to the sketch.
+
+        Args:
+            value (float): The value, e.g. a price.
+        """
+        self._compactors[0].append(value)
+        self.count += 1
+        self._size += 1
+        if self._size >= self._max_size():
+            self._compress()
+
+    def update(self, values: Iterable[float]) -> "KLLSketch":
+        """
+        Add every value of an iterable to the sketch.
+
+        Args:
+            values (Iterable[float]): The values to add.
+
+        Returns:
+            KLLSketch: The sketch itself, to allow chaining.
+        """
+        for value in values:
+            self.add(value)
+        return self
+
+    def _compress(self) -> None:
+        """
+        Compact the lowest full compactor: sort it and promote every other
+        value to the next level, which doubles their weight.
+        """
+        for level, compactor in enumerate(self._compactors):
+            if len(compactor) < self._capacity(level):
+                continue
+            if level + 1 == len(self._compactors):
+                self._compactors.append([])
+            compactor.sort()
+            # an odd value out stays, so the total weight is preserved exactly
+            kept = [compactor.pop()] if len(compactor) % 2 else []
+            offset = self._random.random() < 0.5
+            self._compactors[level + 1].extend(compactor[offset::2])
+            self._compactors[level] = kept
+            self._size = sum(len(values) for values in self._compactors)
+            if self._size < self._max_size():
+                return
+
+    def merge(self, other: "KLLSketch") -> None:
+        """
+        Merge another sketch into this one.
+
+        Args:
+            other (KLLSketch): The sketch to merge in.
+        """
+        compactors = other.compactors()
+        while len(self._compactors) < len(compactors):
+            self._compactors.append([])
+        for level, values in enumerate(compactors):
+            self._compactors[level].extend(values)
+        self.count += other.count
+        self._size = sum(len(values) for values in self._compactors)
+        while self._size >= self._max_size():
+            self._compress()
+
+    def compactors(self) -> tuple[tuple[float, ...], ...]:
+        """
+        Returns:
+            tuple[tuple[float, ...], ...]: A read-only copy of the values kept at
+            every level; a value at level i stands for 2**i values added.
+        """
+        return tuple(tuple(values) for values in self._compactors)
+
+    def quantile(self, q: float) -> float | None:
+        """
+        Estimate a quantile as the smallest value whose rank reaches q.
+
+        Args:
+            q (float): The quantile, between 0 and 1 (e.g. 0.5 for the median).
+
+        Returns:
+            float | None: The estimated quantile, or None if the sketch is empty.
+        """
+        return self.quantiles([q])[q]
+
+    def quantiles(self, qs: Iterable[float]) -> dict[float, float | None]:
+        """
+        Estimate several quantiles with one pass over the sketch.
+
+        Args:
+            qs (Iterable[float]): The quantiles, between 0 and 1.
+
+        Returns:
+            dict[float, float | None]: The estimate of each quantile,
+            None if the sketch is empty.
+        """
+        qs = list(qs)
+        if not self.count:
+            return {q: None for q in qs}
+        weighted = sorted(
+            (value, 2**level)
+            for level, values in enumerate(self._compactors)
+            for value in values
+        )
+        pending = sorted(qs)
+        results: dict[float, float | None] = {}
+        cumulative, index = 0, 0
+        for value, weight in weighted:
+            cumulative += weight
+            while index < len(pending) and cumulative >= pending[index] * self.count:
+                results[pending[index]] = value
+                index += 1
+        for q in pending[index:]:
+            results[q] = weighted[-1][0]
+        return {q: results[q] for q in qs}
+
+    def __len__(self) -> int:
+        """
+        Returns:
+            int: Number of values stored, not the number added.
+        """
+        return self._size
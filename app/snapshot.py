@@ -0,0 +1,200 @@
+"""
+This module writes and reads product snapshots: a binary, columnar file that
+reloads a fetched catalog without re-crawling or re-parsing JSON.
+
+A snapshot holds fixed-width numeric columns (ids, prices, category, currency
+and name codes) and the dictionaries the codes point into. The reader maps the
+file with numpy.memmap, so the columns are not copied and loading takes the
+same time for any catalog size; names are decoded only when a row is read.
+
+Layout:
+    b"PRODSNAP" | header length (uint64, little-endian) | JSON header |
+    padding | column data, every column aligned to 8 bytes
+"""
+
+import json
+import os
+import struct
+import tempfile
+from typing import Iterable, Sequence, TypedDict, overload
+
+import numpy as np
+
+from app.frame import ProductFrame
+from app.models import Product
+
+MAGIC = b"PRODSNAP"
+VERSION = 1
+ALIGNMENT = 8
+
+
+class _ColumnSpec(TypedDict):
+    """
+    Where a column is stored, relative to the start of the column data.
+    """
+
+    dtype: str
+    offset: int
+    length: int
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _encode_names(names: Iterable[str], count: int) -> tuple[np.ndarray, ...]:
+    """
+    Dictionary-encode product names.
+
+    Returns:
+        tuple[np.ndarray, ...]: The code of every name, the offsets of the
+        distinct names in the data and their UTF-8 data.
+    """
+    distinct: dict[str, int] = {}
+    codes = np.fromiter(
+        (distinct.setdefault(name, len(distinct)) for name in names),
+        dtype=np.int32,
+        count=count,
+    )
+    encoded = [name.encode() for name in distinct]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(name) for name in encoded], out=offsets[1:])
+    return codes, offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+class StringColumn(Sequence[str]):
+    """
+    A read-only, dictionary-encoded column of strings. The distinct strings are
+    stored back to back as UTF-8 and decoded when an item is read.
+    """
+
+    def __init__(self, codes: np.ndarray, offsets: np.ndarray, data: np.ndarray):
+        """
+        Args:
+            codes (np.ndarray): Index of each row's string in the dictionary.
+            offsets (np.ndarray): Start of every dictionary string in data,
+                followed by the end of the last one.
+            data (np.ndarray): The UTF-8 bytes of the dictionary strings.
+        """
+        self.codes = codes
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[str]: ...
+
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        code = self.codes[index]
+        start, stop = self.offsets[code], self.offsets[code + 1]
+        return self.data[start:stop].tobytes().decode()
+
+
+def write_snapshot(products: Iterable[Product] | ProductFrame, path: str) -> None:
+    """
+    Write products to a snapshot file. The file is replaced atomically,
+    so readers never see a partly written snapshot.
+
+    Args:
+        products (Iterable[Product] | ProductFrame): A list or a stream of
+            products, or a ProductFrame.
+        path (str): Path to the snapshot file.
+    """
+    frame = (
+        products
+        if isinstance(products, ProductFrame)
+        else ProductFrame.from_products(products)
+    )
+
+    name_codes, name_offsets, name_data = _encode_names(frame.product_names, len(frame))
+    columns = {
+        "product_ids": np.asarray(frame.product_ids, dtype="<i8"),
+        "prices": np.asarray(frame.prices, dtype="<f8"),
+        "category_codes": np.asarray(frame.category_codes, dtype="<i4"),
+        "currency_codes": np.asarray(frame.currency_codes, dtype="<i4"),
+        "name_codes": name_codes.astype("<i4"),
+        "name_offsets": name_offsets.astype("<i8"),
+        "name_data": name_data,
+    }
+    specs: dict[str, _ColumnSpec] = {}
+    offset = 0
+    for name, column in columns.items():
+        specs[name] = {
+            "dtype": column.dtype.str,
+            "offset": offset,
+            "length": len(column),
+        }
+        offset = _align(offset + column.nbytes)
+    header = json.dumps(
+        {
+            "version": VERSION,
+            "rows": len(frame),
+            "categories": list(frame.categories),
+            "currencies": list(frame.currencies),
+            "columns": specs,
+        }
+    ).encode()
+
+    directory = os.path.dirname(path) or "."
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as tmp:
+        try:
+            tmp.write(MAGIC + struct.pack("<Q", len(header)) + header)
+            data_start = _align(tmp.tell())
+            for name, column in columns.items():
+                tmp.write(b"\0" * (data_start + specs[name]["offset"] - tmp.tell()))
+                tmp.write(column.tobytes())
+            tmp.close()
+            os.replace(tmp.name, path)
+        except BaseException:
+            # do not leave a partly written snapshot behind
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+
+
+def read_snapshot(path: str) -> ProductFrame:
+    """
+    Map a snapshot file into a ProductFrame without copying its columns.
+
+    Args:
+        path (str): Path to the snapshot file.
+
+    Returns:
+        ProductFrame: The products, backed by the mapped file.
+
+    Raises:
+        ValueError: If the file is not a snapshot of a supported version.
+    """
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a product snapshot")
+        (header_length,) = struct.unpack("<Q", file.read(8))
+        header = json.loads(file.read(header_length))
+    if header["version"] != VERSION:
+        raise ValueError(f"Unsupported snapshot version {header['version']}")
+
+    buffer = np.memmap(path, dtype=np.uint8, mode="r")
+    data_start = _align(len(MAGIC) + 8 + header_length)
+
+    def column(name: str) -> np.ndarray:
+        spec = header["columns"][name]
+        dtype = np.dtype(spec["dtype"])
+        start = data_start + spec["offset"]
+        return buffer[start : start + spec["length"] * dtype.itemsize].view(dtype)
+
+    return ProductFrame(
+        column("product_ids"),
+        column("prices"),
+        column("category_codes"),
+        column("currency_codes"),
+        StringColumn(column("name_codes"), column("name_offsets"), column("name_data")),
+        header["categories"],
+        header["currencies"],
+    )
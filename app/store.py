@@ -0,0 +1,234 @@
+"""
+This module provides the AggregateStore, per-category statistics kept up to
+date under inserts, updates and deletes of individual products. A refresh
+that changes a few products costs a few O(log n) updates instead of
+aggregating the whole catalog again.
+"""
+
+import heapq
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from app.calculations import (
+    CategoryAggregate,
+    ProductAggregate,
+    get_price_in_currency,
+)
+from app.models import Product
+
+
+def _fields(product: Product) -> tuple[str, str, float, str]:
+    """
+    The fields of a product that the statistics and answers depend on.
+    """
+    return product.category, product.product_name, product.price, product.currency
+
+
+@dataclass
+class _CategoryState:
+    """
+    Running statistics of a category. The heap holds (-price, position,
+    product_id) entries; entries of products that were removed from the
+    category or repriced are skipped when they reach the top.
+    """
+
+    count: int = 0
+    price_sum: float = 0.0
+    heap: list[tuple[float, int, int]] = field(default_factory=list)
+
+
+class AggregateStore:
+    """
+    Products keyed by product_id with the count, PLN price sum and most
+    expensive product of every category maintained incrementally.
+
+    Every product keeps the position of its first insertion, so of equally
+    priced products the one inserted first is the most expensive, as in a
+    single pass over the products in insertion order.
+    """
+
+    def __init__(self, products: Iterable[Product] = ()) -> None:
+        """
+        Args:
+            products (Iterable[Product]): Products to start with.
+        """
+        # product_id -> (product, PLN price, position)
+        self._products: dict[int, tuple[Product, float, int]] = {}
+        self._categories: dict[str, _CategoryState] = {}
+        self._next_position = 0
+        for product in products:
+            self.upsert(product)
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def __contains__(self, product_id: int) -> bool:
+        return product_id in self._products
+
+    def get(self, product_id: int) -> Product | None:
+        """
+        Args:
+            product_id (int): The id of the product.
+
+        Returns:
+            Product | None: The stored product, or None if it is not in the store.
+        """
+        entry = self._products.get(product_id)
+        return entry[0] if entry else None
+
+    def _add(self, product: Product, price: float, position: int) -> None:
+        state = self._categories.get(product.category)
+        if state is None:
+            state = self._categories[product.category] = _CategoryState()
+        state.count += 1
+        state.price_sum += price
+        heapq.heappush(state.heap, (-price, position, product.product_id))
+
+    def _remove(self, product: Product, price: float) -> None:
+        state = self._categories[product.category]
+        state.count -= 1
+        if not state.count:
+            del self._categories[product.category]
+            return
+        state.price_sum -= price
+        # drop stale entries once they outnumber the live ones
+        if len(state.heap) > 2 * state.count + 16:
+            # a product repriced back to an earlier price has two equal entries
+            state.heap = list(
+                {
+                    entry
+                    for entry in state.heap
+                    if self._is_live(product.category, entry)
+                }
+            )
+            heapq.heapify(state.heap)
+
+    def _is_live(self, category: str, entry: tuple[float, int, int]) -> bool:
+        stored = self._products.get(entry[2])
+        return (
+            stored is not None
+            and stored[0].category == category
+            and stored[1] == -entry[0]
+            and stored[2] == entry[1]
+        )
+
+    def upsert(self, product: Product) -> bool:
+        """
+        Insert a product, or replace the stored product with the same id.
+
+        Args:
+            product (Product): The product.
+
+        Returns:
+            bool: False if a product with the same category, name, price and
+            currency was already stored; only its next_product_token may differ.
+        """
+        stored = self._products.get(product.product_id)
+        if stored is None:
+            position = self._next_position
+            self._next_position += 1
+        else:
+            position = stored[2]
+            if _fields(stored[0]) == _fields(product):
+                # e.g. only the next_product_token differs after a re-crawl
+                self._products[product.product_id] = (product, stored[1], position)
+                return False
+        price = get_price_in_currency(product.price, product.currency, "PLN")
+        if stored is not None:
+            if stored[0].category == product.category and stored[1] == price:
+                # the statistics and the heap entry stay valid
+                self._products[product.product_id] = (product, price, position)
+                return True
+            self._remove(stored[0], stored[1])
+        self._products[product.product_id] = (product, price, position)
+        self._add(product, price, position)
+        return True
+
+    def delete(self, product_id: int) -> bool:
+        """
+        Remove a product.
+
+        Args:
+            product_id (int): The id of the product.
+
+        Returns:
+            bool: True if the product was in the store.
+        """
+        stored = self._products.pop(product_id, None)
+        if stored is None:
+            return False
+        self._remove(stored[0], stored[1])
+        return True
+
+    def sync(self, products: Iterable[Product]) -> tuple[int, int]:
+        """
+        Make the store hold exactly the given products. Unchanged products
+        are only compared, so the statistics are updated for the changes alone.
+
+        Args:
+            products (Iterable[Product]): The current products.
+
+        Returns:
+            tuple[int, int]: Number of inserted or updated and of deleted products.
+        """
+        changed, current = 0, set()
+        for product in products:
+            current.add(product.product_id)
+            changed += self.upsert(product)
+        removed = [
+            product_id for product_id in self._products if product_id not in current
+        ]
+        for product_id in removed:
+            self.delete(product_id)
+        return changed, len(removed)
+
+    def counts_per_category(self) -> dict[str, int]:
+        """
+        Returns:
+            dict[str, int]: Number of products in each category.
+        """
+        return {name: state.count for name, state in self._categories.items()}
+
+    def most_expensive_in_category(self, category: str) -> Product | None:
+        """
+        Args:
+            category (str): The category to look up.
+
+        Returns:
+            Product | None: The product with the highest PLN price in the category,
+            or None if there are no products in it.
+        """
+        state = self._categories.get(category)
+        if state is None:
+            return None
+        while not self._is_live(category, state.heap[0]):
+            heapq.heappop(state.heap)
+        return self._products[state.heap[0][2]][0]
+
+    def average_price_for_category(self, category: str) -> float | None:
+        """
+        Args:
+            category (str): The category to look up.
+
+        Returns:
+            float | None: The average PLN price in the category,
+            or None if there are no products in it.
+        """
+        state = self._categories.get(category)
+        return state.price_sum / state.count if state else None
+
+    def to_aggregate(self) -> ProductAggregate:
+        """
+        Returns:
+            ProductAggregate: A copy of the current statistics, e.g. for answer_questions.
+        """
+        aggregate = ProductAggregate(count=len(self))
+        for name, state in self._categories.items():
+            most_expensive = self.most_expensive_in_category(name)
+            aggregate.categories[name] = CategoryAggregate(
+                count=state.count,
+                price_sum=state.price_sum,
+                max_price=-state.heap[0][0],
+                most_expensive=most_expensive,
+            )
+        return aggregate
@@ -0,0 +1,236 @@
+"""
+This module benchmarks app.calculations on synthetic catalogs of growing size.
+For every size it records the fastest of several timed runs and the peak
+traced memory of each calculation, saves the results as JSON and flags
+regressions against a baseline.
+
+Usage:
+    python -m benchmarks.bench_calculations --sizes 1000 10000 100000
+    python -m benchmarks.bench_calculations --save-baseline
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from app.calculations import (
+    count_products_per_category,
+    get_average_price_for_category,
+    get_most_expensive_in_category,
+)
+from app.main import answer_questions
+from app.models import Product
+from benchmarks.stub_api import CATEGORIES, CURRENCIES
+
+DEFAULT_SIZES = [10**3, 10**4, 10**5]
+DEFAULT_REPEATS = 5
+DEFAULT_BASELINE = os.path.join("benchmarks", "results", "calculations_baseline.json")
+
+
+def generate_products(n: int, seed: int = 0) -> list[Product]:
+    """
+    Generate a synthetic catalog with the category and currency mix of the API.
+
+    Args:
+        n (int): Number of products.
+        seed (int): Seed of the generator.
+
+    Returns:
+        list[Product]: The generated products.
+    """
+    rng = random.Random(seed)
+    return [
+        Product.from_trusted(
+            {
+                "product_id": i,
+                "product_name": f"Product {i}",
+                "category": rng.choice(CATEGORIES),
+                "price": round(rng.uniform(1, 1000), 2),
+                "currency": rng.choice(CURRENCIES),
+                "next_product_token": None,
+            }
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+def answer_questions_quietly(products: list[Product]) -> None:
+    """
+    Run answer_questions without printing and with a throwaway answers file.
+
+    Args:
+        products (list[Product]): The products to analyze.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            answer_questions(products, os.path.join(tmp_dir, "answers.txt"))
+
+
+CASES: dict[str, Callable[[list[Product]], Any]] = {
+    "count_products_per_category": count_products_per_category,
+    "get_most_expensive_in_category": lambda products: get_most_expensive_in_category(
+        products, "Fashion"
+    ),
+    "get_average_price_for_category": lambda products: get_average_price_for_category(
+        products, "Toys & Games"
+    ),
+    "answer_questions": answer_questions_quietly,
+}
+
+
+def measure(
+    func: Callable[[list[Product]], Any],
+    products: list[Product],
+    repeats: int = DEFAULT_REPEATS,
+) -> dict:
+    """
+    Measure a calculation. It is timed over several runs, and the fastest one is
+    reported, as noise only ever adds time. Memory is measured in a separate run,
+    so tracing allocations does not slow down the timed runs.
+
+    Args:
+        func (Callable[[list[Product]], Any]): The calculation.
+        products (list[Product]): Its input.
+        repeats (int): Number of timed runs.
+
+    Returns:
+        dict: Fastest and median wall time in seconds and peak traced memory in bytes.
+    """
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func(products)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        func(products)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "seconds": min(timings),
+        "seconds_median": statistics.median(timings),
+        "peak_memory": peak,
+    }
+
+
+def run_calculations_benchmark(
+    sizes: list[int], repeats: int = DEFAULT_REPEATS
+) -> list[dict]:
+    """
+    Measure every calculation at every catalog size.
+
+    Args:
+        sizes (list[int]): Catalog sizes.
+        repeats (int): Number of timed runs of every calculation.
+
+    Returns:
+        list[dict]: One result per size and calculation.
+    """
+    # the converter is loaded lazily; load it outside of the measurements
+    get_average_price_for_category(generate_products(10), CATEGORIES[0])
+
+    results = []
+    for size in sizes:
+        products = generate_products(size)
+        for name, func in CASES.items():
+            results.append(
+                {"name": name, "size": size, **measure(func, products, repeats)}
+            )
+        del products
+    return results
+
+
+def find_regressions(
+    results: list[dict], baseline: list[dict], tolerance: float
+) -> list[str]:
+    """
+    Compare results with a baseline.
+
+    Args:
+        results (list[dict]): The current results.
+        baseline (list[dict]): The baseline results.
+        tolerance (float): Allowed relative slowdown or memory growth, e.g. 0.25.
+
+    Returns:
+        list[str]: A description of every regression found.
+    """
+    previous = {(result["name"], result["size"]): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result["name"], result["size"]))
+        if before is None:
+            continue
+        for metric in ("seconds", "peak_memory"):
+            if before[metric] and result[metric] > before[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{result['name']} at {result['size']} products: {metric} "
+                    f"{before[metric]:.6g} -> {result[metric]:.6g}"
+                )
+    return regressions
+
+
+def main() -> None:
+    """
+    Run the benchmark, save the results and compare them with the baseline.
+    Exits with status 1 if a regression is found.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--output", help="file to save the JSON results to")
+    parser.add_argument(
+        "--repeats",
+        type=int,
+        default=DEFAULT_REPEATS,
+        help="timed runs of every calculation; the fastest is compared",
+    )
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="save the results as the new baseline instead of comparing",
+    )
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = run_calculations_benchmark(args.sizes, args.repeats)
+    report = json.dumps(results, indent=2)
+    print(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(report + "\n")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            file.write(report + "\n")
+        print(f"Baseline saved to {args.baseline}.")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline first.")
+        return
+
+    with open(args.baseline, "r", encoding="utf-8") as file:
+        regressions = find_regressions(results, json.load(file), args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    if regressions:
+        sys.exit(1)
+    print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+This module benchmarks the crawlers against the local stand-in product API.
+It reports products per second, p50/p99 request latency and the number of
+retries the client made, e.g. after injected 503 responses.
+
+Usage:
+    python -m benchmarks.crawl --products 2000 --chains 4 --latency 0.005
+"""
+
+import argparse
+import json
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+import requests
+
+from app.fetch_data import (
+    api_circuit_breaker,
+    api_rate_limiter,
+    create_session,
+    fetch_all_products,
+    fetch_chains,
+    fetch_product,
+    fetch_product_async,
+)
+from app.metrics import registry
+from benchmarks.stub_api import StubProductAPI
+
+CRAWLERS = ("sync", "async")
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    """
+    Nearest-rank percentile of a list of values.
+
+    Args:
+        values (list[float]): The values.
+        q (float): The percentile, between 0 and 1.
+
+    Returns:
+        float | None: The percentile, or None if there are no values.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+
+@contextmanager
+def client_limits(rate_limit: float | None, breaker: bool) -> Iterator[None]:
+    """
+    Set the shared client rate limit and circuit breaker for a benchmark run,
+    restoring the configured ones afterwards.
+
+    Args:
+        rate_limit (float | None): Requests per second allowed; None disables the limit.
+        breaker (bool): Whether failures count towards opening the circuit breaker.
+    """
+    rate, failure_on = api_rate_limiter.rate, api_circuit_breaker.failure_on
+    api_rate_limiter.rate = rate_limit
+    if not breaker:
+        api_circuit_breaker.failure_on = ()
+    try:
+        yield
+    finally:
+        api_rate_limiter.rate = rate
+        api_circuit_breaker.failure_on = failure_on
+
+
+def run_crawl_benchmark(
+    crawler: str,
+    n_products: int,
+    chains: int = 1,
+    latency: float = 0.0,
+    error_rate: float = 0.0,
+    payload_size: int = 0,
+    concurrency: int = 4,
+    rate_limit: float | None = None,
+    breaker: bool = False,
+) -> dict[str, Any]:
+    """
+    Crawl all chains of a fresh stand-in API and measure the crawl.
+
+    The sync crawler follows the chains one after another; the async crawler
+    runs up to `concurrency` of them at the same time. The client rate limiter
+    and circuit breaker are off unless asked for, so the crawler itself is measured.
+
+    Args:
+        crawler (str): "sync" or "async".
+        n_products (int): Number of products in every chain.
+        chains (int): Number of chains to crawl.
+        latency (float): Seconds the stand-in delays every response by.
+        error_rate (float): Probability of a 503 response.
+        payload_size (int): Extra bytes in every product.
+        concurrency (int): Chains crawled at the same time by the async crawler.
+        rate_limit (float | None): Requests per second allowed by the client
+            rate limiter; None disables it.
+        breaker (bool): Whether the client circuit breaker is active.
+
+    Returns:
+        dict[str, Any]: The benchmark parameters and results.
+    """
+    latencies: list[float] = []
+
+    def record_latency(response: requests.Response, *_: Any, **__: Any) -> None:
+        latencies.append(response.elapsed.total_seconds())
+
+    # the retry decorator counts the retries of every fetch function
+    fetch = fetch_product if crawler == "sync" else fetch_product_async
+    retries = registry.counter("retries_total", function=fetch.__qualname__)
+    retries_before = retries.value
+
+    session = create_session(pool_maxsize=max(concurrency, 10))
+    session.hooks["response"].append(record_latency)
+
+    with StubProductAPI(
+        n_products, latency, error_rate, payload_size
+    ) as api, client_limits(rate_limit, breaker):
+        urls = [f"{api.url}/{chain}" for chain in range(chains)]
+        started = time.perf_counter()
+        if crawler == "sync":
+            products = [
+                product
+                for url in urls
+                for product in fetch_all_products(url, session=session)
+            ]
+        else:
+            products = fetch_chains([(url, None) for url in urls], concurrency, session)
+        elapsed = time.perf_counter() - started
+        requests_served = api.requests_served
+    session.close()
+
+    return {
+        "crawler": crawler,
+        "products": len(products),
+        "chains": chains,
+        "latency": latency,
+        "error_rate": error_rate,
+        "payload_size": payload_size,
+        "concurrency": concurrency if crawler == "async" else 1,
+        "rate_limit": rate_limit,
+        "circuit_breaker": breaker,
+        "seconds": elapsed,
+        "products_per_second": len(products) / elapsed if elapsed else None,
+        "requests": requests_served,
+        "retries": int(retries.value - retries_before),
+        "latency_p50": percentile(latencies, 0.5),
+        "latency_p99": percentile(latencies, 0.99),
+    }
+
+
+def main() -> None:
+    """
+    Run the benchmark for the chosen crawlers and print the results as JSON.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--products", type=int, default=1000, help="products per chain")
+    parser.add_argument("--chains", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--payload-size", type=int, default=0, help="bytes")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--crawler", choices=CRAWLERS, action="append")
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        help="requests per second allowed by the client rate limiter "
+        "(off by default)",
+    )
+    parser.add_argument(
+        "--circuit-breaker",
+        action="store_true",
+        help="keep the client circuit breaker active",
+    )
+    parser.add_argument("--output", help="file to save the JSON results to")
+    args = parser.parse_args()
+
+    if args.rate_limit is not None:
+        print(
+            f"Client rate limit of {args.rate_limit:g} requests/s in effect.",
+            file=sys.stderr,
+        )
+
+    results = [
+        run_crawl_benchmark(
+            crawler,
+            args.products,
+            args.chains,
+            args.latency,
+            args.error_rate,
+            args.payload_size,
+            args.concurrency,
+            args.rate_limit,
+            args.circuit_breaker,
+        )
+        for crawler in args.crawler or CRAWLERS
+    ]
+
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
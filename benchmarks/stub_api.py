@@ -0,0 +1,204 @@
+"""
+This module provides a local stand-in for the product API.
+It serves `next_product_token` chains of generated products over real sockets,
+with configurable latency, rate of 503 responses and payload size.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+CATEGORIES = [
+    "Pet Supplies",
+    "Electronics",
+    "Toys & Games",
+    "Outdoor Equipment",
+    "Office Supplies",
+    "Sports Gear",
+    "Fashion",
+    "Automotive",
+    "Home Appliances",
+]
+CURRENCIES = ["PLN", "PLN", "PLN", "EUR", "USD", "GBP"]
+
+
+class StubProductAPI:
+    """
+    A product API served from a background thread.
+
+    Every path is a separate chain of `n_products` products; the product of chain
+    `/k` at position i has id `k * n_products + i + 1`. Tokens are the positions
+    of the next product, so chains can also be started from a seed token.
+
+    Attributes:
+        requests_served (int): Number of requests answered, including errors.
+        errors_served (int): Number of injected 503 responses.
+    """
+
+    def __init__(
+        self,
+        n_products: int,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        payload_size: int = 0,
+        seed: int = 0,
+    ) -> None:
+        """
+        Args:
+            n_products (int): Number of products in every chain.
+            latency (float): Seconds each response is delayed by.
+            error_rate (float): Probability of answering a request with 503.
+            payload_size (int): Number of extra bytes added to every product.
+            seed (int): Seed of the generated products and injected errors.
+        """
+        self.n_products = n_products
+        self.latency = latency
+        self.error_rate = error_rate
+        self.payload_size = payload_size
+        self.requests_served = 0
+        self.errors_served = 0
+        self._random = random.Random(seed)
+        self._seed = seed
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        """
+        str: The base URL of the running server.
+
+        Raises:
+            RuntimeError: If the server has not been started.
+        """
+        if self._server is None:
+            raise RuntimeError("The stub API is not running")
+        host, port = self._server.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def product(self, chain: int, position: int) -> dict:
+        """
+        Generate the product at a position of a chain. The same arguments
+        always give the same product.
+
+        Args:
+            chain (int): The chain number.
+            position (int): The position of the product in the chain.
+
+        Returns:
+            dict: The product as served by the API.
+        """
+        product_id = chain * self.n_products + position + 1
+        rng = random.Random(self._seed * 1_000_003 + product_id)
+        next_position = position + 1
+        data = {
+            "product_id": product_id,
+            "product_name": f"Product {product_id}",
+            "category": rng.choice(CATEGORIES),
+            "price": round(rng.uniform(1, 1000), 2),
+            "currency": rng.choice(CURRENCIES),
+            "next_product_token": (
+                str(next_position) if next_position < self.n_products else None
+            ),
+        }
+        if self.payload_size:
+            data["description"] = "x" * self.payload_size
+        return data
+
+    def should_fail(self) -> bool:
+        """
+        Count a request and decide whether it gets an injected 503.
+
+        Returns:
+            bool: True if the request should fail.
+        """
+        with self._lock:
+            self.requests_served += 1
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.errors_served += 1
+            return fail
+
+    def start(self) -> "StubProductAPI":
+        """
+        Start serving on a free local port.
+
+        Returns:
+            StubProductAPI: The API itself, to allow chaining.
+        """
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """
+            Answers product requests of the stand-in API.
+            """
+
+            protocol_version = "HTTP/1.1"
+            # headers and body are sent in separate writes; without this, delayed
+            # ACKs stall every keep-alive response
+            disable_nagle_algorithm = True
+
+            def do_GET(self) -> None:  # pylint: disable=invalid-name
+                """
+                Serve the product pointed to by the next_product_token query parameter.
+                """
+                url = urlparse(self.path)
+                token = parse_qs(url.query).get("next_product_token", [None])[0]
+                if api.latency:
+                    time.sleep(api.latency)
+                if api.should_fail():
+                    self.send_json(503, {"detail": "Service unavailable"})
+                    return
+                chain = int(url.path.strip("/") or 0)
+                position = int(token) if token else 0
+                if position >= api.n_products:
+                    self.send_json(404, {"detail": "Product not found"})
+                    return
+                self.send_json(200, api.product(chain, position))
+
+            def send_json(self, status: int, data: dict) -> None:
+                """
+                Send a JSON response.
+                """
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            # pylint: disable-next=arguments-differ
+            def log_message(self, *args: Any) -> None:
+                """
+                Silence request logging.
+                """
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            name="stub-product-api",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop the server.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "StubProductAPI":
+        return self.start()
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
@@ -0,0 +1,169 @@
+"""
+Unit tests for the benchmarks package.
+
+These tests check that the stand-in product API serves well-formed chains
+with injected errors, and that the crawl and calculations benchmarks report
+their measurements.
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from app.fetch_data import api_circuit_breaker, api_rate_limiter
+from benchmarks.bench_calculations import (
+    CASES,
+    find_regressions,
+    generate_products,
+    measure,
+    run_calculations_benchmark,
+)
+from benchmarks.crawl import percentile, run_crawl_benchmark
+from benchmarks.stub_api import StubProductAPI
+
+
+class TestStubProductAPI(unittest.TestCase):
+    """
+    Unit tests for the StubProductAPI class.
+    """
+
+    def test_serves_chain(self) -> None:
+        """
+        Test that a chain can be followed to its end over real sockets.
+        """
+        with StubProductAPI(3, payload_size=10) as api:
+            token, ids = None, []
+            while True:
+                params = {"next_product_token": token} if token else {}
+                data = requests.get(f"{api.url}/1", params=params, timeout=5).json()
+                ids.append(data["product_id"])
+                token = data["next_product_token"]
+                if not token:
+                    break
+
+        self.assertEqual(ids, [4, 5, 6])
+        self.assertEqual(len(data["description"]), 10)
+        self.assertEqual(api.requests_served, 3)
+
+    def test_injects_errors(self) -> None:
+        """
+        Test that every request fails with 503 when the error rate is 1.
+        """
+        with StubProductAPI(3, error_rate=1.0) as api:
+            response = requests.get(api.url, timeout=5)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(api.errors_served, 1)
+
+    def test_url_before_start(self) -> None:
+        """
+        Test that the URL of a stopped stand-in is refused.
+        """
+        with self.assertRaises(RuntimeError):
+            _ = StubProductAPI(3).url
+
+
+class TestCrawlBenchmark(unittest.TestCase):
+    """
+    Unit tests for the crawl benchmark harness.
+    """
+
+    def test_percentile(self) -> None:
+        """
+        Test the nearest-rank percentile.
+        """
+        self.assertEqual(percentile([3.0, 1.0, 2.0], 0.5), 2.0)
+        self.assertEqual(percentile([3.0, 1.0, 2.0], 0.99), 3.0)
+        self.assertIsNone(percentile([], 0.5))
+
+    def test_run_crawl_benchmark(self) -> None:
+        """
+        Test that both crawlers fetch every product and the results are reported.
+        """
+        for crawler in ("sync", "async"):
+            result = run_crawl_benchmark(crawler, n_products=5, chains=2)
+
+            self.assertEqual(result["products"], 10)
+            self.assertEqual(result["requests"], 10)
+            self.assertEqual(result["retries"], 0)
+            self.assertGreater(result["products_per_second"], 0)
+            self.assertIsNotNone(result["latency_p99"])
+            self.assertIsNone(result["rate_limit"])
+
+    @patch("app.decorators.time.sleep")
+    def test_retries_are_counted_by_the_client(self, _mock_sleep: MagicMock) -> None:
+        """
+        Test that the reported retries are the ones the crawler made.
+        """
+        result = run_crawl_benchmark("sync", n_products=5, error_rate=0.5)
+
+        self.assertEqual(result["products"], 5)
+        self.assertEqual(result["retries"], result["requests"] - 5)
+
+    def test_client_limits_are_restored(self) -> None:
+        """
+        Test that a benchmark run leaves the configured client limits in place.
+        """
+        rate, failure_on = api_rate_limiter.rate, api_circuit_breaker.failure_on
+
+        result = run_crawl_benchmark("sync", n_products=3, rate_limit=1000.0)
+
+        self.assertEqual(result["rate_limit"], 1000.0)
+        self.assertEqual(api_rate_limiter.rate, rate)
+        self.assertEqual(api_circuit_breaker.failure_on, failure_on)
+
+
+class TestCalculationsBenchmark(unittest.TestCase):
+    """
+    Unit tests for the calculations scaling benchmark.
+    """
+
+    def test_generate_products(self) -> None:
+        """
+        Test that synthetic catalogs are reproducible.
+        """
+        self.assertEqual(generate_products(50, seed=3), generate_products(50, seed=3))
+        self.assertEqual(len(generate_products(50)), 50)
+
+    def test_run_calculations_benchmark(self) -> None:
+        """
+        Test that every calculation is measured at every size.
+        """
+        results = run_calculations_benchmark([10, 20])
+
+        self.assertEqual(len(results), 2 * len(CASES))
+        for result in results:
+            self.assertGreaterEqual(result["seconds"], 0)
+            self.assertGreater(result["peak_memory"], 0)
+
+    def test_measure_repeats(self) -> None:
+        """
+        Test that a calculation is timed several times and the fastest run kept.
+        """
+        func = MagicMock()
+
+        result = measure(func, [], repeats=3)
+
+        # three timed runs and one traced run
+        self.assertEqual(func.call_count, 4)
+        self.assertLessEqual(result["seconds"], result["seconds_median"])
+
+    def test_find_regressions(self) -> None:
+        """
+        Test that only results worse than the baseline beyond the tolerance are flagged.
+        """
+        baseline = [{"name": "a", "size": 10, "seconds": 1.0, "peak_memory": 100}]
+        results = [
+            {"name": "a", "size": 10, "seconds": 1.2, "peak_memory": 200},
+            {"name": "b", "size": 10, "seconds": 9.0, "peak_memory": 900},
+        ]
+
+        regressions = find_regressions(results, baseline, tolerance=0.25)
+
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("peak_memory", regressions[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
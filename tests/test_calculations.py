@@ -9,11 +9,15 @@ import unittest
 from unittest.mock import MagicMock, patch
 
 from app.calculations import (
+    PriceRankings,
+    ProductAggregate,
     count_products,
     count_products_per_category,
     get_average_price_for_category,
     get_most_expensive_in_category,
     get_price_in_currency,
+    get_price_quantiles_for_category,
+    get_top_k_in_category,
 )
 from app.models import Product
 
@@ -209,6 +213,199 @@ class TestCalculations(unittest.TestCase):
         average_price = get_average_price_for_category(products, "Category 1")
         self.assertIsNone(average_price)
 
+    @patch("app.calculations.get_price_in_currency")
+    def test_product_aggregate(self, mock_get_price_in_currency: MagicMock) -> None:
+        """
+        Test that ProductAggregate answers all questions from a single pass over a stream.
+        """
+        mock_get_price_in_currency.side_effect = [400.0, 600.0, 300.0]
+        products = [
+            Product(
+                product_id=1,
+                product_name="Product 1",
+                price=100.0,
+                category="Category 1",
+                currency="USD",
+                next_product_token="dsdvsdfds",
+            ),
+            Product(
+                product_id=2,
+                product_name="Product 2",
+                price=200.0,
+                category="Category 1",
+                currency="USD",
+                next_product_token="gdrgdfgd",
+            ),
+            Product(
+                product_id=3,
+                product_name="Product 3",
+                price=300.0,
+                category="Category 2",
+                currency="PLN",
+                next_product_token=None,
+            ),
+        ]
+        aggregate = ProductAggregate().update(iter(products))
+
+        self.assertEqual(aggregate.count, 3)
+        self.assertEqual(
+            aggregate.counts_per_category(), {"Category 1": 2, "Category 2": 1}
+        )
+        self.assertEqual(
+            aggregate.most_expensive_in_category("Category 1").product_id, 2
+        )
+        self.assertEqual(aggregate.average_price_for_category("Category 1"), 500.0)
+        self.assertIsNone(aggregate.most_expensive_in_category("Category 3"))
+        self.assertIsNone(aggregate.average_price_for_category("Category 3"))
+        self.assertEqual(mock_get_price_in_currency.call_count, 3)
+
+    @patch("app.calculations.get_price_in_currency")
+    def test_product_aggregate_merge(
+        self, mock_get_price_in_currency: MagicMock
+    ) -> None:
+        """
+        Test that merging aggregates of two parts equals aggregating the whole collection.
+        """
+        mock_get_price_in_currency.side_effect = lambda price, *_: price
+        products = [
+            Product(
+                product_id=i,
+                product_name=f"Product {i}",
+                price=float(price),
+                category=category,
+                currency="PLN",
+                next_product_token=None,
+            )
+            for i, (price, category) in enumerate(
+                [(100, "A"), (500, "B"), (300, "A"), (200, "B"), (700, "A")]
+            )
+        ]
+        whole = ProductAggregate().update(products)
+        merged = (
+            ProductAggregate()
+            .update(products[:2])
+            .merge(ProductAggregate().update(products[2:]))
+        )
+
+        self.assertEqual(merged.count, whole.count)
+        self.assertEqual(merged.counts_per_category(), whole.counts_per_category())
+        for category in ("A", "B"):
+            self.assertEqual(
+                merged.most_expensive_in_category(category),
+                whole.most_expensive_in_category(category),
+            )
+            self.assertAlmostEqual(
+                merged.average_price_for_category(category),
+                whole.average_price_for_category(category),
+            )
+
+    @patch("app.calculations.get_price_in_currency")
+    def test_count_products_per_category_skips_conversion(
+        self, mock_get_price_in_currency: MagicMock
+    ) -> None:
+        """
+        Test that counting per category does not convert any prices.
+        """
+        products = [
+            Product(
+                product_id=1,
+                product_name="Product 1",
+                price=100.0,
+                category="Category 1",
+                currency="USD",
+                next_product_token=None,
+            )
+        ]
+        self.assertEqual(count_products_per_category(products), {"Category 1": 1})
+        mock_get_price_in_currency.assert_not_called()
+
+    @patch("app.calculations.get_price_in_currency")
+    def test_get_top_k_in_category(self, mock_get_price_in_currency: MagicMock) -> None:
+        """
+        Test that the k most expensive products of a category are returned in order,
+        converting only the prices of that category.
+        """
+        mock_get_price_in_currency.side_effect = lambda price, *_: price
+        products = [
+            Product(
+                product_id=i,
+                product_name=f"Product {i}",
+                price=float(price),
+                category=category,
+                currency="PLN",
+                next_product_token=None,
+            )
+            for i, (price, category) in enumerate(
+                [(100, "A"), (900, "B"), (300, "A"), (700, "A"), (300, "A")]
+            )
+        ]
+
+        top = get_top_k_in_category(iter(products), "A", k=3)
+
+        self.assertEqual([product.product_id for product in top], [3, 2, 4])
+        self.assertEqual(mock_get_price_in_currency.call_count, 4)
+        self.assertEqual(get_top_k_in_category(products, "C"), [])
+
+    @patch("app.calculations.get_price_in_currency")
+    def test_get_price_quantiles_for_category(
+        self, mock_get_price_in_currency: MagicMock
+    ) -> None:
+        """
+        Test that quantiles of a small category are exact.
+        """
+        mock_get_price_in_currency.side_effect = lambda price, *_: price
+        products = [
+            Product(
+                product_id=i,
+                product_name=f"Product {i}",
+                price=float(i),
+                category="A",
+                currency="PLN",
+                next_product_token=None,
+            )
+            for i in range(1, 101)
+        ]
+
+        quantiles = get_price_quantiles_for_category(products, "A", (0.5, 0.9, 0.99))
+
+        self.assertEqual(quantiles, {0.5: 50.0, 0.9: 90.0, 0.99: 99.0})
+        self.assertIsNone(get_price_quantiles_for_category(products, "B"))
+
+    @patch("app.calculations.get_price_in_currency")
+    def test_price_rankings_merge(self, mock_get_price_in_currency: MagicMock) -> None:
+        """
+        Test that merging rankings of two parts equals ranking the whole collection.
+        """
+        mock_get_price_in_currency.side_effect = lambda price, *_: price
+        products = [
+            Product(
+                product_id=i,
+                product_name=f"Product {i}",
+                price=float(price),
+                category=category,
+                currency="PLN",
+                next_product_token=None,
+            )
+            for i, (price, category) in enumerate(
+                [(100, "A"), (500, "B"), (300, "A"), (200, "B"), (700, "A")]
+            )
+        ]
+        whole = PriceRankings(k=2).update(products)
+        merged = (
+            PriceRankings(k=2)
+            .update(products[:3])
+            .merge(PriceRankings(k=2).update(products[3:]))
+        )
+
+        for category in ("A", "B"):
+            self.assertEqual(
+                merged.top_in_category(category), whole.top_in_category(category)
+            )
+            self.assertEqual(
+                merged.price_quantiles_for_category(category, [0.5]),
+                whole.price_quantiles_for_category(category, [0.5]),
+            )
+
 
 if __name__ == "__main__":
     unittest.main()
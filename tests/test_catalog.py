@@ -0,0 +1,110 @@
+"""
+Unit tests for the catalog module.
+
+These tests cover the ProductCatalog indexes: lookups by id and by category,
+the most expensive and average price per category, and PLN price ranges.
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.calculations import (
+    get_average_price_for_category,
+    get_most_expensive_in_category,
+)
+from app.catalog import ProductCatalog
+from app.models import Product
+
+
+class TestProductCatalog(unittest.TestCase):
+    """
+    Unit tests for the ProductCatalog class.
+    """
+
+    products = [
+        Product(
+            product_id=i,
+            product_name=f"Product {i}",
+            price=float(price),
+            category=category,
+            currency="PLN",
+            next_product_token=None,
+        )
+        for i, (price, category) in enumerate(
+            [(100, "A"), (500, "B"), (300, "A"), (700, "A"), (200, "B"), (700, "A")],
+            start=1,
+        )
+    ]
+
+    def setUp(self) -> None:
+        self.catalog = ProductCatalog(self.products)
+
+    def test_get(self) -> None:
+        """
+        Test looking up products by id.
+        """
+        self.assertEqual(self.catalog.get(3), self.products[2])
+        self.assertIsNone(self.catalog.get(42))
+
+    def test_in_category(self) -> None:
+        """
+        Test that category buckets keep catalog order.
+        """
+        self.assertEqual([p.product_id for p in self.catalog.in_category("B")], [2, 5])
+        self.assertEqual(self.catalog.in_category("C"), [])
+
+    def test_count_per_category(self) -> None:
+        """
+        Test counting products per category.
+        """
+        self.assertEqual(self.catalog.count_per_category(), {"A": 4, "B": 2})
+        self.assertEqual(len(self.catalog), 6)
+
+    def test_most_expensive_matches_calculations(self) -> None:
+        """
+        Test that the indexed maximum matches the linear one, including ties.
+        """
+        for category in ("A", "B", "C"):
+            self.assertEqual(
+                self.catalog.most_expensive_in_category(category),
+                get_most_expensive_in_category(self.products, category),
+            )
+
+    def test_average_matches_calculations(self) -> None:
+        """
+        Test that the indexed average matches the linear one.
+        """
+        for category in ("A", "B", "C"):
+            self.assertEqual(
+                self.catalog.average_price_for_category(category),
+                get_average_price_for_category(self.products, category),
+            )
+
+    def test_between(self) -> None:
+        """
+        Test finding products in a closed PLN price range.
+        """
+        self.assertEqual(
+            [p.product_id for p in self.catalog.between(200, 500, "A")], [3]
+        )
+        self.assertEqual(
+            [p.product_id for p in self.catalog.between(200, 500)], [3, 5, 2]
+        )
+        self.assertEqual(self.catalog.between(800, 900), [])
+        self.assertEqual(self.catalog.between(0, 1000, "Unknown"), [])
+
+    @patch("app.catalog.get_price_in_currency")
+    def test_prices_converted_once(self, mock_get_price_in_currency: MagicMock) -> None:
+        """
+        Test that every price is converted to PLN once, when the catalog is built.
+        """
+        mock_get_price_in_currency.side_effect = lambda price, *_: price * 4
+        catalog = ProductCatalog(self.products)
+
+        self.assertEqual(mock_get_price_in_currency.call_count, len(self.products))
+        self.assertEqual(catalog.most_expensive_in_category("B").product_id, 2)
+        self.assertEqual(catalog.between(2000, 2000, "B")[0].product_id, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
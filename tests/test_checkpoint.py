@@ -0,0 +1,106 @@
+"""
+Unit tests for the checkpoint module.
+
+These tests cover appending products, loading them back, recovering from
+a partially written line, discarding a checkpoint of another source and
+removing the checkpoint.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from app.checkpoint import Checkpoint
+from app.models import Product
+
+
+class TestCheckpoint(unittest.TestCase):
+    """
+    Unit tests for the Checkpoint class.
+    """
+
+    products = [
+        Product(
+            product_id=i,
+            product_name=f"Product {i}",
+            category="Category 1",
+            price=10.0 * i,
+            currency="USD",
+            next_product_token=f"token{i}",
+        )
+        for i in range(1, 4)
+    ]
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "checkpoint.jsonl")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def test_load_missing_file(self) -> None:
+        """
+        Test that a missing checkpoint holds no products.
+        """
+        self.assertEqual(Checkpoint(self.path).load(), [])
+
+    def test_append_and_load(self) -> None:
+        """
+        Test that appended products are loaded back in order.
+        """
+        checkpoint = Checkpoint(self.path, batch_size=2)
+        for product in self.products:
+            checkpoint.append(product)
+        checkpoint.close()
+
+        self.assertEqual(Checkpoint(self.path).load(), self.products)
+
+    def test_load_drops_incomplete_line(self) -> None:
+        """
+        Test that a partially written last line is dropped and later appends stay readable.
+        """
+        checkpoint = Checkpoint(self.path)
+        checkpoint.append(self.products[0])
+        checkpoint.close()
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(self.products[1].model_dump_json()[:20])
+
+        checkpoint = Checkpoint(self.path)
+        self.assertEqual(checkpoint.load(), self.products[:1])
+        checkpoint.append(self.products[2])
+        checkpoint.close()
+
+        self.assertEqual(
+            Checkpoint(self.path).load(), [self.products[0], self.products[2]]
+        )
+
+    def test_source_mismatch(self) -> None:
+        """
+        Test that a checkpoint saved for another source is discarded.
+        """
+        checkpoint = Checkpoint(self.path, source="http://a/")
+        self.assertEqual(checkpoint.load(), [])
+        checkpoint.append(self.products[0])
+        checkpoint.close()
+
+        self.assertEqual(
+            Checkpoint(self.path, source="http://a/").load(), self.products[:1]
+        )
+        with self.assertLogs("app.checkpoint", level="WARNING"):
+            self.assertEqual(Checkpoint(self.path, source="http://b/").load(), [])
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_remove(self) -> None:
+        """
+        Test that removing the checkpoint deletes the file.
+        """
+        checkpoint = Checkpoint(self.path)
+        checkpoint.append(self.products[0])
+        checkpoint.remove()
+
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,14 +1,36 @@
 """
-Unit tests for the retry decorator.
+Unit tests for the decorators module.
 
 These tests cover the functionality of the retry decorator, including
-success cases, failure cases, and varying retry delays.
+success cases, failure cases, and varying retry delays, as well as
+the rate limiter and circuit breaker decorators.
 """
 
+import asyncio
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
-from app.decorators import retry
+from app.decorators import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    TokenBucket,
+    circuit_breaker,
+    get_retry_after,
+    rate_limit,
+    retry,
+)
+
+
+def http_error(retry_after: str | None = None) -> Exception:
+    """
+    Build an error carrying an HTTP response with an optional Retry-After header.
+    """
+    error = Exception("Service unavailable")
+    error.response = MagicMock(
+        headers={"Retry-After": retry_after} if retry_after is not None else {}
+    )
+    return error
 
 
 class TestRetryDecorator(unittest.TestCase):
@@ -55,6 +77,275 @@ class TestRetryDecorator(unittest.TestCase):
         self.assertEqual(str(context.exception), "Test exception")
         self.assertEqual(mock_func.call_count, 2)  # Should be called 2 times
 
+    def test_retry_async_function(self) -> None:
+        """
+        Test that a coroutine function is awaited and retried until it succeeds.
+        """
+        mock_func = AsyncMock(side_effect=[Exception("Test exception"), "success"])
+        decorated_func = retry(retries=3, delay=0)(mock_func)
+
+        result = asyncio.run(decorated_func())
+
+        self.assertEqual(result, "success")
+        self.assertEqual(mock_func.await_count, 2)
+
+    @patch("app.decorators.time.sleep")
+    def test_retry_exponential_backoff(self, mock_sleep: MagicMock) -> None:
+        """
+        Test that the delay grows by the backoff factor and is capped at max_delay.
+        """
+        mock_func = MagicMock(side_effect=Exception("Test exception"))
+        decorated_func = retry(
+            retries=5, delay=1, policy=RetryPolicy(backoff=2, max_delay=5)
+        )(mock_func)
+
+        with self.assertRaises(Exception):
+            decorated_func()
+
+        self.assertEqual(
+            [call.args[0] for call in mock_sleep.call_args_list], [1, 2, 4, 5]
+        )
+
+    @patch("app.decorators.time.sleep")
+    def test_retry_full_jitter(self, mock_sleep: MagicMock) -> None:
+        """
+        Test that with jitter every delay lies between 0 and the backoff delay.
+        """
+        mock_func = MagicMock(side_effect=Exception("Test exception"))
+        decorated_func = retry(
+            retries=4, delay=1, policy=RetryPolicy(backoff=2, jitter=True)
+        )(mock_func)
+
+        with self.assertRaises(Exception):
+            decorated_func()
+
+        for call, limit in zip(mock_sleep.call_args_list, [1, 2, 4]):
+            self.assertTrue(0 <= call.args[0] <= limit)
+
+    @patch("app.decorators.time.sleep")
+    def test_retry_honours_retry_after(self, mock_sleep: MagicMock) -> None:
+        """
+        Test that a longer Retry-After header replaces the computed delay.
+        """
+        mock_func = MagicMock(side_effect=[http_error("3"), "success"])
+        decorated_func = retry(retries=3, delay=0.1)(mock_func)
+
+        self.assertEqual(decorated_func(), "success")
+        mock_sleep.assert_called_once_with(3.0)
+
+    def test_get_retry_after(self) -> None:
+        """
+        Test reading Retry-After given in seconds, as an HTTP date, or not at all.
+        """
+        self.assertEqual(get_retry_after(http_error("120")), 120.0)
+        self.assertEqual(
+            get_retry_after(http_error("Wed, 21 Oct 2015 07:28:00 GMT")), 0.0
+        )
+        self.assertIsNone(get_retry_after(http_error()))
+        self.assertIsNone(get_retry_after(Exception("Test exception")))
+
+    @patch("app.decorators.time.sleep")
+    def test_retry_permanent_errors(self, mock_sleep: MagicMock) -> None:
+        """
+        Test that errors outside retry_on or rejected by retry_if are raised at once.
+        """
+        mock_func = MagicMock(side_effect=ValueError("Invalid data"))
+        decorated_func = retry(retries=3, delay=1, retry_on=(OSError,))(mock_func)
+        with self.assertRaises(ValueError):
+            decorated_func()
+        self.assertEqual(mock_func.call_count, 1)
+
+        mock_func = MagicMock(side_effect=OSError("Not found"))
+        decorated_func = retry(
+            retries=3, delay=1, retry_on=(OSError,), retry_if=lambda e: False
+        )(mock_func)
+        with self.assertRaises(OSError):
+            decorated_func()
+        self.assertEqual(mock_func.call_count, 1)
+        mock_sleep.assert_not_called()
+
+    @patch("app.decorators.time.sleep")
+    def test_retry_budget(self, mock_sleep: MagicMock) -> None:
+        """
+        Test that no retry is started when its delay would exceed the time budget.
+        """
+        mock_func = MagicMock(side_effect=Exception("Test exception"))
+        decorated_func = retry(
+            retries=10, delay=1, policy=RetryPolicy(backoff=2, budget=4)
+        )(mock_func)
+
+        with self.assertRaises(Exception):
+            decorated_func()
+
+        # delays of 1 and 2 seconds fit (mocked sleep takes no time), 4 does not
+        self.assertEqual(mock_func.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+
+class TestRateLimitDecorator(unittest.TestCase):
+    """
+    Unit tests for the token bucket and the rate_limit decorator.
+    """
+
+    @patch("app.decorators.time.monotonic", return_value=100.0)
+    def test_token_bucket(self, mock_monotonic: MagicMock) -> None:
+        """
+        Test that a burst up to capacity passes and later calls wait for new tokens.
+        """
+        bucket = TokenBucket(rate=10, capacity=2)
+
+        self.assertEqual([bucket.reserve() for _ in range(4)], [0.0, 0.0, 0.1, 0.2])
+
+        mock_monotonic.return_value = 101.0
+        self.assertEqual(bucket.reserve(), 0.0)
+
+    def test_token_bucket_without_rate(self) -> None:
+        """
+        Test that a bucket without a rate never makes calls wait.
+        """
+        bucket = TokenBucket(rate=None, capacity=1)
+
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0.0, 0.0, 0.0])
+
+    @patch("app.decorators.time.sleep")
+    @patch("app.decorators.time.monotonic", return_value=100.0)
+    def test_token_bucket_acquire(
+        self, _mock_monotonic: MagicMock, mock_sleep: MagicMock
+    ) -> None:
+        """
+        Test that acquiring a token sleeps only once the bucket is empty.
+        """
+        bucket = TokenBucket(rate=4, capacity=1)
+
+        bucket.acquire()
+        mock_sleep.assert_not_called()
+        bucket.acquire()
+        mock_sleep.assert_called_once_with(0.25)
+
+    @patch("app.decorators.time.sleep")
+    def test_rate_limit(self, mock_sleep: MagicMock) -> None:
+        """
+        Test that calls beyond the burst sleep before running.
+        """
+        mock_func = MagicMock(return_value="success")
+        decorated_func = rate_limit(TokenBucket(rate=1, capacity=1))(mock_func)
+
+        self.assertEqual(decorated_func(), "success")
+        mock_sleep.assert_not_called()
+        self.assertEqual(decorated_func(), "success")
+        mock_sleep.assert_called_once()
+        self.assertEqual(mock_func.call_count, 2)
+
+    def test_rate_limit_async(self) -> None:
+        """
+        Test that a coroutine function is rate limited and awaited.
+        """
+        mock_func = AsyncMock(return_value="success")
+        decorated_func = rate_limit(TokenBucket(rate=1000, capacity=1))(mock_func)
+
+        async def call_twice() -> list[str]:
+            return [await decorated_func(), await decorated_func()]
+
+        self.assertEqual(asyncio.run(call_twice()), ["success", "success"])
+
+
+class TestCircuitBreakerDecorator(unittest.TestCase):
+    """
+    Unit tests for the circuit breaker and the circuit_breaker decorator.
+    """
+
+    def test_opens_after_threshold(self) -> None:
+        """
+        Test that consecutive failures open the breaker and further calls fail fast.
+        """
+        breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=60)
+        mock_func = MagicMock(side_effect=OSError("Service unavailable"))
+        decorated_func = circuit_breaker(breaker)(mock_func)
+
+        for _ in range(2):
+            with self.assertRaises(OSError):
+                decorated_func()
+        with self.assertRaises(CircuitOpenError):
+            decorated_func()
+
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(mock_func.call_count, 2)
+
+    @patch("app.decorators.time.monotonic")
+    def test_half_open_trial(self, mock_monotonic: MagicMock) -> None:
+        """
+        Test that after the recovery timeout a failed trial reopens the breaker
+        and a successful one closes it.
+        """
+        mock_monotonic.return_value = 0.0
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=10)
+        mock_func = MagicMock(side_effect=[OSError("Down"), OSError("Down"), "ok"])
+        decorated_func = circuit_breaker(breaker)(mock_func)
+
+        with self.assertRaises(OSError):
+            decorated_func()
+        mock_monotonic.return_value = 10.0
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        with self.assertRaises(OSError):
+            decorated_func()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        mock_monotonic.return_value = 20.0
+        self.assertEqual(decorated_func(), "ok")
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    @patch("app.decorators.time.monotonic")
+    def test_cancelled_trial(self, mock_monotonic: MagicMock) -> None:
+        """
+        Test that a cancelled trial call lets a later call try again.
+        """
+        mock_monotonic.return_value = 0.0
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=10)
+        mock_func = AsyncMock(
+            side_effect=[OSError("Down"), asyncio.CancelledError(), "ok"]
+        )
+        decorated_func = circuit_breaker(breaker)(mock_func)
+
+        with self.assertRaises(OSError):
+            asyncio.run(decorated_func())
+        mock_monotonic.return_value = 10.0
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(decorated_func())
+
+        self.assertEqual(asyncio.run(decorated_func()), "ok")
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_ignored_errors(self) -> None:
+        """
+        Test that errors not counted as failures leave the breaker closed.
+        """
+        breaker = CircuitBreaker(
+            failure_threshold=1,
+            recovery_timeout=60,
+            failure_on=(OSError,),
+            failure_if=lambda e: str(e) != "Not found",
+        )
+        for error in (ValueError("Invalid data"), OSError("Not found")):
+            decorated_func = circuit_breaker(breaker)(MagicMock(side_effect=error))
+            with self.assertRaises(type(error)):
+                decorated_func()
+
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_circuit_breaker_async(self) -> None:
+        """
+        Test that a coroutine function is guarded by the breaker.
+        """
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=60)
+        mock_func = AsyncMock(side_effect=OSError("Down"))
+        decorated_func = circuit_breaker(breaker)(mock_func)
+
+        with self.assertRaises(OSError):
+            asyncio.run(decorated_func())
+        with self.assertRaises(CircuitOpenError):
+            asyncio.run(decorated_func())
+        self.assertEqual(mock_func.await_count, 1)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,126 @@
+"""
+Unit tests for the dedup module.
+
+These tests cover the Bloom filter, the switch of SeenSet from an exact set
+to a Bloom filter, and the cycles and duplicates found by CrawlGuard.
+"""
+
+import unittest
+
+from app.dedup import BloomFilter, CrawlGuard, SeenSet
+from app.models import Product
+
+
+class TestBloomFilter(unittest.TestCase):
+    """
+    Unit tests for the BloomFilter class.
+    """
+
+    def test_no_false_negatives_and_few_false_positives(self) -> None:
+        """
+        Test that added items are always found and unseen ones rarely are.
+        """
+        bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+        for item in range(10_000):
+            bloom.add(item)
+        false_positives = sum(f"unseen {i}" in bloom for i in range(10_000))
+
+        self.assertTrue(all(item in bloom for item in range(10_000)))
+        self.assertLess(false_positives, 300)
+        self.assertTrue(bloom.add(5))
+
+
+class TestSeenSet(unittest.TestCase):
+    """
+    Unit tests for the SeenSet class.
+    """
+
+    def test_switches_to_bloom_filter(self) -> None:
+        """
+        Test that items stay seen after the exact set is replaced by a Bloom filter.
+        """
+        seen = SeenSet(exact_threshold=3, capacity=1000, error_rate=0.001)
+
+        self.assertFalse(seen.add("a"))
+        self.assertTrue(seen.add("a"))
+        for item in ("b", "c", "d"):
+            self.assertFalse(seen.add(item))
+
+        self.assertFalse(seen.exact)
+        self.assertTrue(all(item in seen for item in "abcd"))
+        self.assertTrue(seen.add("b"))
+
+
+class TestCrawlGuard(unittest.TestCase):
+    """
+    Unit tests for the CrawlGuard class.
+    """
+
+    def test_counts(self) -> None:
+        """
+        Test that repeated tokens and product ids are counted.
+        """
+        guard = CrawlGuard()
+        product = make_product(1, None)
+
+        self.assertFalse(guard.is_cycle("a"))
+        self.assertTrue(guard.is_cycle("a"))
+        self.assertEqual(guard.admit(product), [product])
+        self.assertEqual(guard.admit(product), [])
+        self.assertEqual((guard.cycles, guard.duplicates), (1, 1))
+
+    def test_false_positives_do_not_truncate_chain(self) -> None:
+        """
+        Test that Bloom filter false positives neither end a long chain nor drop
+        products, while a real cycle is still found.
+        """
+        # a filter this loose makes false positives frequent
+        guard = CrawlGuard(
+            tokens=SeenSet(exact_threshold=10, capacity=2000, error_rate=0.2),
+            ids=SeenSet(exact_threshold=10, capacity=2000, error_rate=0.2),
+            confirmations=8,
+        )
+        chain = [make_product(i, f"token-{i + 1}") for i in range(2000)]
+        # the last product points back into the chain
+        chain[-1] = make_product(1999, "token-1000")
+
+        served = crawl(guard, chain)
+
+        self.assertGreater(guard.false_alarms, 0)
+        self.assertEqual(guard.cycles, 1)
+        self.assertEqual([product.product_id for product in served], list(range(2000)))
+        self.assertEqual(guard.duplicates, 8)
+
+
+def make_product(product_id: int, token: str | None) -> Product:
+    """
+    Build a product pointing to the given next token.
+    """
+    return Product(
+        product_id=product_id,
+        product_name=f"Product {product_id}",
+        category="A",
+        price=1.0,
+        currency="PLN",
+        next_product_token=token,
+    )
+
+
+def crawl(guard: CrawlGuard, chain: list[Product]) -> list[Product]:
+    """
+    Follow a chain the way iter_products does; "token-i" leads to chain[i].
+    """
+    served: list[Product] = []
+    token = None
+    while token is None or not guard.is_cycle(token):
+        product = chain[int(token.split("-")[1]) if token else 0]
+        token = product.next_product_token
+        served += guard.admit(product)
+        if not token:
+            served += guard.flush()
+            break
+    return served
+
+
+if __name__ == "__main__":
+    unittest.main()
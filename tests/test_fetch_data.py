@@ -5,10 +5,29 @@ These tests cover functionality for fetching products from the API, including
 fetching a single product and fetching all products.
 """
 
+import json
+import os
+import shutil
+import tempfile
+import threading
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import MagicMock, patch
+from urllib.parse import parse_qs, urlparse
 
-from app.fetch_data import fetch_all_products, fetch_product
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.checkpoint import Checkpoint
+from app.fetch_data import (
+    create_session,
+    fetch_all_products,
+    fetch_chains,
+    fetch_product,
+    is_retryable,
+    stream_products,
+)
+from app.metrics import registry
 from app.models import Product
 
 
@@ -51,14 +70,16 @@ class TestFetchFunctions(unittest.TestCase):
         # Setup mock for a successful response
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {
-            "product_id": 2,
-            "product_name": "Product 2",
-            "category": "Category 2",
-            "price": 200.0,
-            "currency": "USD",
-            "next_product_token": None,
-        }
+        mock_response.content = json.dumps(
+            {
+                "product_id": 2,
+                "product_name": "Product 2",
+                "category": "Category 2",
+                "price": 200.0,
+                "currency": "USD",
+                "next_product_token": None,
+            }
+        ).encode()
         mock_requests_get.return_value = mock_response
 
         api_url = "http://testapi.com/product"
@@ -72,6 +93,81 @@ class TestFetchFunctions(unittest.TestCase):
         self.assertEqual(args[0], api_url)
         self.assertEqual(kwargs.get("params"), {})
 
+    def test_is_retryable(self) -> None:
+        """
+        Test that temporary failures are retried and permanent ones are not.
+        """
+        for status_code, expected in [(503, True), (429, True), (404, False)]:
+            response = requests.Response()
+            response.status_code = status_code
+            self.assertEqual(
+                is_retryable(requests.HTTPError(response=response)), expected
+            )
+        self.assertTrue(is_retryable(requests.ConnectionError()))
+        self.assertTrue(is_retryable(requests.Timeout()))
+
+    @patch("app.decorators.time.sleep")
+    def test_fetch_product_not_found_is_not_retried(
+        self, mock_sleep: MagicMock
+    ) -> None:
+        """
+        Test that a 404 response fails at once instead of using the retry budget.
+        """
+        response = requests.Response()
+        response.status_code = 404
+        mock_session = MagicMock()
+        mock_session.get.return_value = response
+
+        with self.assertRaises(requests.HTTPError):
+            fetch_product("http://testapi.com/product", None, mock_session)
+
+        mock_session.get.assert_called_once()
+        mock_sleep.assert_not_called()
+
+    def test_create_session(self) -> None:
+        """
+        Test that create_session mounts a pooled adapter and asks for compressed responses.
+        """
+        session = create_session(pool_connections=2, pool_maxsize=5)
+
+        adapter = session.get_adapter("https://testapi.com/products")
+        self.assertIsInstance(adapter, HTTPAdapter)
+        self.assertEqual(adapter._pool_maxsize, 5)  # pylint: disable=protected-access
+        self.assertEqual(session.headers["Accept-Encoding"], "gzip, deflate")
+        session.close()
+
+    def test_fetch_product_with_session(self) -> None:
+        """
+        Test that fetch_product sends the request through the given session.
+        """
+        mock_session = MagicMock()
+        mock_session.get.return_value.status_code = 200
+        mock_session.get.return_value.content = self.product2.model_dump_json().encode()
+
+        api_url = "http://testapi.com/product"
+        product = fetch_product(api_url, "blablablab", mock_session)
+
+        self.assertEqual(product, self.product2)
+        args, kwargs = mock_session.get.call_args
+        self.assertEqual(args[0], api_url)
+        self.assertEqual(kwargs.get("params"), {"next_product_token": "blablablab"})
+
+    @patch("app.fetch_data.fetch_product")
+    def test_fetch_all_products_reuses_session(
+        self, mock_fetch_product: MagicMock
+    ) -> None:
+        """
+        Test that fetch_all_products passes the same session to every fetch_product call.
+        """
+        mock_fetch_product.side_effect = [self.product1, self.product2]
+        session = MagicMock()
+
+        fetch_all_products("http://testapi.com/products", session=session)
+
+        for call in mock_fetch_product.call_args_list:
+            self.assertIs(call.args[2], session)
+        session.close.assert_not_called()
+
     @patch("app.fetch_data.fetch_product")
     def test_fetch_all_products(self, mock_fetch_product: MagicMock) -> None:
         """
@@ -116,6 +212,197 @@ class TestFetchFunctions(unittest.TestCase):
         self.assertEqual(products[0].product_id, 1)
         mock_fetch_product.assert_called_once()
 
+    @patch("app.fetch_data.fetch_product")
+    def test_fetch_all_products_stops_on_cycle(
+        self, mock_fetch_product: MagicMock
+    ) -> None:
+        """
+        Test that a token chain leading back to a followed token is not crawled again,
+        and that re-served products are skipped.
+        """
+        looping = [
+            self.product1.model_copy(update={"next_product_token": "b"}),
+            self.product2.model_copy(update={"next_product_token": "c"}),
+            # same product again under a new token, then back to "b"
+            self.product2.model_copy(update={"next_product_token": "b"}),
+        ]
+        mock_fetch_product.side_effect = looping + [AssertionError("crawled again")]
+
+        with self.assertLogs("app.fetch_data", level="WARNING") as logs:
+            products = fetch_all_products("http://testapi.com/products")
+
+        self.assertEqual([product.product_id for product in products], [1, 2])
+        self.assertEqual(mock_fetch_product.call_count, 3)
+        self.assertIn("1 repeated tokens and 1 duplicate products", logs.output[-1])
+
+    @patch("app.fetch_data.fetch_product")
+    def test_stream_products(self, mock_fetch_product: MagicMock) -> None:
+        """
+        Test that stream_products yields the whole chain in order through a bounded queue.
+        """
+        mock_fetch_product.side_effect = [self.product1, self.product2]
+
+        products = list(
+            stream_products(
+                "http://testapi.com/products", session=MagicMock(), queue_size=1
+            )
+        )
+
+        self.assertEqual(products, [self.product1, self.product2])
+
+    @patch("app.fetch_data.fetch_product")
+    def test_stream_products_propagates_errors(
+        self, mock_fetch_product: MagicMock
+    ) -> None:
+        """
+        Test that an error in the fetcher thread is raised in the consuming thread
+        after the products fetched before it.
+        """
+        mock_fetch_product.side_effect = [self.product1, Exception("Test exception")]
+
+        stream = stream_products("http://testapi.com/products", session=MagicMock())
+
+        self.assertEqual(next(stream), self.product1)
+        with self.assertRaises(Exception) as context:
+            next(stream)
+        self.assertEqual(str(context.exception), "Test exception")
+
+    @patch("app.fetch_data.fetch_product")
+    def test_stream_products_propagates_base_exceptions(
+        self, mock_fetch_product: MagicMock
+    ) -> None:
+        """
+        Test that the consumer is woken up when the fetcher thread dies from
+        an exception that is not an Exception.
+        """
+        mock_fetch_product.side_effect = [self.product1, SystemExit(3)]
+
+        stream = stream_products("http://testapi.com/products", session=MagicMock())
+
+        self.assertEqual(next(stream), self.product1)
+        with self.assertRaises(SystemExit):
+            next(stream)
+
+    @patch("app.fetch_data.fetch_product")
+    def test_fetch_all_products_resumes_from_checkpoint(
+        self, mock_fetch_product: MagicMock
+    ) -> None:
+        """
+        Test that a crawl failing midway resumes from the last saved token
+        without fetching the saved products again.
+        """
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, "checkpoint.jsonl")
+        api_url = "http://testapi.com/products"
+
+        mock_fetch_product.side_effect = [self.product1, Exception("Test exception")]
+        with self.assertRaises(Exception):
+            fetch_all_products(
+                api_url, session=MagicMock(), checkpoint=Checkpoint(path)
+            )
+
+        mock_fetch_product.reset_mock(side_effect=True)
+        mock_fetch_product.side_effect = [self.product2]
+        products = fetch_all_products(
+            api_url, session=MagicMock(), checkpoint=Checkpoint(path)
+        )
+
+        self.assertEqual(products, [self.product1, self.product2])
+        self.assertEqual(mock_fetch_product.call_args.args[1], "blablablab")
+        self.assertEqual(Checkpoint(path).load(), [self.product1, self.product2])
+
+        # the saved chain is complete: nothing is fetched, the checkpoint
+        # is still closed and the chain is still measured
+        mock_fetch_product.reset_mock(side_effect=True)
+        checkpoint = Checkpoint(path)
+        with patch.object(checkpoint, "close") as mock_close:
+            products = fetch_all_products(
+                api_url, session=MagicMock(), checkpoint=checkpoint
+            )
+
+        self.assertEqual(products, [self.product1, self.product2])
+        mock_fetch_product.assert_not_called()
+        mock_close.assert_called_once()
+        self.assertEqual(
+            registry.gauge(
+                "chain_length", "Products in the last crawled token chain."
+            ).value,
+            2,
+        )
+
+
+class ChainHandler(BaseHTTPRequestHandler):
+    """
+    Serves two short token chains: '/a' with products 1-3 and '/b' with products 10-11.
+    """
+
+    chains = {"/a": [1, 2, 3], "/b": [10, 11]}
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """
+        Return the product pointed to by the next_product_token query parameter.
+        """
+        url = urlparse(self.path)
+        ids = self.chains[url.path]
+        token = parse_qs(url.query).get("next_product_token", [None])[0]
+        index = int(token) if token else 0
+        body = json.dumps(
+            {
+                "product_id": ids[index],
+                "product_name": f"Product {ids[index]}",
+                "category": "Category",
+                "price": 1.0,
+                "currency": "PLN",
+                "next_product_token": str(index + 1) if index + 1 < len(ids) else None,
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: any) -> None:  # pylint: disable=arguments-differ
+        """
+        Silence request logging.
+        """
+
+
+class TestFetchChains(unittest.TestCase):
+    """
+    Tests for the concurrent crawler against a local stand-in server.
+    """
+
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), ChainHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_fetch_chains_merges_results(self) -> None:
+        """
+        Test that all chains are crawled and merged in the order they were given.
+        """
+        products = fetch_chains(
+            [(f"{self.base_url}/a", None), (f"{self.base_url}/b", None)],
+            concurrency=2,
+        )
+
+        self.assertEqual([p.product_id for p in products], [1, 2, 3, 10, 11])
+
+    def test_fetch_chains_from_seed_token(self) -> None:
+        """
+        Test that a chain starts from its seed token.
+        """
+        products = fetch_chains([(f"{self.base_url}/a", "1")], concurrency=1)
+
+        self.assertEqual([p.product_id for p in products], [2, 3])
+
 
 if __name__ == "__main__":
     unittest.main()
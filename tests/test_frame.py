@@ -0,0 +1,107 @@
+"""
+Unit tests for the frame module.
+
+These tests check that the vectorised ProductFrame statistics match the ones
+collected by ProductAggregate from a pass over the same products.
+"""
+
+import random
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.calculations import ProductAggregate, rate_cache
+from app.frame import ProductFrame
+from app.models import Product
+
+
+class TestProductFrame(unittest.TestCase):
+    """
+    Unit tests for the ProductFrame class.
+    """
+
+    def setUp(self) -> None:
+        converter = MagicMock()
+        converter.convert.side_effect = lambda amount, currency, *_, **__: (
+            amount * {"USD": 4.0, "EUR": 4.3}[currency]
+        )
+        patcher = patch.object(rate_cache, "_converter", converter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(rate_cache.invalidate)
+        rate_cache.invalidate()
+
+        rng = random.Random(7)
+        self.products = [
+            Product(
+                product_id=i,
+                product_name=f"Product {i}",
+                category=rng.choice(["A", "B", "C"]),
+                price=float(rng.randint(1, 50)),
+                currency=rng.choice(["PLN", "USD", "EUR"]),
+                next_product_token=None,
+            )
+            for i in range(500)
+        ]
+
+    def test_from_products(self) -> None:
+        """
+        Test that products are stored as columns with coded categories and currencies.
+        """
+        frame = ProductFrame.from_products(iter(self.products[:3]))
+
+        self.assertEqual(len(frame), 3)
+        self.assertEqual(frame.product_ids.tolist(), [0, 1, 2])
+        for index, product in enumerate(self.products[:3]):
+            rebuilt = frame.product(index)
+            self.assertEqual(rebuilt.category, product.category)
+            self.assertEqual(rebuilt.currency, product.currency)
+            self.assertEqual(rebuilt.price, product.price)
+
+    def test_prices_in(self) -> None:
+        """
+        Test that prices are normalised with one rate per currency.
+        """
+        frame = ProductFrame.from_products(self.products)
+
+        self.assertEqual(
+            frame.prices_in("PLN").tolist(),
+            [rate_cache.convert(p.price, p.currency, "PLN") for p in self.products],
+        )
+
+    def test_to_aggregate_matches_product_aggregate(self) -> None:
+        """
+        Test that the vectorised statistics give the same answers as a pass over products.
+        """
+        expected = ProductAggregate().update(self.products)
+        frame = ProductFrame.from_products(self.products)
+        aggregate = frame.to_aggregate()
+
+        self.assertEqual(aggregate.count, expected.count)
+        self.assertEqual(
+            aggregate.counts_per_category(), expected.counts_per_category()
+        )
+        self.assertEqual(frame.counts_per_category(), expected.counts_per_category())
+        for category in ("A", "B", "C", "D"):
+            expected_max = expected.most_expensive_in_category(category)
+            actual_max = aggregate.most_expensive_in_category(category)
+            self.assertEqual(
+                actual_max and actual_max.product_id,
+                expected_max and expected_max.product_id,
+            )
+            self.assertEqual(
+                aggregate.average_price_for_category(category),
+                expected.average_price_for_category(category),
+            )
+
+    def test_empty_frame(self) -> None:
+        """
+        Test statistics of a frame without products.
+        """
+        aggregate = ProductFrame.from_products([]).to_aggregate()
+
+        self.assertEqual(aggregate.count, 0)
+        self.assertIsNone(aggregate.most_expensive_in_category("A"))
+
+
+if __name__ == "__main__":
+    unittest.main()
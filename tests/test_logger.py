@@ -0,0 +1,81 @@
+"""
+Unit tests for the logger module.
+
+These tests cover handler de-duplication, sampling of high-volume messages
+and the JSON formatter.
+"""
+
+import json
+import logging
+import unittest
+from logging.handlers import QueueHandler
+
+from app.logger import JsonFormatter, SamplingFilter, get_logger
+
+
+def make_record(msg: str, sampled: bool = False) -> logging.LogRecord:
+    """
+    Build a log record, optionally marked as sampled.
+    """
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, msg, (), None)
+    if sampled:
+        record.sampled = True
+    return record
+
+
+class TestLogger(unittest.TestCase):
+    """
+    Unit tests for get_logger and its helpers.
+    """
+
+    def test_get_logger_adds_one_handler(self) -> None:
+        """
+        Test that repeated calls do not attach the handler again.
+        """
+        first = get_logger("tests.logger")
+        second = get_logger("tests.logger")
+
+        self.assertIs(first, second)
+        self.assertEqual(len(second.handlers), 1)
+
+    def test_get_logger_does_not_block(self) -> None:
+        """
+        Test that records are handed to a queue instead of being written directly.
+        """
+        logger = get_logger("tests.logger")
+
+        self.assertIsInstance(logger.handlers[0], QueueHandler)
+
+    def test_sampling_filter(self) -> None:
+        """
+        Test that one in every n sampled records of a message passes
+        and unsampled records always pass.
+        """
+        sampling_filter = SamplingFilter(every=3)
+
+        sampled = [
+            sampling_filter.filter(make_record("Fetching %s.", sampled=True))
+            for _ in range(7)
+        ]
+        other = [
+            sampling_filter.filter(make_record("Data accessed.", sampled=True)),
+            sampling_filter.filter(make_record("Retrying.")),
+            sampling_filter.filter(make_record("Retrying.")),
+        ]
+
+        self.assertEqual(sampled, [True, False, False, True, False, False, True])
+        self.assertEqual(other, [True, True, True])
+
+    def test_json_formatter(self) -> None:
+        """
+        Test that records are formatted as JSON objects.
+        """
+        data = json.loads(JsonFormatter().format(make_record("Data accessed.")))
+
+        self.assertEqual(data["message"], "Data accessed.")
+        self.assertEqual(data["level"], "INFO")
+        self.assertEqual(data["name"], "test")
+
+
+if __name__ == "__main__":
+    unittest.main()
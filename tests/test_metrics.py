@@ -0,0 +1,123 @@
+"""
+Unit tests for the metrics module.
+
+These tests cover counters, gauges and histograms, their labels,
+and the Prometheus text and JSON exports.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from app.decorators import retry
+from app.metrics import Histogram, MetricsRegistry, registry
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Unit tests for the MetricsRegistry class and its metrics.
+    """
+
+    def setUp(self) -> None:
+        self.registry = MetricsRegistry()
+
+    def test_counter_and_gauge(self) -> None:
+        """
+        Test that metrics are created on first use and split by labels.
+        """
+        self.registry.counter("responses_total", status=200).inc()
+        self.registry.counter("responses_total", status=200).inc()
+        self.registry.counter("responses_total", status=503).inc()
+        gauge = self.registry.gauge("chain_length")
+        gauge.set(5)
+        gauge.inc()
+
+        self.assertEqual(self.registry.counter("responses_total", status=200).value, 2)
+        self.assertEqual(self.registry.counter("responses_total", status=503).value, 1)
+        self.assertEqual(self.registry.gauge("chain_length").value, 6)
+
+    def test_kind_conflict(self) -> None:
+        """
+        Test that a name cannot be used for two kinds of metrics.
+        """
+        self.registry.counter("value")
+        with self.assertRaises(ValueError):
+            self.registry.gauge("value")
+
+    def test_histogram(self) -> None:
+        """
+        Test that observations fall into the right cumulative buckets.
+        """
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+        with histogram.time():
+            pass
+
+        self.assertEqual(histogram.cumulative_counts(), [3, 4, 5])
+        self.assertEqual(histogram.count, 5)
+
+    def test_to_prometheus(self) -> None:
+        """
+        Test the Prometheus text format.
+        """
+        self.registry.counter("responses_total", "Responses.", status=200).inc(2)
+        self.registry.histogram("latency_seconds", buckets=(0.5,)).observe(0.25)
+
+        text = self.registry.to_prometheus()
+
+        self.assertIn("# HELP responses_total Responses.", text)
+        self.assertIn("# TYPE responses_total counter", text)
+        self.assertIn('responses_total{status="200"} 2.0', text)
+        self.assertIn('latency_seconds_bucket{le="0.5"} 1', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 1', text)
+        self.assertIn("latency_seconds_sum 0.25", text)
+        self.assertIn("latency_seconds_count 1", text)
+
+    def test_write(self) -> None:
+        """
+        Test writing the metrics as JSON and as Prometheus text.
+        """
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        self.registry.gauge("chain_length").set(3)
+
+        json_path = os.path.join(tmp_dir, "metrics.json")
+        prom_path = os.path.join(tmp_dir, "metrics.prom")
+        self.registry.write(json_path)
+        self.registry.write(prom_path)
+
+        with open(json_path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        self.assertEqual(data["chain_length"]["type"], "gauge")
+        self.assertEqual(data["chain_length"]["series"][0]["value"], 3)
+        with open(prom_path, "r", encoding="utf-8") as file:
+            self.assertIn("chain_length 3", file.read())
+
+    def test_retry_counts_retries(self) -> None:
+        """
+        Test that the retry decorator reports its retries to the shared registry.
+        """
+
+        def flaky() -> None:
+            """
+            Fail, to be retried.
+            """
+            mock_func()
+
+        mock_func = MagicMock(side_effect=[Exception("Test exception"), None])
+        before = registry.counter("retries_total", function=flaky.__qualname__).value
+
+        retry(retries=2, delay=0)(flaky)()
+
+        self.assertEqual(
+            registry.counter("retries_total", function=flaky.__qualname__).value,
+            before + 1,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Unit tests for the models module.
+
+These tests cover the trusted fast constructor, batch validation
+of records and of newline-delimited JSON, and the compact ProductRecord.
+"""
+
+import json
+import unittest
+
+from pydantic import ValidationError
+
+from app.calculations import ProductAggregate
+from app.models import (
+    Product,
+    ProductRecord,
+    to_records,
+    validate_products,
+    validate_products_ndjson,
+)
+
+
+class TestModels(unittest.TestCase):
+    """
+    Unit tests for the bulk helpers of the models module.
+    """
+
+    data = {
+        "product_id": 1,
+        "product_name": "Product 1",
+        "category": "Category 1",
+        "price": 100.0,
+        "currency": "PLN",
+        "next_product_token": "dsdvsdfds",
+    }
+
+    def test_from_trusted(self) -> None:
+        """
+        Test that the trusted constructor builds the same product as validation.
+        """
+        self.assertEqual(Product.from_trusted(self.data), Product(**self.data))
+
+    def test_validate_products(self) -> None:
+        """
+        Test validating a batch of records in one call.
+        """
+        records = [self.data, {**self.data, "product_id": "2", "price": "5"}]
+
+        products = validate_products(records)
+
+        self.assertEqual([p.product_id for p in products], [1, 2])
+        self.assertEqual(products[1].price, 5.0)
+
+    def test_validate_products_invalid(self) -> None:
+        """
+        Test that an invalid record in a batch raises a ValidationError.
+        """
+        with self.assertRaises(ValidationError):
+            validate_products([self.data, {**self.data, "price": "free"}])
+
+    def test_validate_products_ndjson(self) -> None:
+        """
+        Test validating newline-delimited JSON bytes in one call, skipping blank lines.
+        """
+        data = (
+            json.dumps(self.data).encode()
+            + b"\n\n"
+            + json.dumps({**self.data, "product_id": 2}).encode()
+            + b"\n"
+        )
+
+        products = validate_products_ndjson(data)
+
+        self.assertEqual(
+            products, [Product(**self.data), Product(**{**self.data, "product_id": 2})]
+        )
+        self.assertEqual(validate_products_ndjson(b""), [])
+        with self.assertRaises(ValidationError):
+            validate_products_ndjson(data + b'{"product_id": 3}\n')
+
+    def test_product_record(self) -> None:
+        """
+        Test that records are compact, share category strings and match the product.
+        """
+        product = Product(**self.data)
+        record = ProductRecord.from_product(product)
+        other = ProductRecord.from_dict(
+            {**self.data, "category": " ".join(["Category", "1"])}
+        )
+
+        self.assertFalse(hasattr(record, "__dict__"))
+        self.assertIs(record.category, other.category)
+        self.assertEqual(record._asdict(), product.model_dump())
+
+    def test_records_in_calculations(self) -> None:
+        """
+        Test that records can be aggregated like products.
+        """
+        products = [Product(**self.data), Product(**{**self.data, "product_id": 2})]
+
+        aggregate = ProductAggregate().update(to_records(products))
+
+        self.assertEqual(aggregate.counts_per_category(), {"Category 1": 2})
+        self.assertEqual(aggregate.average_price_for_category("Category 1"), 100.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
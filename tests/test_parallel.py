@@ -0,0 +1,97 @@
+"""
+Unit tests for the parallel module.
+
+These tests check that aggregating the shards of a frame in worker processes
+gives the same answers as a pass over the products.
+"""
+
+import random
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.calculations import ProductAggregate, rate_cache
+from app.frame import ProductFrame
+from app.models import Product
+from app.parallel import aggregate_parallel, shard_bounds
+
+
+class TestAggregateParallel(unittest.TestCase):
+    """
+    Unit tests for the aggregate_parallel function.
+    """
+
+    def setUp(self) -> None:
+        converter = MagicMock()
+        converter.convert.side_effect = lambda amount, currency, *_, **__: (
+            amount * {"USD": 4.0, "EUR": 4.3}[currency]
+        )
+        patcher = patch.object(rate_cache, "_converter", converter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(rate_cache.invalidate)
+        rate_cache.invalidate()
+
+        rng = random.Random(11)
+        self.products = [
+            Product(
+                product_id=i,
+                product_name=f"Product {i}",
+                category=rng.choice(["A", "B", "C", "D"]),
+                price=float(rng.randint(1, 50)),
+                currency=rng.choice(["PLN", "USD", "EUR"]),
+                next_product_token=None,
+            )
+            for i in range(1000)
+        ]
+
+    def test_matches_product_aggregate(self) -> None:
+        """
+        Test that merged shard results match a single pass, including the first
+        of several equally expensive products.
+        """
+        expected = ProductAggregate().update(self.products)
+        frame = ProductFrame.from_products(self.products)
+        aggregate = aggregate_parallel(frame, workers=2, shards=7)
+
+        self.assertEqual(aggregate.count, expected.count)
+        self.assertEqual(
+            aggregate.counts_per_category(), expected.counts_per_category()
+        )
+        for category in ("A", "B", "C", "D", "E"):
+            expected_max = expected.most_expensive_in_category(category)
+            actual_max = aggregate.most_expensive_in_category(category)
+            self.assertEqual(
+                actual_max and actual_max.product_id,
+                expected_max and expected_max.product_id,
+            )
+            if expected.average_price_for_category(category) is None:
+                self.assertIsNone(aggregate.average_price_for_category(category))
+            else:
+                self.assertAlmostEqual(
+                    aggregate.average_price_for_category(category),
+                    expected.average_price_for_category(category),
+                )
+
+    def test_small_frame_is_aggregated_in_process(self) -> None:
+        """
+        Test that a frame too small to split is aggregated without workers.
+        """
+        frame = ProductFrame.from_products(self.products[:1])
+
+        with patch("app.parallel.ProcessPoolExecutor") as executor:
+            aggregate = aggregate_parallel(frame, workers=4)
+
+        executor.assert_not_called()
+        self.assertEqual(aggregate.count, 1)
+
+    def test_shard_bounds(self) -> None:
+        """
+        Test that shards cover every row once and empty shards are dropped.
+        """
+        self.assertEqual(shard_bounds(10, 3), [(0, 3), (3, 6), (6, 10)])
+        self.assertEqual(shard_bounds(2, 4), [(0, 1), (1, 2)])
+        self.assertEqual(shard_bounds(0, 4), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
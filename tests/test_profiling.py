@@ -0,0 +1,169 @@
+"""
+Unit tests for the profiling module and the profiling mode of main.
+
+These tests check the reports written for a profiled stage, the sampled
+collapsed stacks, and runs of main against the local stand-in API.
+"""
+
+import os
+import pstats
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.calculations import rate_cache
+from app.main import config, main, parse_args
+from app.parallel import aggregate_parallel
+from app.profiling import StackSampler, profile_stage
+from benchmarks.stub_api import StubProductAPI
+
+
+def busy_wait(stopped: threading.Event) -> None:
+    """
+    Keep a thread busy until stopped.
+    """
+    while not stopped.is_set():
+        sum(range(1000))
+
+
+class TestProfiling(unittest.TestCase):
+    """
+    Unit tests for profile_stage and StackSampler.
+    """
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def test_profile_stage_writes_reports(self) -> None:
+        """
+        Test that a stage is measured and its pstats, allocation and stack reports written.
+        """
+        with self.assertLogs("app.profiling", level="INFO") as logs:
+            with profile_stage("work", self.tmp_dir, stacks=True) as stats:
+                data = [str(i) * 10 for i in range(50_000)]
+                time.sleep(0.05)
+
+        self.assertGreater(stats.wall_seconds, 0.05)
+        self.assertGreater(stats.peak_memory, 1_000_000)
+        self.assertEqual(
+            sorted(os.listdir(self.tmp_dir)),
+            [
+                "profile-work-allocations.txt",
+                "profile-work.collapsed",
+                "profile-work.pstats",
+            ],
+        )
+        pstats.Stats(os.path.join(self.tmp_dir, "profile-work.pstats"))
+        with open(stats.reports[1], encoding="utf-8") as file:
+            self.assertIn("test_profiling.py", file.read())
+        self.assertIn("Stage work: wall", logs.output[0])
+        del data
+
+    def test_stack_sampler(self) -> None:
+        """
+        Test that stacks of other threads are sampled in the collapsed format.
+        """
+        stopped = threading.Event()
+        worker = threading.Thread(target=busy_wait, args=(stopped,), name="busy")
+        sampler = StackSampler(interval=0.001)
+        worker.start()
+        sampler.start()
+        time.sleep(0.1)
+        sampler.stop()
+        stopped.set()
+        worker.join()
+
+        busy_stacks = [stack for stack in sampler.stacks if stack.startswith("busy;")]
+        self.assertTrue(busy_stacks)
+        self.assertTrue(all("busy_wait (test_profiling.py" in s for s in busy_stacks))
+
+    def test_parse_args(self) -> None:
+        """
+        Test the profiling switches from the command line and the environment.
+        """
+        with patch.dict(os.environ, {"PROFILE": "", "PROFILE_STACKS": ""}):
+            self.assertFalse(parse_args([]).profile)
+            self.assertTrue(parse_args(["--profile-stacks"]).profile)
+        with patch.dict(os.environ, {"PROFILE": "1"}):
+            self.assertTrue(parse_args([]).profile)
+
+
+class TestMain(unittest.TestCase):
+    """
+    Tests of main runs against the stand-in API.
+    """
+
+    def setUp(self) -> None:
+        converter = MagicMock()
+        converter.convert.side_effect = lambda amount, *_, **__: amount * 4.0
+        patcher = patch.object(rate_cache, "_converter", converter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(rate_cache.invalidate)
+        rate_cache.invalidate()
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tmp_dir)
+        patcher = patch("app.main.load_dotenv")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_main_writes_profiles_next_to_answers(self) -> None:
+        """
+        Test that a profiled run answers the questions and profiles both stages.
+        """
+        with StubProductAPI(20) as api:
+            with patch.dict(os.environ, {"API_URL": f"{api.url}/0"}):
+                main(["--profile"])
+
+        files = os.listdir()
+        self.assertIn("answers.txt", files)
+        self.assertNotIn("checkpoint.jsonl", files)
+        for stage in ("fetch", "answer"):
+            self.assertIn(f"profile-{stage}.pstats", files)
+            self.assertIn(f"profile-{stage}-allocations.txt", files)
+        with open("answers.txt", encoding="utf-8") as file:
+            self.assertIn("1. Number of products: 20.", file.read())
+
+    def test_api_url_is_cleaned(self) -> None:
+        """
+        Test that blanks and empty entries around the endpoint are ignored,
+        and that an API_URL without any endpoint is rejected.
+        """
+        with StubProductAPI(5) as api:
+            with patch.dict(os.environ, {"API_URL": f" {api.url}/0 ,", "PROFILE": ""}):
+                main([])
+        with open("answers.txt", encoding="utf-8") as file:
+            self.assertIn("1. Number of products: 5.", file.read())
+
+        with patch.dict(os.environ, {"API_URL": " , "}):
+            with self.assertRaises(ValueError):
+                main([])
+
+    def test_several_endpoints_with_workers(self) -> None:
+        """
+        Test that the merged chains of several endpoints are aggregated in parallel
+        when more than one calculations worker is configured.
+        """
+        with StubProductAPI(5) as api, patch.dict(
+            config["calculations"], {"workers": 2}
+        ), patch("app.main.aggregate_parallel", wraps=aggregate_parallel) as mock:
+            with patch.dict(
+                os.environ, {"API_URL": f"{api.url}/0,{api.url}/1", "PROFILE": ""}
+            ):
+                main([])
+
+        mock.assert_called_once()
+        self.assertEqual(mock.call_args.kwargs["workers"], 2)
+        with open("answers.txt", encoding="utf-8") as file:
+            self.assertIn("1. Number of products: 10.", file.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
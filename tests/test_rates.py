@@ -0,0 +1,283 @@
+"""
+Unit tests for the rates module.
+
+These tests cover the lazily loaded, disk-cached currency converter and the
+RateCache: memoisation of rates, conversion of single prices and batches,
+the size bound and explicit invalidation, and the historical RateMatrix.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+from currency_converter import RateNotFoundError
+
+from app.calculations import get_price_in_currency
+from app.rates import RateCache, RateMatrix, get_converter, load_converter
+
+
+class TestConverterLoading(unittest.TestCase):
+    """
+    Unit tests for load_converter and get_converter.
+    """
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, "cache")
+        self.currency_file = os.path.join(self.tmp_dir, "rates.csv")
+        with open(self.currency_file, "w", encoding="utf-8") as file:
+            file.write("Date, USD, PLN,\n29 July 2024, 1.0817, 4.2938,\n")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def test_load_converter_uses_disk_cache(self) -> None:
+        """
+        Test that the second load reads the parsed rates from the cache
+        instead of parsing the data file.
+        """
+        converter = load_converter(self.cache_dir, self.currency_file)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        with patch("app.rates.CurrencyConverter") as mock_currency_converter:
+            cached = load_converter(self.cache_dir, self.currency_file)
+
+        mock_currency_converter.assert_not_called()
+        self.assertAlmostEqual(
+            cached.convert(100, "USD", "PLN"), converter.convert(100, "USD", "PLN")
+        )
+
+    def test_load_converter_after_data_change(self) -> None:
+        """
+        Test that a changed data file is parsed again.
+        """
+        load_converter(self.cache_dir, self.currency_file)
+        with open(self.currency_file, "a", encoding="utf-8") as file:
+            file.write("26 July 2024, 1.0854, 4.2865,\n")
+
+        converter = load_converter(self.cache_dir, self.currency_file)
+
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+        self.assertEqual(converter.bounds["USD"].first_date, date(2024, 7, 26))
+
+    @patch("app.rates._converter", None)
+    @patch("app.rates.load_converter")
+    def test_get_converter_is_lazy(self, mock_load_converter: MagicMock) -> None:
+        """
+        Test that the shared converter is loaded once, on first use.
+        """
+        mock_load_converter.assert_not_called()
+
+        first = get_converter()
+        second = get_converter()
+
+        self.assertIs(first, second)
+        mock_load_converter.assert_called_once()
+
+
+class TestRateCache(unittest.TestCase):
+    """
+    Unit tests for the RateCache class.
+    """
+
+    def setUp(self) -> None:
+        self.converter = MagicMock()
+        self.converter.convert.side_effect = lambda amount, currency, *_, **__: (
+            amount * {"USD": 4.0, "EUR": 4.5, "GBP": 5.0}[currency]
+        )
+        self.cache = RateCache(self.converter, maxsize=2)
+
+    def test_rate_looked_up_once(self) -> None:
+        """
+        Test that converting many prices of one currency pair looks the rate up once.
+        """
+        converted = [self.cache.convert(price, "USD", "PLN") for price in (1.0, 2.5)]
+
+        self.assertEqual(converted, [4.0, 10.0])
+        self.converter.convert.assert_called_once_with(1.0, "USD", "PLN", date=None)
+
+    def test_same_currency(self) -> None:
+        """
+        Test that no lookup happens when the currencies are the same.
+        """
+        self.assertEqual(self.cache.convert(12.5, "PLN", "PLN"), 12.5)
+        self.converter.convert.assert_not_called()
+
+    def test_rates_keyed_by_date(self) -> None:
+        """
+        Test that rates of different dates are cached separately.
+        """
+        self.cache.get_rate("USD", "PLN")
+        self.cache.get_rate("USD", "PLN", date(2020, 1, 2))
+        self.cache.get_rate("USD", "PLN", date(2020, 1, 2))
+
+        self.assertEqual(self.converter.convert.call_count, 2)
+
+    def test_convert_many(self) -> None:
+        """
+        Test converting a batch of prices in mixed currencies.
+        """
+        converted = self.cache.convert_many(
+            [1.0, 2.0, 3.0, 4.0], ["USD", "EUR", "USD", "PLN"], "PLN"
+        )
+
+        self.assertEqual(converted, [4.0, 9.0, 12.0, 4.0])
+        self.assertEqual(self.converter.convert.call_count, 2)
+
+    def test_size_bound(self) -> None:
+        """
+        Test that the least recently used rate is evicted when the cache is full.
+        """
+        self.cache.get_rate("USD", "PLN")
+        self.cache.get_rate("EUR", "PLN")
+        self.cache.get_rate("USD", "PLN")
+        self.cache.get_rate("GBP", "PLN")
+
+        self.assertEqual(len(self.cache), 2)
+        self.cache.get_rate("USD", "PLN")
+        self.assertEqual(self.converter.convert.call_count, 3)
+        self.cache.get_rate("EUR", "PLN")
+        self.assertEqual(self.converter.convert.call_count, 4)
+
+    def test_invalidate(self) -> None:
+        """
+        Test dropping selected and all cached rates.
+        """
+        self.cache.get_rate("USD", "PLN")
+        self.cache.get_rate("EUR", "PLN")
+
+        self.cache.invalidate(currency="USD")
+        self.assertEqual(len(self.cache), 1)
+
+        self.cache.invalidate()
+        self.assertEqual(len(self.cache), 0)
+
+
+class TestRateMatrix(unittest.TestCase):
+    """
+    Unit tests for the RateMatrix class.
+    """
+
+    def setUp(self) -> None:
+        # USD and PLN rates into EUR; nothing is published on the 2nd and 3rd
+        published = {
+            "USD": {1: 0.5, 4: 0.25},
+            "PLN": {1: 0.2, 2: 0.2, 3: 0.2, 4: 0.2},
+        }
+
+        # the converter is called with a date keyword argument
+        # pylint: disable-next=redefined-outer-name
+        def convert(amount, currency, new_currency, date):
+            rates = [
+                1.0 if code == "EUR" else published[code].get(date.day)
+                for code in (currency, new_currency)
+            ]
+            if None in rates:
+                raise RateNotFoundError(f"No rate for {date}")
+            return amount * rates[0] / rates[1]
+
+        self.converter = MagicMock()
+        self.converter.ref_currency = "EUR"
+        self.converter.convert.side_effect = convert
+        self.converter.bounds = {
+            currency: SimpleNamespace(
+                first_date=date(2024, 1, 1), last_date=date(2024, 1, 4)
+            )
+            for currency in published
+        }
+        self.matrix = RateMatrix.from_converter(
+            ["USD"], "PLN", date(2024, 1, 1), date(2024, 1, 4), self.converter
+        )
+
+    def test_gaps_hold_last_published_rate(self) -> None:
+        """
+        Test that days without a rate use the last rate published before them.
+        """
+        self.assertEqual(self.matrix.rates.shape, (1, 4))
+        self.assertEqual(self.matrix.rates[0].tolist(), [2.5, 2.5, 2.5, 1.25])
+        self.assertEqual(self.matrix.get_rate("USD", date(2024, 1, 3)), 2.5)
+        self.assertEqual(self.matrix.get_rate("PLN", date(2024, 1, 3)), 1.0)
+        # after the last day the latest rate is used
+        self.assertEqual(self.matrix.get_rate("USD", date(2024, 2, 1)), 1.25)
+
+    def test_convert_many(self) -> None:
+        """
+        Test converting a batch of dated prices in one call.
+        """
+        converted = self.matrix.convert_many(
+            [10.0, 10.0, 10.0],
+            ["USD", "PLN", "USD"],
+            [date(2024, 1, 2), date(2024, 1, 2), date(2024, 1, 4)],
+        )
+
+        np.testing.assert_allclose(converted, [25.0, 10.0, 12.5])
+        with self.assertRaises(ValueError):
+            self.matrix.convert_many([1.0], ["USD"], [date(2023, 12, 31)])
+
+    def test_start_without_published_rate(self) -> None:
+        """
+        Test that a first day without a rate starts from the last earlier one,
+        and that a currency without any earlier rate is rejected.
+        """
+        matrix = RateMatrix.from_converter(
+            ["USD"], "PLN", date(2024, 1, 2), date(2024, 1, 4), self.converter
+        )
+
+        self.assertEqual(matrix.rates[0].tolist(), [2.5, 2.5, 1.25])
+        with self.assertRaises(ValueError):
+            RateMatrix.from_converter(
+                ["USD"], "PLN", date(2023, 12, 31), date(2024, 1, 4), self.converter
+            )
+
+    def test_end_before_start(self) -> None:
+        """
+        Test that a range ending before it starts is rejected.
+        """
+        with self.assertRaisesRegex(ValueError, "before the first day"):
+            RateMatrix.from_converter(
+                ["USD"], "PLN", date(2024, 1, 4), date(2024, 1, 2), self.converter
+            )
+
+    def test_single_price_agrees_with_matrix(self) -> None:
+        """
+        Test that a single dated conversion fills gaps like the matrix.
+        """
+        for day in range(1, 5):
+            self.assertEqual(
+                get_price_in_currency(
+                    10.0, "USD", "PLN", self.converter, date(2024, 1, day)
+                ),
+                10.0 * self.matrix.get_rate("USD", date(2024, 1, day)),
+            )
+
+    def test_matches_converter_on_published_days(self) -> None:
+        """
+        Test the matrix against the bundled ECB data on days with published rates.
+        """
+        # a holiday: no rates are published on the first day
+        start = date(2024, 1, 1)
+        matrix = RateMatrix.from_converter(
+            ["USD", "EUR"], "PLN", start, start + timedelta(days=13)
+        )
+        converter = get_converter()
+        for day in range(14):
+            day_date = start + timedelta(days=day)
+            try:
+                expected = converter.convert(1.0, "USD", "PLN", date=day_date)
+            except RateNotFoundError:
+                # weekends and holidays
+                self.assertAlmostEqual(
+                    get_price_in_currency(1.0, "USD", "PLN", converter, day_date),
+                    matrix.get_rate("USD", day_date),
+                )
+                continue
+            self.assertAlmostEqual(matrix.get_rate("USD", day_date), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
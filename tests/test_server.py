@@ -0,0 +1,203 @@
+"""
+Unit tests for the server module.
+
+These tests cover the report service answering questions from its in-memory
+catalog, the answer cache and its invalidation on refresh, and the HTTP endpoint.
+"""
+
+import json
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from app.calculations import rate_cache
+from app.models import Product
+from app.server import NotReadyError, QueryError, ReportService, create_server
+
+
+def make_products(prices: list[tuple[float, str, str]]) -> list[Product]:
+    """
+    Build products from (price, currency, category) triples.
+    """
+    return [
+        Product(
+            product_id=i,
+            product_name=f"Product {i}",
+            price=price,
+            category=category,
+            currency=currency,
+            next_product_token=None,
+        )
+        for i, (price, currency, category) in enumerate(prices, start=1)
+    ]
+
+
+class TestReportService(unittest.TestCase):
+    """
+    Unit tests for the ReportService class.
+    """
+
+    def setUp(self) -> None:
+        rates = {("EUR", "PLN"): 4.0, ("PLN", "EUR"): 0.25}
+        converter = MagicMock()
+        converter.convert.side_effect = lambda amount, currency, desired, **_: (
+            amount * rates[(currency, desired)]
+        )
+        patcher = patch.object(rate_cache, "_converter", converter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(rate_cache.invalidate)
+        rate_cache.invalidate()
+
+        self.fetch = MagicMock(
+            return_value=make_products(
+                [(100.0, "PLN", "A"), (50.0, "EUR", "A"), (30.0, "PLN", "B")]
+            )
+        )
+        self.service = ReportService(self.fetch, refresh_interval=3600, cache_size=2)
+
+    def test_not_ready(self) -> None:
+        """
+        Test that questions before the first refresh are refused.
+        """
+        with self.assertRaises(NotReadyError):
+            self.service.query("count")
+
+    def test_answers(self) -> None:
+        """
+        Test the answers, with prices reported in the requested currency.
+        """
+        self.service.refresh()
+
+        self.assertEqual(json.loads(self.service.query("count")), {"count": 3})
+        self.assertEqual(
+            json.loads(self.service.query("categories")),
+            {"counts": {"A": 2, "B": 1}},
+        )
+        most_expensive = json.loads(self.service.query("most-expensive", "A", "EUR"))
+        self.assertEqual(most_expensive["product"]["product_id"], 2)
+        self.assertEqual(most_expensive["price"], 50.0)
+        average = json.loads(self.service.query("average", "A", "EUR"))
+        self.assertEqual(average["average_price"], 37.5)
+        self.assertIsNone(
+            json.loads(self.service.query("average", "C"))["average_price"]
+        )
+
+        with self.assertRaises(QueryError):
+            self.service.query("average")
+        with self.assertRaises(QueryError):
+            self.service.query("median", "A")
+
+    def test_cache_is_invalidated_on_refresh(self) -> None:
+        """
+        Test that repeated questions are cached until the catalog is refreshed.
+        """
+        self.service.refresh()
+        first = self.service.query("count")
+        with patch.object(self.service, "answer") as answer:
+            self.assertIs(self.service.query("count"), first)
+            answer.assert_not_called()
+
+        self.fetch.return_value = make_products([(1.0, "PLN", "A")])
+        self.service.refresh()
+
+        self.assertEqual(json.loads(self.service.query("count")), {"count": 1})
+        self.assertEqual(self.service.generation, 2)
+
+    def test_unchanged_refresh_keeps_cache(self) -> None:
+        """
+        Test that a refresh that changes no product keeps the cached answers.
+        """
+        self.service.refresh()
+        first = self.service.query("count")
+        self.fetch.return_value = [
+            product.model_copy(update={"next_product_token": "next"})
+            for product in self.fetch.return_value
+        ]
+        self.service.refresh()
+
+        self.assertEqual(self.service.generation, 1)
+        with patch.object(self.service, "answer") as answer:
+            self.assertIs(self.service.query("count"), first)
+            answer.assert_not_called()
+
+    def test_failed_refresh_keeps_catalog(self) -> None:
+        """
+        Test that the background refresh keeps serving the previous catalog on failure.
+        """
+        self.service.refresh_interval = 0.01
+        self.service.start()
+        self.addCleanup(self.service.stop)
+        refreshed = threading.Event()
+
+        def fail() -> list[Product]:
+            refreshed.set()
+            raise requests.ConnectionError("API down")
+
+        self.fetch.side_effect = fail
+
+        self.assertTrue(refreshed.wait(5))
+        self.assertEqual(json.loads(self.service.query("count")), {"count": 3})
+
+    def test_stop_during_refresh(self) -> None:
+        """
+        Test that stopping does not wait for a refresh that is still running.
+        """
+        self.service.refresh_interval = 0.01
+        self.service.start()
+        started, release = threading.Event(), threading.Event()
+        self.addCleanup(release.set)
+
+        def hang() -> list[Product]:
+            started.set()
+            release.wait(5)
+            return []
+
+        self.fetch.side_effect = hang
+        self.assertTrue(started.wait(5))
+
+        abandoned = self.service._thread  # pylint: disable=protected-access
+        with self.assertLogs("app.server", level="WARNING"):
+            self.service.stop(timeout=0.05)
+        self.assertIsNone(self.service._thread)  # pylint: disable=protected-access
+
+        # a restart must not revive the abandoned refresh loop
+        self.fetch.side_effect = None
+        self.service.start()
+        self.addCleanup(self.service.stop)
+        release.set()
+        abandoned.join(5)
+        self.assertFalse(abandoned.is_alive())
+
+    def test_http_endpoint(self) -> None:
+        """
+        Test the questions over HTTP, including error statuses.
+        """
+        self.service.refresh()
+        server = create_server(self.service, "127.0.0.1", 0)
+        thread = threading.Thread(
+            target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        host, port = server.server_address[:2]
+        url = f"http://{host}:{port}"
+
+        response = requests.get(
+            f"{url}/most-expensive",
+            params={"category": "A", "currency": "eur"},
+            timeout=5,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["price"], 50.0)
+        self.assertEqual(requests.get(f"{url}/count", timeout=5).json(), {"count": 3})
+        self.assertEqual(requests.get(f"{url}/health", timeout=5).json()["products"], 3)
+        self.assertEqual(requests.get(f"{url}/average", timeout=5).status_code, 400)
+        self.assertEqual(requests.get(f"{url}/unknown", timeout=5).status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+Unit tests for the sketches module.
+
+These tests check the heap-based top-k and the accuracy and mergeability
+of the KLL quantile sketch.
+"""
+
+import random
+import unittest
+from bisect import bisect_right
+
+from app.sketches import KLLSketch, TopK
+
+
+class TestTopK(unittest.TestCase):
+    """
+    Unit tests for the TopK class.
+    """
+
+    def test_keeps_most_expensive_first_seen(self) -> None:
+        """
+        Test that the k highest prices are kept and ties keep the earlier item.
+        """
+        top = TopK(3)
+        for item, price in [("a", 5), ("b", 9), ("c", 5), ("d", 1), ("e", 9)]:
+            top.add(item, price)
+
+        self.assertEqual(top.items(), [(9, "b"), (9, "e"), (5, "a")])
+        self.assertEqual(len(top), 3)
+
+    def test_merge(self) -> None:
+        """
+        Test that merging two parts equals adding all items to one TopK.
+        """
+        rng = random.Random(3)
+        prices = [rng.randint(1, 20) for _ in range(200)]
+        whole, first, second = TopK(10), TopK(10), TopK(10)
+        for index, price in enumerate(prices):
+            whole.add(index, price)
+            (first if index < 120 else second).add(index, price)
+        first.merge(second)
+
+        self.assertEqual(first.items(), whole.items())
+
+    def test_invalid_k(self) -> None:
+        """
+        Test that k must be positive.
+        """
+        with self.assertRaises(ValueError):
+            TopK(0)
+
+
+class TestKLLSketch(unittest.TestCase):
+    """
+    Unit tests for the KLLSketch class.
+    """
+
+    def test_exact_before_compaction(self) -> None:
+        """
+        Test that quantiles of a few values are exact nearest-rank quantiles.
+        """
+        sketch = KLLSketch().update([3.0, 1.0, 2.0, 5.0, 4.0])
+
+        self.assertEqual(
+            sketch.quantiles([0.0, 0.5, 1.0]), {0.0: 1.0, 0.5: 3.0, 1.0: 5.0}
+        )
+        self.assertEqual(sketch.compactors(), ((3.0, 1.0, 2.0, 5.0, 4.0),))
+
+    def test_empty(self) -> None:
+        """
+        Test that an empty sketch has no quantiles.
+        """
+        self.assertIsNone(KLLSketch().quantile(0.5))
+
+    def test_bounded_error_and_memory(self) -> None:
+        """
+        Test that merged sketches of a large stream stay small and accurate.
+        """
+        rng = random.Random(5)
+        values = [rng.uniform(0, 1000) for _ in range(50_000)]
+        sketch = KLLSketch(200).update(values[:30_000])
+        sketch.merge(KLLSketch(200, seed=1).update(values[30_000:]))
+        ordered = sorted(values)
+
+        self.assertEqual(sketch.count, len(values))
+        self.assertLess(len(sketch), 1000)
+        for q in (0.1, 0.5, 0.9, 0.99):
+            rank = bisect_right(ordered, sketch.quantile(q)) / len(values)
+            self.assertAlmostEqual(rank, q, delta=0.02)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+Unit tests for the snapshot module.
+
+These tests check that products survive a round trip through a snapshot file,
+that the loaded columns are mapped from the file and that the calculations
+accept a loaded snapshot directly.
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from app.calculations import (
+    ProductAggregate,
+    count_products,
+    count_products_per_category,
+    get_average_price_for_category,
+    get_most_expensive_in_category,
+    rate_cache,
+)
+from app.models import Product
+from app.snapshot import read_snapshot, write_snapshot
+
+
+class TestSnapshot(unittest.TestCase):
+    """
+    Unit tests for write_snapshot and read_snapshot.
+    """
+
+    def setUp(self) -> None:
+        converter = MagicMock()
+        converter.convert.side_effect = lambda amount, currency, *_, **__: (
+            amount * {"USD": 4.0, "EUR": 4.3}[currency]
+        )
+        patcher = patch.object(rate_cache, "_converter", converter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(rate_cache.invalidate)
+        rate_cache.invalidate()
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, "products.snapshot")
+
+        rng = random.Random(13)
+        self.products = [
+            Product(
+                product_id=i,
+                product_name=rng.choice(["Żółw", "Lamp", f"Product {i}"]),
+                category=rng.choice(["A", "B", "C"]),
+                price=round(rng.uniform(1, 100), 2),
+                currency=rng.choice(["PLN", "USD", "EUR"]),
+                next_product_token=None,
+            )
+            for i in range(300)
+        ]
+
+    def test_round_trip(self) -> None:
+        """
+        Test that every product is read back unchanged from the mapped file.
+        """
+        write_snapshot(iter(self.products), self.path)
+        frame = read_snapshot(self.path)
+
+        self.assertEqual(len(frame), len(self.products))
+        self.assertIsInstance(frame.prices.base, np.memmap)
+        self.assertEqual(
+            [product.model_dump() for product in frame],
+            [product.model_dump() for product in self.products],
+        )
+        self.assertEqual(
+            frame.product_names[:2], [p.product_name for p in self.products[:2]]
+        )
+
+    def test_calculations_accept_snapshot(self) -> None:
+        """
+        Test that the calculations give the same answers for a snapshot as for a list.
+        """
+        write_snapshot(self.products, self.path)
+        frame = read_snapshot(self.path)
+        expected = ProductAggregate().update(self.products)
+
+        self.assertEqual(count_products(frame), len(self.products))
+        self.assertEqual(
+            count_products_per_category(frame), expected.counts_per_category()
+        )
+        self.assertEqual(
+            get_most_expensive_in_category(frame, "A").product_id,
+            expected.most_expensive_in_category("A").product_id,
+        )
+        self.assertAlmostEqual(
+            get_average_price_for_category(frame, "B"),
+            expected.average_price_for_category("B"),
+        )
+
+    def test_empty_snapshot(self) -> None:
+        """
+        Test a snapshot without products.
+        """
+        write_snapshot([], self.path)
+        frame = read_snapshot(self.path)
+
+        self.assertEqual(len(frame), 0)
+        self.assertEqual(count_products_per_category(frame), {})
+
+    def test_failed_write_leaves_no_file(self) -> None:
+        """
+        Test that a failed write removes its temporary file and keeps the old snapshot.
+        """
+        write_snapshot(self.products[:1], self.path)
+
+        with patch("app.snapshot.os.replace", side_effect=OSError("Disk full")):
+            with self.assertRaises(OSError):
+                write_snapshot(self.products, self.path)
+
+        self.assertEqual(os.listdir(self.tmp_dir), ["products.snapshot"])
+        self.assertEqual(len(read_snapshot(self.path)), 1)
+
+    def test_not_a_snapshot(self) -> None:
+        """
+        Test that other files are rejected.
+        """
+        with open(self.path, "wb") as file:
+            file.write(b'{"product_id": 1}')
+
+        with self.assertRaises(ValueError):
+            read_snapshot(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+"""
+Unit tests for the store module.
+
+These tests check that the AggregateStore statistics stay equal to the ones
+ProductAggregate collects from the current products after inserts, updates
+and deletes.
+"""
+
+import random
+import unittest
+from unittest.mock import patch
+
+from app.calculations import ProductAggregate
+from app.models import Product
+from app.store import AggregateStore
+
+
+def make_product(product_id: int, category: str, price: float) -> Product:
+    """
+    Build a product priced in PLN.
+    """
+    return Product(
+        product_id=product_id,
+        product_name=f"Product {product_id}",
+        category=category,
+        price=price,
+        currency="PLN",
+        next_product_token=None,
+    )
+
+
+@patch("app.calculations.get_price_in_currency", lambda price, *_: price)
+@patch("app.store.get_price_in_currency", lambda price, *_: price)
+class TestAggregateStore(unittest.TestCase):
+    """
+    Unit tests for the AggregateStore class.
+    """
+
+    def test_max_after_removals(self) -> None:
+        """
+        Test that the most expensive product is correct after it is deleted or repriced.
+        """
+        store = AggregateStore(
+            [make_product(1, "A", 100.0), make_product(2, "A", 300.0)]
+        )
+        store.upsert(make_product(3, "A", 300.0))
+
+        self.assertEqual(store.most_expensive_in_category("A").product_id, 2)
+        store.delete(2)
+        self.assertEqual(store.most_expensive_in_category("A").product_id, 3)
+        store.upsert(make_product(3, "A", 50.0))
+        self.assertEqual(store.most_expensive_in_category("A").product_id, 1)
+        self.assertEqual(store.average_price_for_category("A"), 75.0)
+
+        store.upsert(make_product(1, "B", 100.0))
+        self.assertEqual(store.counts_per_category(), {"A": 1, "B": 1})
+        store.delete(3)
+        self.assertIsNone(store.most_expensive_in_category("A"))
+        self.assertIsNone(store.average_price_for_category("A"))
+        self.assertFalse(store.delete(3))
+
+    def test_sync(self) -> None:
+        """
+        Test that syncing only reports the changed and removed products.
+        """
+        products = [make_product(i, "A", float(i)) for i in range(1, 6)]
+        store = AggregateStore(products)
+
+        changed = products[1:4] + [make_product(5, "B", 7.0), make_product(6, "A", 1.0)]
+
+        self.assertEqual(store.sync(changed), (2, 1))
+        self.assertEqual(len(store), 5)
+        self.assertNotIn(1, store)
+        self.assertEqual(store.counts_per_category(), {"A": 4, "B": 1})
+
+    def test_resync_with_new_tokens(self) -> None:
+        """
+        Test that products differing only in their tokens or names leave the heaps alone.
+        """
+        products = [make_product(i, "A", float(i % 7)) for i in range(100)]
+        store = AggregateStore(products)
+        heap = store._categories["A"].heap  # pylint: disable=protected-access
+
+        for refresh in range(3):
+            fresh = [
+                product.model_copy(update={"next_product_token": f"token-{refresh}"})
+                for product in products
+            ]
+            self.assertEqual(store.sync(fresh), (0, 0))
+        self.assertEqual(store.get(5).next_product_token, "token-2")
+
+        renamed = [
+            product.model_copy(update={"product_name": f"Renamed {i}"})
+            for i, product in enumerate(products)
+        ]
+        self.assertEqual(store.sync(renamed), (100, 0))
+        # pylint: disable-next=protected-access
+        self.assertIs(store._categories["A"].heap, heap)
+        self.assertEqual(len(heap), 100)
+        self.assertEqual(
+            store.most_expensive_in_category("A").product_name, "Renamed 6"
+        )
+
+    def test_repricing_back_and_forth_keeps_heap_bounded(self) -> None:
+        """
+        Test that compaction drops the duplicate entries of products repriced back.
+        """
+        store = AggregateStore([make_product(i, "A", 1.0) for i in range(10)])
+        for _ in range(50):
+            for price in (2.0, 1.0):
+                for i in range(10):
+                    store.upsert(make_product(i, "A", price))
+            store.delete(10)
+            store.upsert(make_product(10, "A", 0.5))
+            store.delete(10)
+
+        heap = store._categories["A"].heap  # pylint: disable=protected-access
+        self.assertLessEqual(len(heap), 2 * 10 + 16 + 40)
+        self.assertEqual(store.most_expensive_in_category("A").product_id, 0)
+
+    def test_matches_product_aggregate_under_random_changes(self) -> None:
+        """
+        Test against aggregating the current products from scratch.
+        """
+        rng = random.Random(2)
+        store = AggregateStore()
+        current: dict[int, Product] = {}
+        for _ in range(5000):
+            product_id = rng.randrange(200)
+            if rng.random() < 0.3:
+                store.delete(product_id)
+                current.pop(product_id, None)
+            else:
+                product = make_product(
+                    product_id, rng.choice("ABC"), float(rng.randint(1, 20))
+                )
+                store.upsert(product)
+                current[product_id] = product
+
+        # updated products keep their position, as they keep their place in a dict
+        expected = ProductAggregate().update(current.values())
+        aggregate = store.to_aggregate()
+
+        self.assertEqual(aggregate.count, expected.count)
+        self.assertEqual(
+            sorted(aggregate.counts_per_category().items()),
+            sorted(expected.counts_per_category().items()),
+        )
+        for category in "ABC":
+            self.assertEqual(
+                aggregate.most_expensive_in_category(category),
+                expected.most_expensive_in_category(category),
+            )
+            self.assertAlmostEqual(
+                aggregate.average_price_for_category(category),
+                expected.average_price_for_category(category),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()